@@ -1,14 +1,40 @@
 import os
+from functools import wraps
+from itertools import islice
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
+from src.dedup import (
+    DEDUP_POLICIES,
+    DEDUP_SNAPSHOT_PATH,
+    DuplicateIndex,
+    apply_policy,
+)
+from src.lru import LRUCache
 from src.models import Grant
-from src.search_index import get_search_index
-from src.store import GrantStore
+from src.parallel_tagging import ParallelTagger
+from src.query_parser import (
+    And,
+    Node,
+    Or,
+    QuerySyntaxError,
+    Term,
+    parse_query,
+    query_tags,
+)
+from src.search_index import SNAPSHOT_PATH, get_search_index
+from src.serialization import (
+    dumps,
+    dumps_grants,
+    encode_grant,
+    join_fragments,
+    join_object,
+)
+from src.store import create_store
 from src.synonyms import resolve_query
-from src.tagging import GrantTagger
+from src.tagging import GrantTagger, tagging_fingerprint
 from src.tags import PREDEFINED_TAGS
 
 load_dotenv()
@@ -22,17 +48,176 @@ else:
     origins_list = [origin.strip() for origin in allowed_origins.split(",")]
     CORS(app, resources={r"/api/*": {"origins": origins_list}})
 
-store = GrantStore()
+store = create_store()
 tagger = GrantTagger()
+parallel_tagger = ParallelTagger(tagger)
 search_index = get_search_index()
 
+# Stores that can filter by tag themselves (SQLite) answer searches directly,
+# so the in-memory index is only needed for the file-based stores.
+searcher = store if hasattr(store, "search_by_tags") else search_index
+
+# Start from the shared snapshot when there is one; the first refresh then
+# only reads grants added since it was written.
+if searcher is search_index:
+    search_index.load_snapshot(SNAPSHOT_PATH)
+
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "flag").lower()
+if DEDUP_POLICY not in DEDUP_POLICIES:
+    raise ValueError(f"DEDUP_POLICY must be one of {', '.join(DEDUP_POLICIES)}")
+duplicate_index = DuplicateIndex(float(os.getenv("DEDUP_THRESHOLD", "0.8")))
+
+
+def sync_duplicate_index():
+    """
+    Bring ``duplicate_index`` up to date with the store. The first call starts
+    from the saved snapshot when there is one, and rewrites it if the store
+    had moved past it so the next worker has less to hash.
+    """
+    if duplicate_index.source_generation is not None:
+        duplicate_index.refresh(store)
+        return
+    duplicate_index.load_snapshot(DEDUP_SNAPSHOT_PATH)
+    snapshot_generation = duplicate_index.source_generation
+    duplicate_index.refresh(store)
+    if duplicate_index.source_generation != snapshot_generation:
+        duplicate_index.save_snapshot(DEDUP_SNAPSHOT_PATH)
+
+
+# Policies that change what is stored build the index when the worker starts,
+# so the first batch does not wait on it; ``flag`` only annotates responses
+# and builds it on the first batch instead.
+if DEDUP_POLICY in ("skip", "merge"):
+    sync_duplicate_index()
+
+MAX_PAGE_SIZE = 1000
+RANKED_PAGE_SIZE = 20
+
+response_cache = LRUCache(int(os.getenv("RESPONSE_CACHE_SIZE", "256")))
+TAGS_ETAG = tagging_fingerprint(PREDEFINED_TAGS, {})
+
+# Advanced search bodies keyed on the resolved query rather than the raw
+# params, so different spellings of one query share an entry.
+query_cache = LRUCache(int(os.getenv("QUERY_RESULT_CACHE_SIZE", "1024")))
+
+
+def search_generation():
+    if searcher is search_index:
+        return search_index.generation
+    return store.generation()
+
+
+def store_etag() -> str:
+    if searcher is search_index and search_index.source_generation is not None:
+        generation = search_index.source_generation
+    else:
+        generation = store.generation()
+    return (
+        f"{generation.epoch:x}-{generation.count:x}-{generation.revision:x}"
+        f"-{tagger.fingerprint}"
+    )
+
+
+def cached_response(etag_func=store_etag):
+    """
+    Serve a GET endpoint with a strong ETag derived from ``etag_func`` (the
+    store generation by default): matching ``If-None-Match`` requests get a
+    304 without running the view, and successful JSON bodies are kept in
+    ``response_cache`` keyed on (path, sorted query params, ETag).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = etag_func()
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            elif wants_ndjson():
+                response = app.make_response(view(*args, **kwargs))
+            else:
+                key = (
+                    request.path,
+                    tuple(sorted(request.args.items(multi=True))),
+                    etag,
+                )
+                cached = response_cache.get(key)
+                if cached is None:
+                    response = app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    cached = (response.get_data(), list(response.headers.items()))
+                    response_cache.put(key, cached)
+                response = Response(cached[0], headers=cached[1])
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def parse_page_args() -> tuple[int | None, int | None]:
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        limit = int(limit)
+
+    if cursor is not None:
+        if not cursor.isdigit():
+            raise ValueError("cursor is invalid")
+        cursor = int(cursor)
+
+    return limit, cursor
+
+
+def wants_ndjson() -> bool:
+    return request.args.get("format", "json").lower() == "ndjson"
+
+
+def take_page(results, limit: int | None) -> tuple[list[bytes], str | None]:
+    if limit is None:
+        return [fragment for _, fragment in results], None
+
+    page = list(islice(results, limit + 1))
+    next_cursor = str(page[limit - 1][0]) if len(page) > limit else None
+    return [fragment for _, fragment in page[:limit]], next_cursor
+
+
+def json_response(body: bytes) -> Response:
+    return Response(body, mimetype="application/json")
+
+
+def ndjson_response(results, limit: int | None, headers=None) -> Response:
+    if limit is not None:
+        results = islice(results, limit)
+
+    def generate():
+        for _, fragment in results:
+            yield fragment + b"\n"
+
+    return Response(generate(), mimetype="application/x-ndjson", headers=headers)
+
+
+def grants_response(results, limit: int | None) -> Response:
+    if wants_ndjson():
+        return ndjson_response(results, limit)
+
+    fragments, next_cursor = take_page(results, limit)
+    response = json_response(join_fragments(fragments))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
 
 @app.before_request
-def initialize_search_index():
-    if not search_index.grant_id_to_grant:
-        existing_grants = store.read_grants()
-        if existing_grants:
-            search_index.rebuild(existing_grants)
+def refresh_search_index():
+    if searcher is search_index:
+        search_index.refresh(store)
 
 
 @app.route("/")
@@ -53,9 +238,14 @@ def api_health():
 
 
 @app.route("/api/grants", methods=["GET"])
+@cached_response()
 def get_grants():
-    grants = store.read_grants()
-    return jsonify([g.to_dict() for g in grants])
+    try:
+        limit, cursor = parse_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return grants_response(searcher.iter_grants(after=cursor, fragments=True), limit)
 
 
 @app.route("/api/grants/batch", methods=["POST"])
@@ -65,7 +255,7 @@ def batch_tag_grants():
     if not isinstance(data, list):
         return jsonify({"error": "Expected array of grants"}), 400
 
-    tagged_grants = []
+    texts = []
     for item in data:
         grant_name = item.get("grant_name", "")
         grant_description = item.get("grant_description", "")
@@ -76,57 +266,108 @@ def batch_tag_grants():
                 400,
             )
 
-        tags = tagger.tag_grant(grant_name, grant_description)
+        texts.append((grant_name, grant_description))
 
-        grant = Grant(
+    tagged_grants = [
+        Grant(
             grant_name=grant_name,
             grant_description=grant_description,
             tags=tags,
             website_urls=item.get("website_urls", []),
             document_urls=item.get("document_urls", []),
         )
-        tagged_grants.append(grant)
+        for item, (grant_name, grant_description), tags in zip(
+            data, texts, parallel_tagger.tag_many(texts)
+        )
+    ]
+
+    duplicates = [None] * len(tagged_grants)
+    if DEDUP_POLICY != "off":
+        sync_duplicate_index()
+        duplicates = duplicate_index.find_many(tagged_grants)
+    kept, merged_tags = apply_policy(tagged_grants, duplicates, DEDUP_POLICY)
+
+    if kept:
+        store.append_grants(kept)
+    if searcher is search_index:
+        search_index.refresh(store)
+    if merged_tags:
+        merge_stored_tags(merged_tags)
+
+    if not any(duplicates):
+        return json_response(dumps_grants(tagged_grants))
+    return json_response(
+        join_fragments(
+            [
+                (
+                    encode_grant(grant)
+                    if duplicate is None
+                    else dumps({**grant.to_dict(), "duplicate_of": duplicate.to_dict()})
+                )
+                for grant, duplicate in zip(tagged_grants, duplicates)
+            ]
+        )
+    )
 
-    store.append_grants(tagged_grants)
-    search_index.add_grants(tagged_grants)
 
-    return jsonify([g.to_dict() for g in tagged_grants])
+def merge_stored_tags(extra_tags: dict[int, list[str]]):
+    updates = {}
+    for grant_id, tags in extra_tags.items():
+        after = grant_id - 1 if grant_id else None
+        _, grant = next(searcher.iter_grants(after=after))
+        updates[grant_id] = list(dict.fromkeys((*grant.tags, *tags)))
+
+    store.update_tags(updates)
+    if searcher is search_index:
+        search_index.refresh(store)
 
 
 @app.route("/api/tags", methods=["GET"])
+@cached_response(lambda: TAGS_ETAG)
 def get_tags():
     return jsonify(PREDEFINED_TAGS)
 
 
 @app.route("/api/search", methods=["GET"])
+@cached_response()
 def search_grants():
     tags_param = request.args.get("tags", "")
 
+    try:
+        limit, cursor = parse_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     if not tags_param:
-        return jsonify([])
+        return grants_response(iter(()), limit)
 
     requested_tags = [t.strip().lower() for t in tags_param.split(",")]
 
-    all_grants = store.read_grants()
-
-    matching_grants = []
-    for grant in all_grants:
-        grant_tags_lower = [t.lower() for t in grant.tags]
-        if all(tag in grant_tags_lower for tag in requested_tags):
-            matching_grants.append(grant.to_dict())
+    matching_grants = searcher.iter_search(
+        requested_tags, mode="all", after=cursor, fragments=True
+    )
 
-    return jsonify(matching_grants)
+    return grants_response(matching_grants, limit)
 
 
 @app.route("/api/search/advanced", methods=["GET"])
+@cached_response()
 def advanced_search():
     query = request.args.get("q", "").strip()
     tags_param = request.args.get("tags", "").strip()
     mode = request.args.get("mode", "all").lower()
+    rank = request.args.get("rank", "false").lower() == "true"
+    expr = request.args.get("expr", "").strip()
+    text = request.args.get("text", "").strip()
 
     if mode not in ["all", "any"]:
         return jsonify({"error": "mode must be 'all' or 'any'"}), 400
 
+    try:
+        limit, cursor = parse_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     resolved_tags = set()
 
     if query:
@@ -136,17 +377,126 @@ def advanced_search():
         explicit_tags = [t.strip().lower() for t in tags_param.split(",") if t.strip()]
         resolved_tags.update(explicit_tags)
 
-    if not resolved_tags:
-        return jsonify({"resolved_tags": [], "grants": []})
-
-    matching_grants = search_index.search_by_tags(list(resolved_tags), mode=mode)
+    plan = None
+    if expr:
+        if rank:
+            return jsonify({"error": "rank cannot be combined with expr"}), 400
+        try:
+            plan = parse_query(expr)
+        except QuerySyntaxError as e:
+            return jsonify({"error": f"invalid expr: {e}"}), 400
+        if resolved_tags:
+            plan = And((plan, tag_filter(resolved_tags, mode)))
+        resolved_tags = query_tags(plan)
+    elif text and resolved_tags:
+        plan = tag_filter(resolved_tags, mode)
+
+    # Text searches are always ordered by BM25 relevance.
+    ranked_by = "text" if text else "tags" if rank else None
+
+    if wants_ndjson():
+        if ranked_by:
+            ranked, _ = ranked_page(resolved_tags, mode, plan, text, limit, cursor)
+            results = ((gid, fragment) for gid, fragment, _ in ranked)
+        else:
+            results = search_results(resolved_tags, mode, plan, cursor)
+        return ndjson_response(
+            results,
+            None if ranked_by else limit,
+            headers={"X-Resolved-Tags": ",".join(sorted(resolved_tags))},
+        )
 
-    return jsonify(
-        {
-            "resolved_tags": sorted(list(resolved_tags)),
-            "grants": [g.to_dict() for g in matching_grants],
-        }
+    key = (
+        tuple(sorted(resolved_tags)),
+        mode,
+        plan,
+        text,
+        rank,
+        limit,
+        cursor,
+        search_generation(),
     )
+    body = query_cache.get(key)
+    if body is None:
+        if ranked_by:
+            body = ranked_search_body(resolved_tags, mode, plan, text, limit, cursor)
+        else:
+            results = search_results(resolved_tags, mode, plan, cursor)
+            body = search_body(results, resolved_tags, limit)
+        query_cache.put(key, body)
+    return json_response(body)
+
+
+def tag_filter(resolved_tags: set[str], mode: str) -> Node:
+    group = And if mode == "all" else Or
+    return group(tuple(Term(tag) for tag in sorted(resolved_tags)))
+
+
+def search_results(
+    resolved_tags: set[str], mode: str, plan: Node | None, cursor: int | None
+):
+    if plan is not None:
+        return searcher.iter_query(plan, after=cursor, fragments=True)
+    return searcher.iter_search(
+        list(resolved_tags), mode=mode, after=cursor, fragments=True
+    )
+
+
+def search_body(results, resolved_tags: set[str], limit: int | None) -> bytes:
+    fragments, next_cursor = take_page(results, limit)
+    body = {
+        "resolved_tags": dumps(sorted(resolved_tags)),
+        "grants": join_fragments(fragments),
+    }
+    if limit is not None:
+        body["next_cursor"] = dumps(next_cursor)
+    return join_object(body)
+
+
+def ranked_page(
+    resolved_tags: set[str],
+    mode: str,
+    plan: Node | None,
+    text: str,
+    limit: int | None,
+    cursor: int | None,
+) -> tuple[list[tuple[int, bytes, float]], str | None]:
+    # Ranked pages are ordered by score, so the cursor is an offset into the
+    # ranking rather than a grant id.
+    limit = limit or RANKED_PAGE_SIZE
+    offset = cursor or 0
+    if text:
+        ranked = searcher.text_search(
+            text, plan, limit=limit + 1, offset=offset, fragments=True
+        )
+    else:
+        ranked = searcher.ranked_search(
+            list(resolved_tags),
+            mode=mode,
+            limit=limit + 1,
+            offset=offset,
+            fragments=True,
+        )
+    next_cursor = str(offset + limit) if len(ranked) > limit else None
+    return ranked[:limit], next_cursor
+
+
+def ranked_search_body(
+    resolved_tags: set[str],
+    mode: str,
+    plan: Node | None,
+    text: str,
+    limit: int | None,
+    cursor: int | None,
+) -> bytes:
+    ranked, next_cursor = ranked_page(resolved_tags, mode, plan, text, limit, cursor)
+    body = {
+        "resolved_tags": dumps(sorted(resolved_tags)),
+        "grants": join_fragments([fragment for _, fragment, _ in ranked]),
+        "scores": dumps([round(score, 6) for _, _, score in ranked]),
+        "next_cursor": dumps(next_cursor),
+    }
+    return join_object(body)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.retag import retag_store
+from src.search_index import SNAPSHOT_PATH, SearchIndex
+from src.store import create_store
+from src.tagging import GrantTagger
+
+
+def retag_grants():
+    store = create_store()
+
+    # Start from the saved index, word postings included, so only grants
+    # added since it was written are indexed again.
+    search_index = SearchIndex()
+    search_index.load_snapshot(SNAPSHOT_PATH)
+    saved_generation = search_index.source_generation
+
+    print("Re-tagging grants affected by keyword map changes...")
+    result = retag_store(store, GrantTagger(), search_index)
+    if search_index.source_generation != saved_generation:
+        search_index.save_snapshot(SNAPSHOT_PATH)
+
+    if result.full:
+        print("   • No matching keyword map snapshot, re-tagged every grant")
+    print(f"   • Candidates re-tagged: {result.candidates}")
+    print(f"   • Grants with changed tags: {result.updated}")
+    print("Re-tagging complete!")
+
+
+if __name__ == "__main__":
+    retag_grants()
@@ -1,12 +1,17 @@
 #!/usr/bin/env python
 import json
+import os
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.dedup import DEDUP_SNAPSHOT_PATH, DuplicateIndex, apply_policy
 from src.models import Grant
-from src.store import GrantStore
+from src.parallel_tagging import ParallelTagger
+from src.retag import save_keyword_snapshot
+from src.search_index import save_store_snapshot
+from src.store import create_store
 from src.tagging import GrantTagger
 
 
@@ -23,13 +28,18 @@ def seed_grants():
 
     print(f"Loaded {len(grants_data)} grants from seed file")
 
-    tagger = GrantTagger()
-    store = GrantStore()
+    grant_tagger = GrantTagger()
+    tagger = ParallelTagger(grant_tagger)
+    store = create_store()
 
     print("Tagging grants...")
+    all_tags_per_grant = tagger.tag_many(
+        [(data["grant_name"], data["grant_description"]) for data in grants_data]
+    )
+    tagger.shutdown()
+
     tagged_grants = []
-    for data in grants_data:
-        tags = tagger.tag_grant(data["grant_name"], data["grant_description"])
+    for data, tags in zip(grants_data, all_tags_per_grant):
         grant = Grant(
             grant_name=data["grant_name"],
             grant_description=data["grant_description"],
@@ -40,9 +50,24 @@ def seed_grants():
         tagged_grants.append(grant)
         print(f"   • {grant.grant_name[:50]}... → {len(tags)} tags")
 
+    policy = os.getenv("DEDUP_POLICY", "flag").lower()
+    if policy != "off":
+        threshold = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+        duplicates = DuplicateIndex(threshold).find_many(tagged_grants)
+        tagged_grants, _ = apply_policy(tagged_grants, duplicates, policy)
+        print(
+            f"\nFound {len(duplicates) - duplicates.count(None)} duplicates ({policy})"
+        )
+
     print(f"\nSaving {len(tagged_grants)} grants to storage...")
     store.clear_grants()
     store.write_grants(tagged_grants)
+    save_keyword_snapshot(grant_tagger.tags, grant_tagger.keyword_map)
+    save_store_snapshot(store)
+    if policy != "off":
+        duplicate_index = DuplicateIndex()
+        duplicate_index.refresh(store)
+        duplicate_index.save_snapshot(DEDUP_SNAPSHOT_PATH)
 
     print("Seeding complete!")
     print("\nSummary:")
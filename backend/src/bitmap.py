@@ -0,0 +1,133 @@
+import re
+from collections.abc import Iterable, Iterator
+from itertools import compress
+
+_NONZERO_RUN = re.compile(rb"[^\x00]+")
+_BINARY_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+_BYTE_BITS = tuple(
+    tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)
+)
+
+
+class Bitmap:
+    """
+    Posting list of non-negative grant ids stored as a bit array.
+
+    Postings are built in a ``bytearray`` (one bit per id) and combined as
+    Python ints, so AND/OR/NOT run word-at-a-time in C. Iteration yields ids
+    in ascending order, skipping empty regions a run of zero bytes at a time.
+    """
+
+    __slots__ = ("_buffer", "_value", "_count")
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._buffer: bytearray | None = bytearray()
+        self._value: int | None = 0
+        self._count = 0
+        for grant_id in ids:
+            self.add(grant_id)
+
+    @classmethod
+    def from_int(cls, value: int) -> "Bitmap":
+        bitmap = cls.__new__(cls)
+        bitmap._buffer = None
+        bitmap._value = value
+        bitmap._count = value.bit_count()
+        return bitmap
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Bitmap":
+        bitmap = cls.__new__(cls)
+        bitmap._buffer = bytearray(data)
+        bitmap._value = None
+        bitmap._count = int.from_bytes(data, "little").bit_count()
+        return bitmap
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        return cls.from_int((1 << size) - 1)
+
+    @property
+    def value(self) -> int:
+        if self._value is None:
+            self._value = int.from_bytes(self._buffer, "little")
+        return self._value
+
+    def to_bytes(self) -> bytes:
+        if self._buffer is not None:
+            return bytes(self._buffer)
+        return self._value.to_bytes((self._value.bit_length() + 7) // 8, "little")
+
+    def _writable_buffer(self) -> bytearray:
+        if self._buffer is None:
+            self._buffer = bytearray(self.to_bytes())
+        self._value = None
+        return self._buffer
+
+    def add(self, grant_id: int):
+        byte, bit = divmod(grant_id, 8)
+        buffer = self._writable_buffer()
+        if byte >= len(buffer):
+            buffer.extend(bytes(byte + 1 - len(buffer)))
+        if not buffer[byte] >> bit & 1:
+            buffer[byte] |= 1 << bit
+            self._count += 1
+
+    def discard(self, grant_id: int):
+        if grant_id not in self:
+            return
+        byte, bit = divmod(grant_id, 8)
+        self._writable_buffer()[byte] &= ~(1 << bit) & 0xFF
+        self._count -= 1
+
+    def __contains__(self, grant_id: int) -> bool:
+        if self._buffer is None:
+            # Shifting the int costs O(bits) per test; index bytes instead.
+            self._buffer = bytearray(self.to_bytes())
+        byte, bit = divmod(grant_id, 8)
+        return byte < len(self._buffer) and bool(self._buffer[byte] >> bit & 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[int]:
+        value = self.value >> start
+        size = value.bit_length()
+        if self._count * 16 >= size:
+            digits = format(value, "b")[::-1].encode().translate(_BINARY_DIGITS)
+            return compress(range(start, start + size), digits)
+        return self._iter_sparse(value, start)
+
+    @staticmethod
+    def _iter_sparse(value: int, start: int) -> Iterator[int]:
+        data = value.to_bytes((value.bit_length() + 7) // 8, "little")
+        for run in _NONZERO_RUN.finditer(data):
+            offset = run.start()
+            for byte in run.group():
+                base = start + (offset << 3)
+                for bit in _BYTE_BITS[byte]:
+                    yield base + bit
+                offset += 1
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap.from_int(self.value & other.value)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap.from_int(self.value | other.value)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap.from_int(self.value & ~other.value)
+
+    def invert(self, size: int) -> "Bitmap":
+        return Bitmap.from_int(~self.value & ((1 << size) - 1))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        return self.value == other.value
+
+    def __repr__(self) -> str:
+        return f"Bitmap({list(self)!r})"
@@ -0,0 +1,349 @@
+import hashlib
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple
+
+from src.models import Grant
+from src.store import StoreGeneration
+from src.text_index import tokenize
+
+DEDUP_POLICIES = ("off", "flag", "skip", "merge")
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+
+DEDUP_SNAPSHOT_PATH = Path(__file__).parent.parent / os.getenv(
+    "DEDUP_INDEX_SNAPSHOT", "storage/dedup_index.snapshot"
+)
+SNAPSHOT_MAGIC = b"GRANTDUP"
+SNAPSHOT_VERSION = 2
+HASH_SIZE = 16
+# Band entries added since the sorted arrays were last rebuilt are kept in a
+# dict until they pass this share of the sorted ones (or MIN_PENDING).
+PENDING_SHARE = 8
+MIN_PENDING = 4096
+
+
+class Duplicate(NamedTuple):
+    """A match for an incoming grant: a stored grant id or an earlier batch index."""
+
+    grant_id: int | None
+    batch_index: int | None
+    similarity: float
+
+    def to_dict(self) -> dict:
+        key, value = (
+            ("grant_id", self.grant_id)
+            if self.grant_id is not None
+            else ("batch_index", self.batch_index)
+        )
+        return {key: value, "similarity": round(self.similarity, 3)}
+
+
+def content_hash(grant: Grant) -> bytes:
+    text = " ".join(tokenize(f"{grant.grant_name}\x00{grant.grant_description}"))
+    return hashlib.blake2b(text.encode(), digest_size=HASH_SIZE).digest()
+
+
+def shingles(text: str) -> set[str]:
+    words = tokenize(text)
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: str) -> array | None:
+    """
+    MinHash signature of ``text``'s word shingles, or None without words.
+
+    Each shingle's ``NUM_PERM`` hash values come from one SHAKE-128 digest,
+    and the per-position minimums are taken in C by ``map(min, ...)``.
+    """
+    hashed = [
+        array("I", hashlib.shake_128(shingle.encode()).digest(NUM_PERM * 4))
+        for shingle in shingles(text)
+    ]
+    if len(hashed) <= 1:
+        return hashed[0] if hashed else None
+    return array("I", map(min, *hashed))
+
+
+class DuplicateIndex:
+    """
+    Finds exact and near-duplicate grants among the ones already stored.
+
+    Exact duplicates share a hash of their normalized name and description.
+    Near duplicates are found with MinHash signatures of description word
+    shingles, split into ``BANDS`` bands for locality-sensitive hashing: only
+    grants sharing a whole band with the incoming one are compared, so a
+    lookup costs a few binary searches rather than a pass over the corpus.
+    Band keys and their grant ids live in two parallel arrays sorted by key
+    (12 bytes per band entry); recent additions wait in a small dict until
+    there are enough of them to merge in.
+    Candidates count as duplicates when their estimated Jaccard similarity
+    reaches ``threshold``. Grant ids are store positions; ``refresh`` follows
+    the store the same way ``SearchIndex`` does, and ignores tag updates since
+    tags play no part in matching.
+    """
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self._lock = Lock()
+        self.clear()
+
+    def clear(self):
+        self.hashes: dict[bytes, int] = {}
+        self.band_keys = array("q")
+        self.band_ids = array("I")
+        self._pending: dict[int, list[int]] = {}
+        self._pending_count = 0
+        self.signatures = array("I")
+        self._next_id = 0
+        self.source_generation: StoreGeneration | None = None
+
+    def __len__(self) -> int:
+        return self._next_id
+
+    @staticmethod
+    def _band_keys(signature: array) -> list[int]:
+        rows = NUM_PERM // BANDS
+        return [
+            hash((band, *signature[band * rows : (band + 1) * rows]))
+            for band in range(BANDS)
+        ]
+
+    def _signature(self, grant_id: int) -> array:
+        return self.signatures[grant_id * NUM_PERM : (grant_id + 1) * NUM_PERM]
+
+    def _add_to_bands(self, grant_id: int, signature: array):
+        for key in self._band_keys(signature):
+            self._pending.setdefault(key, []).append(grant_id)
+        self._pending_count += BANDS
+        if self._pending_count >= max(
+            MIN_PENDING, len(self.band_keys) // PENDING_SHARE
+        ):
+            self._merge_pending()
+
+    def _merge_pending(self):
+        if not self._pending:
+            return
+        pending = sorted(
+            (key, grant_id) for key, ids in self._pending.items() for grant_id in ids
+        )
+        # Both runs are sorted, so this sort is a single linear merge.
+        entries = sorted([*zip(self.band_keys, self.band_ids), *pending])
+        self.band_keys = array("q", (key for key, _ in entries))
+        self.band_ids = array("I", (grant_id for _, grant_id in entries))
+        self._pending = {}
+        self._pending_count = 0
+
+    def _band_candidates(self, key: int) -> list[int]:
+        keys = self.band_keys
+        start = end = bisect_left(keys, key)
+        while end < len(keys) and keys[end] == key:
+            end += 1
+        return [*self.band_ids[start:end], *self._pending.get(key, ())]
+
+    def add_grants(self, grants: list[Grant]):
+        for grant in grants:
+            grant_id = self._next_id
+            self._next_id += 1
+
+            self.hashes.setdefault(content_hash(grant), grant_id)
+            signature = minhash(grant.grant_description)
+            if signature is None:
+                self.signatures.extend([0] * NUM_PERM)
+                continue
+            self.signatures.extend(signature)
+            self._add_to_bands(grant_id, signature)
+
+    def refresh(self, store):
+        if store.generation() == self.source_generation:
+            return
+
+        with self._lock:
+            changes = store.read_changes(self.source_generation)
+            if changes.reset:
+                self.clear()
+            self.add_grants(changes.grants)
+            self.source_generation = changes.generation
+
+    def save_snapshot(self, path: str | Path):
+        """
+        Write the content hashes, signatures and band arrays to ``path``, so
+        workers can load them at startup instead of hashing the whole corpus
+        again.
+        """
+        path = Path(path)
+        with self._lock:
+            self._merge_pending()
+            generation = self.source_generation
+            header = json.dumps(
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "byteorder": sys.byteorder,
+                    # Band keys are hash() values, which may change between
+                    # Python versions.
+                    "python": list(sys.version_info[:2]),
+                    "generation": list(generation) if generation else None,
+                    "count": self._next_id,
+                    "hashes": len(self.hashes),
+                    "band_entries": len(self.band_keys),
+                }
+            ).encode()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC + len(header).to_bytes(4, "little") + header)
+                f.write(b"".join(self.hashes))
+                f.write(array("I", self.hashes.values()).tobytes())
+                f.write(self.signatures.tobytes())
+                f.write(self.band_keys.tobytes())
+                f.write(self.band_ids.tobytes())
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str | Path) -> bool:
+        """
+        Replace the index with a snapshot saved by ``save_snapshot``; a later
+        ``refresh`` continues from the store generation it was saved at.
+        Returns False, leaving the index alone, if there is no usable one.
+        """
+        try:
+            data = Path(path).read_bytes()
+        except FileNotFoundError:
+            return False
+        if not data.startswith(SNAPSHOT_MAGIC):
+            return False
+        try:
+            position = len(SNAPSHOT_MAGIC) + 4
+            size = int.from_bytes(data[position - 4 : position], "little")
+            header = json.loads(data[position : position + size])
+            position += size
+            keys = data[position : position + header["hashes"] * HASH_SIZE]
+            position += len(keys)
+            ids = array("I", data[position : position + header["hashes"] * 4])
+            position += len(ids) * 4
+            signatures = array(
+                "I", data[position : position + header["count"] * NUM_PERM * 4]
+            )
+            position += len(signatures) * 4
+            band_keys = array(
+                "q", data[position : position + header["band_entries"] * 8]
+            )
+            position += len(band_keys) * 8
+            band_ids = array("I", data[position:])
+        except (ValueError, KeyError, TypeError):
+            return False
+        if (
+            header.get("version") != SNAPSHOT_VERSION
+            or header.get("byteorder") != sys.byteorder
+            or header.get("python") != list(sys.version_info[:2])
+            or len(ids) != header["hashes"]
+            or len(signatures) != header["count"] * NUM_PERM
+            or len(band_keys) != header["band_entries"]
+            or len(band_ids) != header["band_entries"]
+        ):
+            return False
+
+        with self._lock:
+            self.clear()
+            self.hashes = {
+                keys[i * HASH_SIZE : (i + 1) * HASH_SIZE]: grant_id
+                for i, grant_id in enumerate(ids)
+            }
+            self.signatures = signatures
+            self.band_keys = band_keys
+            self.band_ids = band_ids
+            self._next_id = header["count"]
+            generation = header["generation"]
+            self.source_generation = (
+                StoreGeneration(*generation) if generation else None
+            )
+        return True
+
+    def find(self, grant: Grant, signature: array | None = None) -> Duplicate | None:
+        grant_id = self.hashes.get(content_hash(grant))
+        if grant_id is not None:
+            return Duplicate(grant_id, None, 1.0)
+
+        if signature is None:
+            signature = minhash(grant.grant_description)
+        if signature is None:
+            return None
+
+        best = None
+        candidates = {
+            candidate
+            for key in self._band_keys(signature)
+            for candidate in self._band_candidates(key)
+        }
+        for candidate in sorted(candidates):
+            stored = self._signature(candidate)
+            similarity = sum(a == b for a, b in zip(signature, stored)) / NUM_PERM
+            if similarity >= self.threshold and (
+                best is None or similarity > best.similarity
+            ):
+                best = Duplicate(candidate, None, similarity)
+        return best
+
+    def find_many(self, grants: list[Grant]) -> list[Duplicate | None]:
+        """
+        Match each grant against the stored grants, then against the earlier
+        unique grants of the same batch (reported by ``batch_index``).
+        """
+        batch = DuplicateIndex(self.threshold)
+        batch_positions = []
+        found = []
+        for position, grant in enumerate(grants):
+            signature = minhash(grant.grant_description)
+            duplicate = self.find(grant, signature)
+            if duplicate is None:
+                match = batch.find(grant, signature)
+                if match is not None:
+                    duplicate = Duplicate(
+                        None, batch_positions[match.grant_id], match.similarity
+                    )
+            if duplicate is None:
+                batch.add_grants([grant])
+                batch_positions.append(position)
+            found.append(duplicate)
+        return found
+
+
+def apply_policy(
+    grants: list[Grant], duplicates: list[Duplicate | None], policy: str
+) -> tuple[list[Grant], dict[int, list[str]]]:
+    """
+    Decide what to store for a batch checked by ``find_many``.
+
+    Returns the grants to append and, for ``merge``, the tags to add to each
+    stored grant that duplicates were folded into. ``flag`` and ``off`` keep every
+    grant, ``skip`` drops duplicates and ``merge`` drops them after adding
+    their tags to the grant they duplicate.
+    """
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"Unknown dedup policy: {policy}")
+    if policy in ("off", "flag"):
+        return list(grants), {}
+
+    kept: dict[int, Grant] = {}
+    merged: dict[int, list[str]] = {}
+    for index, (grant, duplicate) in enumerate(zip(grants, duplicates)):
+        if duplicate is None:
+            kept[index] = grant
+        elif policy == "merge" and duplicate.batch_index is not None:
+            original = kept[duplicate.batch_index]
+            tags = list(dict.fromkeys((*original.tags, *grant.tags)))
+            kept[duplicate.batch_index] = original.with_tags(tags)
+        elif policy == "merge":
+            merged.setdefault(duplicate.grant_id, []).extend(grant.tags)
+    return list(kept.values()), merged
@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed
+    ON cache_entries (accessed_at);
+"""
+
+
+class DiskCache:
+    """
+    Persistent string cache in a SQLite file, shared by every process that
+    opens the same path.
+
+    Entries older than ``ttl`` seconds are ignored on read and dropped on
+    eviction. Once more than ``max_entries`` are stored, the least recently
+    used ones are evicted; the check runs every ``max_entries // 100`` writes
+    so it does not cost a table scan per insert. Reads take no write lock:
+    their access times are buffered and written with the next write, or once
+    ``max_entries // 100`` of them are pending.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 100_000,
+        ttl: float | None = None,
+    ):
+        self.path = self.resolve(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes_since_eviction = 0
+        self._evict_every = max(1, max_entries // 100)
+        self._touched: dict[str, float] = {}
+        self._touched_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    @staticmethod
+    def resolve(path: str | Path) -> Path:
+        return Path(__file__).parent.parent / path
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+
+        conn = self._connection()
+        now = time.time()
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                "SELECT key, value, created_at FROM cache_entries "
+                f"WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for key, value, created_at in rows:
+                if self.ttl is None or now - created_at <= self.ttl:
+                    found[key] = value
+
+        with self._touched_lock:
+            self._touched.update(dict.fromkeys(found, now))
+            flush = len(self._touched) >= self._evict_every
+        if flush:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._flush_touched(conn)
+        return found
+
+    def _flush_touched(self, conn: sqlite3.Connection):
+        with self._touched_lock:
+            touched, self._touched = self._touched, {}
+        conn.executemany(
+            "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in touched.items()],
+        )
+
+    def get(self, key: str) -> str | None:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, entries: dict[str, str]):
+        if not entries:
+            return
+
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._flush_touched(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in entries.items()],
+            )
+
+        self._writes_since_eviction += len(entries)
+        if self._writes_since_eviction >= self._evict_every:
+            self.evict()
+
+    def set(self, key: str, value: str):
+        self.set_many({key: value})
+
+    def evict(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._flush_touched(conn)
+            if self.ttl is not None:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE created_at < ?",
+                    (time.time() - self.ttl,),
+                )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._writes_since_eviction = 0
+
+    def __len__(self) -> int:
+        (count,) = (
+            self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        )
+        return count
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
@@ -0,0 +1,92 @@
+import os
+from array import array
+from collections.abc import Iterator, MutableMapping
+
+from src.lru import LRUCache
+from src.models import Grant
+from src.serialization import encode_grant, loads
+
+FRAGMENT_CACHE_SIZE = int(os.getenv("GRANT_FRAGMENT_CACHE_SIZE", "4096"))
+
+
+class GrantObjects(dict):
+    """
+    Grant id -> Grant dict whose ``fragment`` encodes a grant on demand,
+    keeping the encodings of the ``fragment_cache_size`` most recently served
+    grants rather than a second copy of every grant. ``GrantTable``, the
+    default, encodes every grant once at insert instead.
+    """
+
+    def __init__(self, fragment_cache_size: int = FRAGMENT_CACHE_SIZE):
+        super().__init__()
+        self._fragments = LRUCache(fragment_cache_size)
+
+    def fragment(self, grant_id: int) -> bytes:
+        grant = self[grant_id]
+        cached = self._fragments.get(grant_id)
+        # A grant replaced since it was cached (tag updates) is re-encoded.
+        if cached is not None and cached[0] is grant:
+            return cached[1]
+        fragment = encode_grant(grant)
+        self._fragments.put(grant_id, (grant, fragment))
+        return fragment
+
+
+class GrantTable(MutableMapping):
+    """
+    Columnar grant id -> Grant mapping for large indexes.
+
+    Each grant's JSON encoding is appended to one buffer, with an offset array
+    marking where it ends, so a grant costs its encoded bytes and one offset
+    instead of a Python object graph. ``fragment`` slices the buffer; lookups
+    decode a transient ``Grant``. Ids must be appended in order; replaced
+    grants are kept as objects.
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._ends = array("Q")
+        self._replaced: dict[int, tuple[Grant, bytes]] = {}
+
+    def _slice(self, grant_id: int) -> bytearray:
+        start = self._ends[grant_id - 1] if grant_id else 0
+        return self._data[start : self._ends[grant_id]]
+
+    def __getitem__(self, grant_id: int) -> Grant:
+        replaced = self._replaced.get(grant_id)
+        if replaced is not None:
+            return replaced[0]
+        if not 0 <= grant_id < len(self._ends):
+            raise KeyError(grant_id)
+        return Grant.from_dict(loads(self._slice(grant_id)))
+
+    def fragment(self, grant_id: int) -> bytes:
+        replaced = self._replaced.get(grant_id)
+        if replaced is not None:
+            return replaced[1]
+        if not 0 <= grant_id < len(self._ends):
+            raise KeyError(grant_id)
+        return bytes(self._slice(grant_id))
+
+    def __setitem__(self, grant_id: int, grant: Grant):
+        count = len(self._ends)
+        if grant_id < count:
+            self._replaced[grant_id] = (grant, encode_grant(grant))
+            return
+        if grant_id > count:
+            raise KeyError(grant_id)
+
+        self._data += encode_grant(grant)
+        self._ends.append(len(self._data))
+
+    def __delitem__(self, grant_id: int):
+        raise TypeError("grants cannot be removed from a GrantTable")
+
+    def __contains__(self, grant_id) -> bool:
+        return isinstance(grant_id, int) and 0 <= grant_id < len(self._ends)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._ends)))
+
+    def __len__(self) -> int:
+        return len(self._ends)
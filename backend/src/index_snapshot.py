@@ -0,0 +1,230 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterator, MutableMapping
+from pathlib import Path
+
+from src.bitmap import Bitmap
+from src.models import Grant
+from src.serialization import encode_grant, loads
+from src.store import StoreGeneration
+from src.text_index import TextIndex
+
+MAGIC = b"GTIX"
+VERSION = 2
+# Version 1 snapshots have no word index; it is built from the grants instead.
+READABLE_VERSIONS = (1, VERSION)
+HEADER = struct.Struct("<4sIQ")
+
+
+class MappedGrants(MutableMapping):
+    """
+    Grant id -> Grant mapping over the JSON blobs of a memory-mapped snapshot.
+
+    A grant is decoded the first time it is looked up and kept afterwards,
+    while ``fragment`` hands out its blob without decoding. Grants assigned
+    later (appends, tag updates) override the mapped ones.
+    """
+
+    def __init__(self, blobs: memoryview, offsets: memoryview, count: int):
+        self._blobs = blobs
+        self._offsets = offsets
+        self._count = count
+        self._decoded: dict[int, Grant] = {}
+        self._assigned: dict[int, bytes] = {}
+
+    def _blob(self, grant_id: int) -> memoryview:
+        if not 0 <= grant_id < self._count:
+            raise KeyError(grant_id)
+        return self._blobs[self._offsets[grant_id] : self._offsets[grant_id + 1]]
+
+    def __getitem__(self, grant_id: int) -> Grant:
+        grant = self._decoded.get(grant_id)
+        if grant is None:
+            blob = self._blob(grant_id)
+            grant = self._decoded[grant_id] = Grant.from_dict(loads(bytes(blob)))
+        return grant
+
+    def fragment(self, grant_id: int) -> bytes:
+        fragment = self._assigned.get(grant_id)
+        if fragment is None:
+            fragment = bytes(self._blob(grant_id))
+        return fragment
+
+    def __setitem__(self, grant_id: int, grant: Grant):
+        self._decoded[grant_id] = grant
+        self._assigned[grant_id] = encode_grant(grant)
+
+    def __delitem__(self, grant_id: int):
+        raise TypeError("grants cannot be removed from a snapshot")
+
+    def __contains__(self, grant_id) -> bool:
+        return (
+            isinstance(grant_id, int) and 0 <= grant_id < self._count
+        ) or grant_id in self._assigned
+
+    def __iter__(self) -> Iterator[int]:
+        yield from range(self._count)
+        yield from sorted(gid for gid in self._assigned if gid >= self._count)
+
+    def __len__(self) -> int:
+        return self._count + sum(1 for gid in self._assigned if gid >= self._count)
+
+    @property
+    def decoded_count(self) -> int:
+        return len(self._decoded)
+
+
+def write_snapshot(index, path: str | Path):
+    """
+    Write ``index`` as a binary snapshot: a small JSON directory followed by
+    each tag's posting bitmap, a ``uint64`` offset per grant, the grants'
+    JSON blobs and, when it covers every grant, the word index: its
+    newline-separated words, a ``uint64`` end offset per word into the
+    concatenated posting and count columns, and every grant's word count.
+    The file is replaced atomically.
+    """
+    path = Path(path)
+    blobs = [fragment for _, fragment in index.iter_grants(fragments=True)]
+    offsets = array("Q", [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+
+    sections = []
+    position = 0
+
+    def add_section(data: bytes) -> list[int]:
+        nonlocal position
+        sections.append(data)
+        start = position
+        position += len(data)
+        padding = -position % 8
+        sections.append(bytes(padding))
+        position += padding
+        return [start, len(data)]
+
+    postings = {}
+    for tag, posting in index.tag_to_grant_ids.items():
+        bitmap = posting if isinstance(posting, Bitmap) else Bitmap(posting)
+        postings[tag] = add_section(bitmap.to_bytes())
+    offsets_section = add_section(offsets.tobytes())
+    blobs_section = add_section(b"".join(blobs))
+
+    text = None
+    text_index = index.text_index
+    if len(text_index) == len(blobs):
+        words = list(text_index.postings)
+        ends = array("Q")
+        ids, counts = array("I"), array("H")
+        for word in words:
+            ids.extend(text_index.postings[word])
+            counts.extend(text_index.frequencies[word])
+            ends.append(len(ids))
+        text = {
+            "words": add_section("\n".join(words).encode()),
+            "ends": add_section(ends.tobytes()),
+            "ids": add_section(ids.tobytes()),
+            "counts": add_section(counts.tobytes()),
+            "lengths": add_section(text_index.lengths.tobytes()),
+        }
+
+    generation = index.source_generation
+    directory = json.dumps(
+        {
+            "byteorder": sys.byteorder,
+            "generation": list(generation) if generation is not None else None,
+            "grant_count": len(blobs),
+            "postings": postings,
+            "offsets": offsets_section,
+            "blobs": blobs_section,
+            "text": text,
+        }
+    ).encode()
+    directory += b" " * (-(HEADER.size + len(directory)) % 8)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(directory)))
+        f.write(directory)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(index, path: str | Path) -> bool:
+    """
+    Load a snapshot written by ``write_snapshot`` into ``index`` via ``mmap``.
+
+    Posting bitmaps are read eagerly (they are small); grants stay in the
+    shared page cache until a result needs them. Returns False, leaving the
+    index untouched, if the file is missing or not a usable snapshot.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return False
+
+    try:
+        magic, version, directory_length = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            return False
+        data_start = HEADER.size + directory_length
+        directory = json.loads(mapped[HEADER.size : data_start])
+        if directory["byteorder"] != sys.byteorder:
+            return False
+
+        view = memoryview(mapped)[data_start:]
+        count = directory["grant_count"]
+        offsets_start, offsets_length = directory["offsets"]
+        offsets = view[offsets_start : offsets_start + offsets_length].cast("Q")
+        blobs_start, blobs_length = directory["blobs"]
+        grants = MappedGrants(
+            view[blobs_start : blobs_start + blobs_length], offsets, count
+        )
+
+        postings = {}
+        for tag, (start, length) in directory["postings"].items():
+            bitmap = Bitmap.from_bytes(view[start : start + length])
+            postings[tag] = bitmap if index.postings == "bitmap" else set(bitmap)
+        generation = directory["generation"]
+        text = directory.get("text")
+    except (struct.error, ValueError, KeyError, TypeError):
+        return False
+
+    index.load(
+        postings,
+        grants,
+        count,
+        StoreGeneration(*generation) if generation is not None else None,
+        (lambda: _load_text_index(view, text)) if text is not None else None,
+    )
+    return True
+
+
+def _load_text_index(view: memoryview, sections: dict) -> TextIndex:
+    """Copy the word index saved by ``write_snapshot`` out of the mapping."""
+
+    def section(name: str, typecode: str) -> array:
+        start, length = sections[name]
+        column = array(typecode)
+        column.frombytes(view[start : start + length])
+        return column
+
+    words_start, words_length = sections["words"]
+    words = bytes(view[words_start : words_start + words_length]).decode()
+    ends = section("ends", "Q")
+    ids = section("ids", "I")
+    counts = section("counts", "H")
+
+    postings, frequencies = {}, {}
+    start = 0
+    for word, end in zip(words.split("\n") if words else (), ends):
+        postings[word] = ids[start:end]
+        frequencies[word] = counts[start:end]
+        start = end
+    return TextIndex.from_postings(postings, frequencies, section("lengths", "I"))
@@ -0,0 +1,337 @@
+import atexit
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from threading import Lock, Timer
+
+from src.models import Grant
+from src.serialization import (
+    dumps,
+    dumps_grants,
+    encode_grant,
+    loads,
+)
+from src.store import (
+    StoreChanges,
+    StoreGeneration,
+    TagLog,
+    file_lock,
+    new_epoch,
+    read_generation_file,
+    write_generation_file,
+)
+
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class JsonlGrantStore:
+    """
+    Append-only grant store backed by a segmented JSON Lines log.
+
+    Each grant is one line in the active segment, so appending a batch costs
+    the size of the batch rather than the size of the corpus. Segments are
+    named after the index of their first record and roll over once they pass
+    ``segment_bytes``; when more than ``compact_threshold`` sealed segments
+    pile up they are merged into one. Appends are fsynced at most once per
+    ``fsync_interval`` seconds (``0`` syncs every batch); a deferred fsync runs
+    on a timer once the interval is up, and on ``close``. A line left torn by a
+    crash mid-append is skipped on read and cut off by the next append. Tag updates go to a
+    ``TagLog`` next to the segments and are applied as grants are read, so
+    re-tagging never rewrites the log; compaction writes them into the merged
+    segment and drops them from the tag log.
+    """
+
+    def __init__(
+        self,
+        storage_path: str = "storage/grants",
+        segment_bytes: int = 64 * 1024 * 1024,
+        compact_threshold: int = 16,
+        fsync_interval: float = 0.0,
+    ):
+        self.storage_dir = Path(__file__).parent.parent / storage_path
+        self.generation_path = self.storage_dir / "generation"
+        self.tag_log = TagLog(self.storage_dir / "tags.jsonl")
+        self.segment_bytes = segment_bytes
+        self.compact_threshold = compact_threshold
+        self.fsync_interval = fsync_interval
+        self.lock = Lock()
+        self._last_fsync = 0.0
+        self._unsynced: set[str] = set()
+        self._sync_timer: Timer | None = None
+        self._ensure_storage_exists()
+        if fsync_interval > 0:
+            atexit.register(self.close)
+
+    def _ensure_storage_exists(self):
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        if not self._segments():
+            self._segment_path(0).touch()
+
+    def _lock(self, shared: bool = False):
+        return file_lock(self.storage_dir / ".lock", shared=shared)
+
+    def _segment_path(self, start: int) -> Path:
+        return self.storage_dir / f"{start:020d}{SEGMENT_SUFFIX}"
+
+    def _segments(self) -> list[tuple[int, Path]]:
+        segments = []
+        for path in self.storage_dir.glob(f"*{SEGMENT_SUFFIX}"):
+            if path.stem.isdigit():
+                segments.append((int(path.stem), path))
+        return sorted(segments)
+
+    @staticmethod
+    def _is_record(line: bytes) -> bool:
+        # Every record ends in a newline, so a line without one was torn by a
+        # crash mid-append.
+        return line.endswith(b"\n") and bool(line.strip())
+
+    @classmethod
+    def _count_records(cls, path: Path) -> int:
+        with open(path, "rb") as f:
+            return sum(1 for line in f if cls._is_record(line))
+
+    @staticmethod
+    def _truncate_torn_line(path: Path):
+        with open(path, "r+b") as f:
+            position = f.seek(0, os.SEEK_END)
+            if position == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            while position > 0:
+                step = min(position, 64 * 1024)
+                position -= step
+                f.seek(position)
+                newline = f.read(step).rfind(b"\n")
+                if newline != -1:
+                    position += newline + 1
+                    break
+            f.truncate(position)
+
+    def _iter_records_unlocked(
+        self, segments: list[tuple[int, Path]] | None = None, since: int = 0
+    ) -> Iterator[dict]:
+        if segments is None:
+            segments = self._segments()
+        first = max(
+            (i for i, (start, _) in enumerate(segments) if start <= since), default=0
+        )
+        segments = segments[first:]
+
+        position = segments[0][0] if segments else 0
+        for start, path in segments:
+            # A crash during compaction can leave a merged segment next to the
+            # segments it replaced; skip records that were already yielded.
+            skip = position - start
+            with open(path, "rb") as f:
+                for line in f:
+                    if not self._is_record(line):
+                        continue
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                    position += 1
+                    if position > since:
+                        yield loads(line)
+
+    def _read_grants_unlocked(
+        self, since: int = 0, tag_updates: dict[int, list[str]] | None = None
+    ) -> list[Grant]:
+        """
+        Grants from index ``since`` on, with ``tag_updates`` (by default every
+        logged update up to the current revision) applied.
+        """
+        try:
+            grants = [
+                Grant.from_dict(g) for g in self._iter_records_unlocked(since=since)
+            ]
+        except FileNotFoundError:
+            return []
+        if tag_updates is None:
+            revision = self._generation_unlocked().revision
+            tag_updates = self.tag_log.read(until=revision)
+        for grant_id, tags in tag_updates.items():
+            if since <= grant_id < since + len(grants):
+                grants[grant_id - since].tags = tags
+        return grants
+
+    def _sync(self, f, force: bool = False):
+        f.flush()
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(f.fileno())
+            self._last_fsync = now
+            self._unsynced.discard(f.name)
+            return
+
+        self._unsynced.add(f.name)
+        if self._sync_timer is None:
+            delay = self.fsync_interval - (now - self._last_fsync)
+            self._sync_timer = Timer(delay, self.sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _write_segment(self, path: Path, lines: Iterator[bytes]):
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            for line in lines:
+                f.write(line + b"\n")
+            self._sync(f, force=True)
+        os.replace(tmp_path, path)
+
+    def _write_grants_unlocked(self, grants: list[Grant]) -> StoreGeneration:
+        old_segments = self._segments()
+        self._write_segment(self._segment_path(0), map(encode_grant, grants))
+        for start, path in old_segments:
+            if start != 0:
+                path.unlink()
+        self.tag_log.clear()
+        generation = StoreGeneration(new_epoch(), len(grants))
+        write_generation_file(self.generation_path, generation)
+        return generation
+
+    def _generation_unlocked(self) -> StoreGeneration:
+        generation = read_generation_file(self.generation_path)
+        if generation is None:
+            count = sum(1 for _ in self._iter_records_unlocked())
+            generation = StoreGeneration(new_epoch(), count)
+            write_generation_file(self.generation_path, generation)
+        return generation
+
+    def _append_unlocked(self, new_grants: list[Grant]):
+        generation = self._generation_unlocked()
+        start, path = self._segments()[-1]
+        self._truncate_torn_line(path)
+        if path.stat().st_size >= self.segment_bytes:
+            start += self._count_records(path)
+            path = self._segment_path(start)
+
+        payload = b"".join(encode_grant(g) + b"\n" for g in new_grants)
+        with open(path, "ab") as f:
+            f.write(payload)
+            self._sync(f)
+        write_generation_file(
+            self.generation_path,
+            generation._replace(count=generation.count + len(new_grants)),
+        )
+
+        if len(self._segments()) > self.compact_threshold:
+            self._compact_unlocked()
+
+    def _compact_unlocked(self):
+        segments = self._segments()
+        sealed = segments[:-1]
+        if len(sealed) < 2:
+            return
+
+        # Fold logged tag updates into the merged records, so the tag log only
+        # keeps the updates of grants in the active segment.
+        revision = self._generation_unlocked().revision
+        first, count = sealed[0][0], segments[-1][0]
+        records = list(self._iter_records_unlocked(sealed))
+        for grant_id, tags in self.tag_log.read(until=revision).items():
+            if first <= grant_id < count:
+                records[grant_id - first]["tags"] = tags
+        self._write_segment(sealed[0][1], map(dumps, records))
+        for _, path in sealed[1:]:
+            path.unlink()
+        self.tag_log.fold(revision, count)
+
+    def read_grants(self) -> list[Grant]:
+        with self.lock, self._lock(shared=True):
+            return self._read_grants_unlocked()
+
+    def write_grants(self, grants: list[Grant]):
+        with self.lock, self._lock():
+            self._write_grants_unlocked(grants)
+
+    def append_grants(self, new_grants: list[Grant]):
+        if not new_grants:
+            return
+        with self.lock, self._lock():
+            self._append_unlocked(new_grants)
+
+    def clear_grants(self):
+        with self.lock, self._lock():
+            self._write_grants_unlocked([])
+
+    def update_tags(self, updates: dict[int, list[str]]) -> StoreGeneration:
+        """
+        Replace the tags of the grants at the given ids within the current
+        epoch by appending them to the tag log. Returns the generation the
+        update produced.
+        """
+        with self.lock, self._lock():
+            generation = self._generation_unlocked()
+            generation = generation._replace(revision=generation.revision + 1)
+            self.tag_log.append(generation.revision, updates)
+            write_generation_file(self.generation_path, generation)
+            return generation
+
+    def generation(self) -> StoreGeneration:
+        generation = read_generation_file(self.generation_path)
+        if generation is not None:
+            return generation
+        with self.lock, self._lock():
+            return self._generation_unlocked()
+
+    def read_changes(self, since: StoreGeneration | None) -> StoreChanges:
+        with self.lock, self._lock():
+            generation = self._generation_unlocked()
+            if since is not None and since.epoch == generation.epoch:
+                # Updates up to since.revision only touched grants below
+                # since.count, so the later ones are all the new grants need.
+                folded, tag_updates = self.tag_log.changes(
+                    since.revision, generation.revision
+                )
+                # Otherwise updates the reader missed may have been folded
+                # into the segments by compaction; it has to start over.
+                if folded <= since.revision:
+                    grants = self._read_grants_unlocked(since.count, tag_updates)
+                    return StoreChanges(
+                        generation,
+                        grants,
+                        False,
+                        {g: t for g, t in tag_updates.items() if g < since.count},
+                    )
+            return StoreChanges(generation, self._read_grants_unlocked(), True, {})
+
+    def compact(self):
+        with self.lock, self._lock():
+            self._compact_unlocked()
+
+    def sync(self):
+        """fsync the active segment and any appends whose fsync was deferred."""
+        with self.lock, self._lock():
+            self._sync_timer = None
+            _, path = self._segments()[-1]
+            for name in self._unsynced | {str(path)}:
+                try:
+                    fd = os.open(name, os.O_RDONLY)
+                except FileNotFoundError:
+                    # Compacted away; its records were fsynced with the merge.
+                    continue
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self._unsynced.clear()
+            self._last_fsync = time.monotonic()
+
+    def close(self):
+        timer = self._sync_timer
+        if timer is not None:
+            timer.cancel()
+        if self._unsynced:
+            self.sync()
+
+    def export_json(self, path: str | Path):
+        grants = self.read_grants()
+        Path(path).write_bytes(dumps_grants(grants))
+
+    def import_json(self, path: str | Path):
+        data = loads(Path(path).read_bytes())
+        self.write_grants([Grant.from_dict(g) for g in data])
@@ -1,7 +1,186 @@
+import asyncio
+import hashlib
+import json
 import os
+import random
+import threading
 
+from src.disk_cache import DiskCache
 from src.tags import PREDEFINED_TAGS
 
+PROMPT_VERSION = "1"
+
+SYSTEM_PROMPT = (
+    "You are a precise grant categorization assistant. "
+    "Only return comma-separated tags from the provided list."
+)
+
+
+def build_prompt(
+    grant_name: str, grant_description: str, initial_tags: list[str]
+) -> str:
+    initial_tags_str = ", ".join(initial_tags)
+    available_tags_str = ", ".join(sorted(PREDEFINED_TAGS))
+
+    return f"""You are a grant categorization assistant. Given a grant and some \
+initial tags from keyword matching, your job is to:
+1. Re-rank the initial tags by relevance
+2. Add any missing relevant tags from the available tags list
+3. Remove any clearly incorrect tags
+
+IMPORTANT: You may ONLY use tags from the "Available tags" list. Do not invent \
+new tags.
+
+Grant Name: {grant_name}
+Grant Description: {grant_description}
+
+Initial tags (from keyword matching): {initial_tags_str}
+
+Available tags: {available_tags_str}
+
+Return ONLY a comma-separated list of tags, ordered by relevance. No explanations.
+Example: agriculture, education, youth, sustainability"""
+
+
+def build_messages(
+    grant_name: str, grant_description: str, initial_tags: list[str]
+) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": build_prompt(grant_name, grant_description, initial_tags),
+        },
+    ]
+
+
+def parse_tags(content: str, initial_tags: list[str]) -> list[str]:
+    predefined_set = set(PREDEFINED_TAGS)
+    refined_tags = [tag.strip().lower() for tag in content.strip().split(",")]
+
+    valid_tags = [tag for tag in refined_tags if tag in predefined_set]
+
+    return valid_tags if valid_tags else initial_tags
+
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a precise grant categorization assistant. "
+    "Only return JSON using tags from the provided list."
+)
+
+
+def build_batch_prompt(
+    items: list[tuple[str, str]], initial_tags: list[list[str]]
+) -> str:
+    available_tags_str = ", ".join(sorted(PREDEFINED_TAGS))
+    grants_str = "\n".join(
+        json.dumps(
+            {"id": i, "name": name, "description": description, "initial_tags": tags}
+        )
+        for i, ((name, description), tags) in enumerate(zip(items, initial_tags))
+    )
+
+    return f"""You are a grant categorization assistant. Below are several \
+grants, one JSON object per line, each with initial tags from keyword matching. \
+For every grant:
+1. Re-rank the initial tags by relevance
+2. Add any missing relevant tags from the available tags list
+3. Remove any clearly incorrect tags
+
+IMPORTANT: You may ONLY use tags from the "Available tags" list. Do not invent \
+new tags.
+
+Available tags: {available_tags_str}
+
+Grants:
+{grants_str}
+
+Return ONLY a JSON object with one entry per grant id, tags ordered by \
+relevance. No explanations.
+Example: {{"grants": [{{"id": 0, "tags": ["agriculture", "education"]}}]}}"""
+
+
+def build_batch_messages(
+    items: list[tuple[str, str]], initial_tags: list[list[str]]
+) -> list[dict]:
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": build_batch_prompt(items, initial_tags)},
+    ]
+
+
+def parse_batch_tags(content: str, count: int) -> list[list[str] | None]:
+    """
+    Per-grant tags from a batched response, or None for every grant whose
+    entry is missing, malformed or has no valid tags.
+    """
+    results: list[list[str] | None] = [None] * count
+    start, end = content.find("{"), content.rfind("}")
+    try:
+        entries = json.loads(content[start : end + 1])["grants"]
+    except (ValueError, TypeError, KeyError):
+        return results
+    if not isinstance(entries, list):
+        return results
+
+    predefined_set = set(PREDEFINED_TAGS)
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        grant_id, tags = entry.get("id"), entry.get("tags")
+        if type(grant_id) is not int or not 0 <= grant_id < count:
+            continue
+        if results[grant_id] is not None or not isinstance(tags, list):
+            continue
+        valid_tags = [
+            tag.strip().lower()
+            for tag in tags
+            if isinstance(tag, str) and tag.strip().lower() in predefined_set
+        ]
+        if valid_tags:
+            results[grant_id] = valid_tags
+    return results
+
+
+def llm_model() -> str:
+    return os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+
+def cache_key(grant_name: str, grant_description: str, initial_tags: list[str]) -> str:
+    payload = [
+        llm_model(),
+        PROMPT_VERSION,
+        sorted(PREDEFINED_TAGS),
+        grant_name,
+        grant_description,
+        initial_tags,
+    ]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+_cache: DiskCache | None = None
+
+
+def llm_cache() -> DiskCache | None:
+    """
+    Shared refinement cache, or None when ``LLM_CACHE_PATH`` is empty.
+
+    The cache lives in a SQLite file, so every worker process on the host
+    reads and fills the same entries.
+    """
+    global _cache
+    path = os.getenv("LLM_CACHE_PATH", "storage/llm_cache.db")
+    if not path:
+        return None
+    if _cache is None or _cache.path != DiskCache.resolve(path):
+        ttl = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+        _cache = DiskCache(
+            path,
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000")),
+            ttl=ttl or None,
+        )
+    return _cache
+
 
 def llm_refine(
     grant_name: str, grant_description: str, initial_tags: list[str]
@@ -29,28 +208,12 @@ def llm_refine(
     if not api_key:
         return initial_tags
 
-    predefined_set = set(PREDEFINED_TAGS)
-    initial_tags_str = ", ".join(initial_tags)
-    available_tags_str = ", ".join(sorted(PREDEFINED_TAGS))
-
-    prompt = f"""You are a grant categorization assistant. Given a grant and some \
-initial tags from keyword matching, your job is to:
-1. Re-rank the initial tags by relevance
-2. Add any missing relevant tags from the available tags list
-3. Remove any clearly incorrect tags
-
-IMPORTANT: You may ONLY use tags from the "Available tags" list. Do not invent \
-new tags.
-
-Grant Name: {grant_name}
-Grant Description: {grant_description}
-
-Initial tags (from keyword matching): {initial_tags_str}
-
-Available tags: {available_tags_str}
-
-Return ONLY a comma-separated list of tags, ordered by relevance. No explanations.
-Example: agriculture, education, youth, sustainability"""
+    cache = llm_cache()
+    key = cache_key(grant_name, grant_description, initial_tags)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
 
     try:
         import openai
@@ -58,29 +221,272 @@ Example: agriculture, education, youth, sustainability"""
         client = openai.OpenAI(api_key=api_key)
 
         response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a precise grant categorization assistant. "
-                        "Only return comma-separated tags from the provided list."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
+            model=llm_model(),
+            messages=build_messages(grant_name, grant_description, initial_tags),
             temperature=0.3,
             max_tokens=200,
         )
 
-        refined_tags_str = response.choices[0].message.content.strip()
-        refined_tags = [tag.strip().lower() for tag in refined_tags_str.split(",")]
-
-        valid_tags = [tag for tag in refined_tags if tag in predefined_set]
-
-        return valid_tags if valid_tags else initial_tags
+        refined = parse_tags(response.choices[0].message.content, initial_tags)
+        if cache is not None:
+            cache.set(key, json.dumps(refined))
+        return refined
 
     except ImportError:
         return initial_tags
     except Exception:
         return initial_tags
+
+
+class AsyncRefiner:
+    """
+    Concurrent LLM refinement for whole batches of grants.
+
+    One ``openai.AsyncOpenAI`` client (and its connection pool) lives on a
+    background event loop owned by this object, so every batch reuses it. At
+    most ``concurrency`` requests are in flight; rate-limited (429), timed
+    out and 5xx requests are retried with exponential backoff, honouring
+    ``Retry-After``. Grants still unrefined when the per-batch ``deadline``
+    expires, or whose request fails, keep their keyword tags.
+
+    Grants are sent ``batch_size`` per request, so the instructions and tag
+    list are paid for once per batch; any grant whose entry in the JSON reply
+    is malformed is retried on its own with the single-grant prompt.
+
+    Refinements are looked up in and written to ``cache`` (the shared
+    ``llm_cache()`` by default), so only unseen grants reach the network.
+    """
+
+    RETRYABLE_STATUS = {408, 409, 429}
+    # Grace period past ``deadline`` for cancelling stragglers; refine_many
+    # gives up on the background loop after ``deadline + RESULT_MARGIN``.
+    RESULT_MARGIN = 5.0
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        deadline: float | None = None,
+        max_retries: int | None = None,
+        backoff: float = 0.5,
+        client=None,
+        cache: DiskCache | None = None,
+        batch_size: int | None = None,
+    ):
+        self.concurrency = concurrency or int(os.getenv("LLM_CONCURRENCY", "8"))
+        self.deadline = (
+            deadline
+            if deadline is not None
+            else float(os.getenv("LLM_BATCH_DEADLINE", "60"))
+        )
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else int(os.getenv("LLM_MAX_RETRIES", "3"))
+        )
+        self.backoff = backoff
+        self.batch_size = batch_size or int(os.getenv("LLM_BATCH_SIZE", "10"))
+        self._client = client
+        self.cache = cache
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="llm-refine", daemon=True
+                ).start()
+            return self._loop
+
+    def _get_client(self):
+        if self._client is None:
+            import openai
+
+            self._client = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), max_retries=0
+            )
+        return self._client
+
+    def _retry_delay(self, exc: Exception, attempt: int) -> float | None:
+        status = getattr(exc, "status_code", None)
+        if status is None:
+            retryable = type(exc).__name__ in {"APIConnectionError", "APITimeoutError"}
+        else:
+            retryable = status in self.RETRYABLE_STATUS or status >= 500
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = headers.get("retry-after")
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return self.backoff * 2**attempt * (1 + random.random())
+
+    async def _complete(self, messages: list[dict], max_tokens: int = 200) -> str:
+        client = self._get_client()
+        attempt = 0
+        while True:
+            try:
+                response = await client.chat.completions.create(
+                    model=llm_model(),
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                )
+                return response.choices[0].message.content
+            except Exception as exc:
+                delay = self._retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _refine_one(
+        self,
+        semaphore: asyncio.Semaphore,
+        item: tuple[str, str],
+        initial_tags: list[str],
+    ) -> list[str]:
+        async with semaphore:
+            content = await self._complete(build_messages(*item, initial_tags))
+        return parse_tags(content, initial_tags)
+
+    async def _refine_batch(
+        self,
+        semaphore: asyncio.Semaphore,
+        items: list[tuple[str, str]],
+        initial_tags: list[list[str]],
+    ) -> list[list[str] | None]:
+        if len(items) == 1:
+            return [await self._refine_one(semaphore, items[0], initial_tags[0])]
+
+        async with semaphore:
+            content = await self._complete(
+                build_batch_messages(items, initial_tags), max_tokens=60 * len(items)
+            )
+        results = parse_batch_tags(content, len(items))
+
+        malformed = [i for i, tags in enumerate(results) if tags is None]
+        retried = await asyncio.gather(
+            *(
+                self._refine_one(semaphore, items[i], initial_tags[i])
+                for i in malformed
+            ),
+            return_exceptions=True,
+        )
+        for i, tags in zip(malformed, retried):
+            if not isinstance(tags, BaseException):
+                results[i] = tags
+        return results
+
+    async def _gather(
+        self, items: list[tuple[str, str]], initial_tags: list[list[str]]
+    ) -> list[list[str] | None]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bounds = [
+            (start, min(start + self.batch_size, len(items)))
+            for start in range(0, len(items), self.batch_size)
+        ]
+        tasks = [
+            asyncio.ensure_future(
+                self._refine_batch(semaphore, items[start:end], initial_tags[start:end])
+            )
+            for start, end in bounds
+        ]
+        if not tasks:
+            return []
+
+        await asyncio.wait(tasks, timeout=self.deadline)
+
+        results = []
+        for task, (start, end) in zip(tasks, bounds):
+            if not task.done():
+                task.cancel()
+                results.extend([None] * (end - start))
+            elif task.cancelled() or task.exception() is not None:
+                results.extend([None] * (end - start))
+            else:
+                results.extend(task.result())
+        return results
+
+    async def refine_many_async(
+        self, items: list[tuple[str, str]], initial_tags: list[list[str]]
+    ) -> list[list[str]]:
+        results = await self._gather(items, initial_tags)
+        return [
+            refined if refined is not None else tags
+            for refined, tags in zip(results, initial_tags)
+        ]
+
+    def refine_many(
+        self, items: list[tuple[str, str]], initial_tags: list[list[str]]
+    ) -> list[list[str]]:
+        if not items:
+            return []
+        if self._client is None and not os.getenv("OPENAI_API_KEY"):
+            return initial_tags
+
+        cache = self.cache if self.cache is not None else llm_cache()
+        keys = [cache_key(*item, tags) for item, tags in zip(items, initial_tags)]
+        cached = cache.get_many(keys) if cache is not None else {}
+
+        results = [
+            json.loads(cached[key]) if key in cached else tags
+            for key, tags in zip(keys, initial_tags)
+        ]
+        misses = [i for i, key in enumerate(keys) if key not in cached]
+        if not misses:
+            return results
+
+        future = None
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._gather(
+                    [items[i] for i in misses], [initial_tags[i] for i in misses]
+                ),
+                self._event_loop(),
+            )
+            refined = future.result(timeout=self.deadline + self.RESULT_MARGIN)
+        except Exception:
+            if future is not None:
+                future.cancel()
+            return results
+
+        fresh = {}
+        for i, tags in zip(misses, refined):
+            if tags is not None:
+                results[i] = tags
+                fresh[keys[i]] = json.dumps(tags)
+        if cache is not None:
+            cache.set_many(fresh)
+        return results
+
+
+_refiner: AsyncRefiner | None = None
+
+
+def _reset_after_fork():
+    """
+    Drop the refiner and cache a forked child inherits: the refiner's event
+    loop thread does not survive the fork, and the cache's SQLite connection
+    must not be shared with the parent.
+    """
+    global _refiner, _cache
+    _refiner = None
+    _cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def refine_many(
+    items: list[tuple[str, str]], initial_tags: list[list[str]]
+) -> list[list[str]]:
+    global _refiner
+    if _refiner is None:
+        _refiner = AsyncRefiner()
+    return _refiner.refine_many(items, initial_tags)
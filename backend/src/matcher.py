@@ -0,0 +1,172 @@
+import re
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+
+WORD_CACHE_SIZE = 100_000
+
+
+def _trie_pattern(needles: Iterable[str]) -> str:
+    trie: dict = {}
+    for needle in needles:
+        node = trie
+        for char in needle:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: dict) -> str:
+    branches = [
+        re.escape(char) + _node_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return f"(?:{body})?"
+    return body
+
+
+class KeywordMatcher:
+    """
+    Single-pass tag matcher compiled once per tag list and keyword map.
+
+    Tag names, their keywords and the stemmed tag words are folded into two
+    trie-shaped regexes, so a text is scanned once instead of once per keyword.
+    Each regex reports the longest needle starting at a position; every shorter
+    needle that is a prefix of it (and, for keywords, ends on a word boundary)
+    is matched there too, which keeps results identical to testing each needle
+    with its own ``re.search``.
+
+    Matches are tag bitmasks over ``self.tags`` (sorted), so a batch of texts
+    becomes one row per text of a text x tag match matrix.
+    """
+
+    def __init__(
+        self,
+        tags: list[str],
+        keyword_map: dict[str, list[str]],
+        stem: Callable[[str], str],
+    ):
+        self.stem = stem
+        self.tags = sorted(set(tags))
+        self._tag_bits = {tag: 1 << i for i, tag in enumerate(self.tags)}
+
+        substring_tags: dict[str, set[str]] = defaultdict(set)
+        for tag in tags:
+            substring_tags[tag.replace("-", " ")].add(tag)
+            substring_tags[tag].add(tag)
+
+        keyword_tags: dict[str, set[str]] = defaultdict(set)
+        for tag in tags:
+            for keyword in keyword_map.get(tag, []):
+                keyword_tags[keyword.lower()].add(tag)
+
+        stem_tags: dict[str, set[str]] = defaultdict(set)
+        for tag in tags:
+            for tag_word in tag.replace("-", " ").split():
+                stem_tags[stem(tag_word)].add(tag)
+
+        self._substring_regex = re.compile(
+            "(?=(" + _trie_pattern(substring_tags) + "))"
+        )
+        self._keyword_regex = re.compile(
+            r"\b(?=(" + _trie_pattern(keyword_tags) + r")\b)"
+        )
+
+        self._substring_hits = {
+            needle: self._expand(needle, substring_tags, bounded=False)
+            for needle in substring_tags
+        }
+        self._keyword_hits = {
+            keyword: self._expand(keyword, keyword_tags, bounded=True)
+            for keyword in keyword_tags
+        }
+        self._stem_hits = {
+            stem_word: self.encode(stem_word_tags)
+            for stem_word, stem_word_tags in stem_tags.items()
+        }
+        self._word_masks: dict[str, int] = {}
+
+    def _expand(
+        self, needle: str, needle_tags: dict[str, set[str]], bounded: bool
+    ) -> int:
+        tags: set[str] = set()
+        for prefix, prefix_tags in needle_tags.items():
+            if not needle.startswith(prefix):
+                continue
+            if bounded and not re.match(re.escape(prefix) + r"\b", needle):
+                continue
+            tags.update(prefix_tags)
+        return self.encode(tags)
+
+    def encode(self, tags: Iterable[str]) -> int:
+        row = 0
+        for tag in tags:
+            row |= self._tag_bits[tag]
+        return row
+
+    def decode(self, row: int) -> list[str]:
+        tags = []
+        while row:
+            lowest = row & -row
+            tags.append(self.tags[lowest.bit_length() - 1])
+            row ^= lowest
+        return tags
+
+    @staticmethod
+    def _scan(
+        regex: re.Pattern, hits: dict[str, int], joined: str, starts: list[int]
+    ) -> Iterator[tuple[int, int]]:
+        doc = 0
+        last_doc = len(starts) - 1
+        for found in regex.finditer(joined):
+            position = found.start()
+            while doc < last_doc and starts[doc + 1] <= position:
+                doc += 1
+            yield doc, hits[found.group(1)]
+
+    def match_matrix(self, normalized_texts: list[str]) -> list[int]:
+        """
+        Match a batch of normalized texts with one scan per regex over the
+        texts joined by NUL (a non-word character, so boundaries still hold).
+        Returns one tag bitmask per text; stems are computed once per distinct
+        word and remembered across calls.
+        """
+        if not normalized_texts:
+            return []
+
+        joined = "\x00".join(normalized_texts)
+        starts = []
+        offset = 0
+        for text in normalized_texts:
+            starts.append(offset)
+            offset += len(text) + 1
+
+        rows = [0] * len(normalized_texts)
+        for regex, hits in (
+            (self._substring_regex, self._substring_hits),
+            (self._keyword_regex, self._keyword_hits),
+        ):
+            for doc, mask in self._scan(regex, hits, joined, starts):
+                rows[doc] |= mask
+
+        word_masks = self._word_masks
+        if len(word_masks) > WORD_CACHE_SIZE:
+            word_masks.clear()
+        for doc, text in enumerate(normalized_texts):
+            row = rows[doc]
+            for word in set(text.split()):
+                mask = word_masks.get(word)
+                if mask is None:
+                    mask = word_masks[word] = self._stem_hits.get(self.stem(word), 0)
+                row |= mask
+            rows[doc] = row
+
+        return rows
+
+    def match(self, normalized: str) -> set[str]:
+        return set(self.decode(self.match_matrix([normalized])[0]))
@@ -1,21 +1,108 @@
-from dataclasses import dataclass, field
+import sys
+
+from src.tags import PREDEFINED_TAGS
+
+TAG_IDS = {tag: tag_id for tag_id, tag in enumerate(PREDEFINED_TAGS)}
+
+
+def encode_tags(tags: list[str]) -> bytes | tuple[str, ...]:
+    """
+    Tags as one byte per tag id into ``PREDEFINED_TAGS``, or as a tuple of
+    interned strings when a tag is not predefined (exact case is kept).
+    """
+    try:
+        return bytes(TAG_IDS[tag] for tag in tags)
+    except (KeyError, ValueError):
+        return tuple(sys.intern(tag) for tag in tags)
+
+
+def decode_tags(encoded: bytes | tuple[str, ...]) -> tuple[str, ...]:
+    if isinstance(encoded, bytes):
+        return tuple(PREDEFINED_TAGS[tag_id] for tag_id in encoded)
+    return encoded
+
+
+def _freeze_urls(urls: list[str] | None) -> tuple[str, ...] | None:
+    return tuple(urls) if urls is not None else None
+
+
+def _thaw_urls(urls: tuple[str, ...] | None) -> list[str] | None:
+    return list(urls) if urls is not None else None
 
 
-@dataclass
 class Grant:
-    grant_name: str
-    grant_description: str
-    tags: list[str] = field(default_factory=list)
-    website_urls: list[str] | None = field(default_factory=list)
-    document_urls: list[str] | None = field(default_factory=list)
+    """
+    A tagged grant.
+
+    Slotted, with tags held as tag ids (see ``encode_tags``) and URL lists as
+    tuples, so millions of indexed grants stay small. The ``tags`` and URL
+    attributes accept any list on assignment and read back as tuples, so
+    in-place edits such as ``grant.tags.append(...)`` fail instead of being
+    lost; assign a new list instead. ``to_dict`` returns plain lists.
+    """
+
+    __slots__ = (
+        "grant_name",
+        "grant_description",
+        "_tags",
+        "_website_urls",
+        "_document_urls",
+    )
+
+    def __init__(
+        self,
+        grant_name: str,
+        grant_description: str,
+        tags: list[str] | None = None,
+        website_urls: list[str] | None = (),
+        document_urls: list[str] | None = (),
+    ):
+        self.grant_name = grant_name
+        self.grant_description = grant_description
+        self.tags = tags if tags is not None else []
+        self.website_urls = website_urls
+        self.document_urls = document_urls
+
+    @property
+    def tags(self) -> tuple[str, ...]:
+        return decode_tags(self._tags)
+
+    @tags.setter
+    def tags(self, tags: list[str]):
+        self._tags = encode_tags(tags)
+
+    @property
+    def website_urls(self) -> tuple[str, ...] | None:
+        return self._website_urls
+
+    @website_urls.setter
+    def website_urls(self, urls: list[str] | None):
+        self._website_urls = _freeze_urls(urls)
+
+    @property
+    def document_urls(self) -> tuple[str, ...] | None:
+        return self._document_urls
+
+    @document_urls.setter
+    def document_urls(self, urls: list[str] | None):
+        self._document_urls = _freeze_urls(urls)
+
+    def with_tags(self, tags: list[str]) -> "Grant":
+        grant = Grant.__new__(Grant)
+        grant.grant_name = self.grant_name
+        grant.grant_description = self.grant_description
+        grant.tags = tags
+        grant._website_urls = self._website_urls
+        grant._document_urls = self._document_urls
+        return grant
 
     def to_dict(self):
         return {
             "grant_name": self.grant_name,
             "grant_description": self.grant_description,
-            "tags": self.tags,
-            "website_urls": self.website_urls,
-            "document_urls": self.document_urls,
+            "tags": list(self.tags),
+            "website_urls": _thaw_urls(self._website_urls),
+            "document_urls": _thaw_urls(self._document_urls),
         }
 
     @classmethod
@@ -27,3 +114,15 @@ class Grant:
             website_urls=data.get("website_urls", []),
             document_urls=data.get("document_urls", []),
         )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Grant):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    # Mutable, so unhashable, as the dataclass it replaced was.
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value!r}" for key, value in self.to_dict().items())
+        return f"Grant({fields})"
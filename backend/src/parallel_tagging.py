@@ -0,0 +1,72 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src.tagging import GrantTagger
+
+_worker_tagger: GrantTagger | None = None
+
+
+def _init_worker(use_llm: bool):
+    global _worker_tagger
+    _worker_tagger = GrantTagger(use_llm=use_llm)
+
+
+def _tag_chunk(chunk: list[tuple[str, str]]) -> list[list[str]]:
+    return _worker_tagger.tag_many(chunk)
+
+
+class ParallelTagger:
+    """
+    Tags large batches across a process pool, preserving input order.
+
+    Batches smaller than ``min_parallel`` (or a pool of one worker) are tagged
+    in the calling thread. The pool is created on first use and reused; each
+    worker process builds its own ``GrantTagger`` once.
+    """
+
+    def __init__(
+        self,
+        tagger: GrantTagger | None = None,
+        workers: int | None = None,
+        chunk_size: int | None = None,
+        min_parallel: int | None = None,
+    ):
+        self.tagger = tagger or GrantTagger()
+        self.workers = workers or int(
+            os.getenv("TAGGING_WORKERS", str(os.cpu_count() or 1))
+        )
+        self.chunk_size = chunk_size or int(os.getenv("TAGGING_CHUNK_SIZE", "0"))
+        self.min_parallel = (
+            min_parallel
+            if min_parallel is not None
+            else int(os.getenv("TAGGING_PARALLEL_MIN", "500"))
+        )
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.tagger.use_llm,),
+            )
+            atexit.register(self.shutdown)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def tag_many(self, items: list[tuple[str, str]]) -> list[list[str]]:
+        if self.workers <= 1 or len(items) < max(self.min_parallel, 2):
+            return self.tagger.tag_many(items)
+
+        chunk_size = self.chunk_size or max(1, -(-len(items) // (self.workers * 4)))
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        results = []
+        for chunk_tags in self._pool().map(_tag_chunk, chunks):
+            results.extend(chunk_tags)
+        return results
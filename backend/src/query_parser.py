@@ -0,0 +1,175 @@
+import re
+from typing import NamedTuple
+
+from src.synonyms import resolve_synonym
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+_KEYWORDS = {"and", "or", "not"}
+MAX_QUERY_DEPTH = 64
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+# Plan nodes are tuples, which compare by contents alone; the node kind is
+# part of equality and hashing so And((a, b)) and Or((a, b)) stay distinct
+# as dict keys (query cache) and when _combine drops repeated children.
+def _node_eq(self, other) -> bool:
+    return type(self) is type(other) and tuple.__eq__(self, other)
+
+
+def _node_ne(self, other) -> bool:
+    return not _node_eq(self, other)
+
+
+def _node_hash(self) -> int:
+    return hash((type(self).__name__, *self))
+
+
+class Term(NamedTuple):
+    tag: str
+
+    __eq__, __ne__, __hash__ = _node_eq, _node_ne, _node_hash
+
+
+class Not(NamedTuple):
+    child: "Node"
+
+    __eq__, __ne__, __hash__ = _node_eq, _node_ne, _node_hash
+
+
+class And(NamedTuple):
+    children: tuple["Node", ...]
+
+    __eq__, __ne__, __hash__ = _node_eq, _node_ne, _node_hash
+
+
+class Or(NamedTuple):
+    children: tuple["Node", ...]
+
+    __eq__, __ne__, __hash__ = _node_eq, _node_ne, _node_hash
+
+
+Node = Term | Not | And | Or
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise QuerySyntaxError(f"unterminated quote at position {position}")
+        opening, closing, phrase, word = match.groups()
+        if opening or closing:
+            tokens.append((opening or closing, ""))
+        elif phrase is not None:
+            tokens.append(("term", resolve_synonym(phrase)))
+        elif word.lower() in _KEYWORDS:
+            tokens.append((word.lower(), ""))
+        elif word.lower().startswith("tag:"):
+            tokens.append(("term", word[4:].lower()))
+        else:
+            tokens.append(("term", resolve_synonym(word)))
+        position = match.end()
+    return tokens
+
+
+def _combine(kind: type[And] | type[Or], nodes: list[Node]) -> Node:
+    if len(nodes) == 1:
+        return nodes[0]
+    children = []
+    for node in nodes:
+        children.extend(node.children if isinstance(node, kind) else [node])
+    children = tuple(dict.fromkeys(children))
+    return children[0] if len(children) == 1 else kind(children)
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def nest(self):
+        self.depth += 1
+        if self.depth > MAX_QUERY_DEPTH:
+            raise QuerySyntaxError(f"query nested deeper than {MAX_QUERY_DEPTH}")
+
+    def peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def take(self) -> tuple[str, str]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse_or(self) -> Node:
+        nodes = [self.parse_and()]
+        while self.peek() == "or":
+            self.take()
+            nodes.append(self.parse_and())
+        return _combine(Or, nodes)
+
+    def parse_and(self) -> Node:
+        nodes = [self.parse_not()]
+        while self.peek() in ("and", "not", "term", "("):
+            if self.peek() == "and":
+                self.take()
+            nodes.append(self.parse_not())
+        return _combine(And, nodes)
+
+    def parse_not(self) -> Node:
+        if self.peek() == "not":
+            self.take()
+            self.nest()
+            child = self.parse_not()
+            self.depth -= 1
+            return child.child if isinstance(child, Not) else Not(child)
+        return self.parse_primary()
+
+    def parse_primary(self) -> Node:
+        kind = self.peek()
+        if kind == "(":
+            self.take()
+            self.nest()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise QuerySyntaxError("missing closing parenthesis")
+            self.take()
+            self.depth -= 1
+            return node
+        if kind == "term":
+            return Term(self.take()[1])
+        if kind is None:
+            raise QuerySyntaxError("unexpected end of query")
+        raise QuerySyntaxError(f"unexpected {kind.upper()}")
+
+
+def parse_query(text: str) -> Node:
+    """
+    Parse a boolean tag query such as ``(water OR irrigation) AND rural NOT
+    dairy`` into a plan of ``Term``/``Not``/``And``/``Or`` nodes.
+
+    Adjacent terms are ANDed and NOT binds tightest. Bare words and quoted
+    phrases go through the synonym map; ``tag:<name>`` is taken literally.
+    Raises ``QuerySyntaxError`` for malformed queries, including ones nested
+    more than ``MAX_QUERY_DEPTH`` parentheses or NOTs deep.
+    """
+    parser = _Parser(_tokenize(text))
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise QuerySyntaxError(f"unexpected {parser.peek().upper()}")
+    return node
+
+
+def query_tags(node: Node) -> set[str]:
+    if isinstance(node, Term):
+        return {node.tag}
+    if isinstance(node, Not):
+        return query_tags(node.child)
+    return set().union(*(query_tags(child) for child in node.children))
@@ -0,0 +1,119 @@
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+from src.parallel_tagging import ParallelTagger
+from src.search_index import SearchIndex
+from src.tagging import GrantTagger
+
+KEYWORD_SNAPSHOT_PATH = Path(__file__).parent.parent / "storage" / "keyword_map.json"
+
+
+class KeywordMapDiff(NamedTuple):
+    keywords: set[str]
+    full: bool
+
+
+class RetagResult(NamedTuple):
+    candidates: int
+    updated: int
+    full: bool
+
+
+def load_keyword_snapshot(path: Path = KEYWORD_SNAPSHOT_PATH) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (json.JSONDecodeError, FileNotFoundError):
+        return None
+
+
+def save_keyword_snapshot(
+    tags: list[str],
+    keyword_map: dict[str, list[str]],
+    path: Path = KEYWORD_SNAPSHOT_PATH,
+):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(
+        json.dumps({"tags": sorted(tags), "keyword_map": keyword_map}, indent=2)
+    )
+    os.replace(tmp_path, path)
+
+
+def diff_keyword_maps(
+    snapshot: dict | None, tags: list[str], keyword_map: dict[str, list[str]]
+) -> KeywordMapDiff:
+    """
+    Keywords added to or removed from any tag since ``snapshot``.
+
+    Only those keywords can change which grants a tag matches. A changed tag
+    list also changes tag-name and stem matches, which are not keyword based,
+    so it (or a missing snapshot) needs a full re-tag.
+    """
+    if snapshot is None or set(snapshot["tags"]) != set(tags):
+        return KeywordMapDiff(set(), full=True)
+
+    keywords = set()
+    for tag in tags:
+        old = {keyword.lower() for keyword in snapshot["keyword_map"].get(tag, [])}
+        new = {keyword.lower() for keyword in keyword_map.get(tag, [])}
+        keywords |= old ^ new
+    return KeywordMapDiff(keywords, full=False)
+
+
+def retag_store(
+    store,
+    tagger: GrantTagger,
+    search_index: SearchIndex | None = None,
+    snapshot_path: Path = KEYWORD_SNAPSHOT_PATH,
+) -> RetagResult:
+    """
+    Bring stored tags up to date with the tagger's keyword map.
+
+    Only grants whose text contains an added or removed keyword are re-tagged,
+    found through the word index of ``search_index`` after it catches up with
+    the store. Pass the live or snapshot-loaded index so words are not indexed
+    again; a new index is built when none is given. Changed tags are written
+    with ``store.update_tags`` and ``search_index`` is refreshed to pick them
+    up in place. The keyword map is then saved as the new snapshot.
+    """
+    diff = diff_keyword_maps(
+        load_keyword_snapshot(snapshot_path), tagger.tags, tagger.keyword_map
+    )
+    if search_index is None:
+        search_index = SearchIndex()
+    search_index.refresh(store)
+    grants = search_index.grant_id_to_grant
+
+    if diff.full:
+        candidates = list(range(len(grants)))
+    else:
+        text_index = search_index.full_text_index()
+        ids = set()
+        for keyword in diff.keywords:
+            ids |= text_index.candidates(keyword)
+        candidates = sorted(ids)
+
+    parallel_tagger = ParallelTagger(tagger)
+    try:
+        new_tags = parallel_tagger.tag_many(
+            [
+                (grants[gid].grant_name, grants[gid].grant_description)
+                for gid in candidates
+            ]
+        )
+    finally:
+        parallel_tagger.shutdown()
+
+    updates = {
+        gid: tags
+        for gid, tags in zip(candidates, new_tags)
+        if tuple(tags) != grants[gid].tags
+    }
+    if updates:
+        store.update_tags(updates)
+        search_index.refresh(store)
+
+    save_keyword_snapshot(tagger.tags, tagger.keyword_map, snapshot_path)
+    return RetagResult(len(candidates), len(updates), diff.full)
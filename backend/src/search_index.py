@@ -1,18 +1,94 @@
+import heapq
+import math
+import os
 from collections import defaultdict
+from collections.abc import Callable, Iterator, MutableMapping
+from functools import reduce
+from itertools import islice
+from operator import and_, or_
+from pathlib import Path
+from threading import Lock
 
+from src.bitmap import Bitmap
+from src.grant_table import GrantObjects, GrantTable
+from src.index_snapshot import load_snapshot, write_snapshot
 from src.models import Grant
+from src.query_parser import And, Node, Not, Term
+from src.serialization import loads
+from src.store import StoreGeneration
+from src.text_index import TextIndex
+
+POSTING_TYPES = {"bitmap": Bitmap, "set": set}
+GRANT_STORAGE_TYPES = {"objects": GrantObjects, "table": GrantTable}
+
+# Above this many query tags, ranking scores each matching grant instead of
+# partitioning the result set by matched-tag combination.
+MAX_PARTITION_TAGS = 12
+
+SNAPSHOT_PATH = Path(__file__).parent.parent / os.getenv(
+    "SEARCH_INDEX_SNAPSHOT", "storage/search_index.snapshot"
+)
 
 
 class SearchIndex:
-    def __init__(self):
-        self.tag_to_grant_ids: dict[str, set[int]] = defaultdict(set)
-        self.grant_id_to_grant: dict[int, Grant] = {}
+    def __init__(self, postings: str = "bitmap", grants: str = "table"):
+        if postings not in POSTING_TYPES:
+            raise ValueError(f"Unknown posting list type: {postings}")
+        if grants not in GRANT_STORAGE_TYPES:
+            raise ValueError(f"Unknown grant storage type: {grants}")
+        self.postings = postings
+        self._posting_type = POSTING_TYPES[postings]
+        self._grant_storage_type = GRANT_STORAGE_TYPES[grants]
+        self.tag_to_grant_ids: dict[str, Bitmap | set[int]] = defaultdict(
+            self._posting_type
+        )
+        self.grant_id_to_grant: MutableMapping[int, Grant] = self._grant_storage_type()
+        self.text_index = TextIndex()
+        # Loads the word index saved with a snapshot, on first use.
+        self._saved_text_index: Callable[[], TextIndex] | None = None
         self._next_id = 0
+        self.source_generation: StoreGeneration | None = None
+        # Bumped on every change to the indexed grants, for result caches.
+        self.generation = 0
+        self._refresh_lock = Lock()
 
     def clear(self):
         self.tag_to_grant_ids.clear()
-        self.grant_id_to_grant.clear()
+        self.grant_id_to_grant = self._grant_storage_type()
+        self.text_index = TextIndex()
+        self._saved_text_index = None
         self._next_id = 0
+        self.source_generation = None
+        self.generation += 1
+
+    def load(
+        self,
+        postings: dict[str, Bitmap | set[int]],
+        grants: MutableMapping[int, Grant],
+        count: int,
+        generation: StoreGeneration | None,
+        text_index: Callable[[], TextIndex] | None = None,
+    ):
+        with self._refresh_lock:
+            self.clear()
+            self.tag_to_grant_ids.update(postings)
+            self.grant_id_to_grant = grants
+            self._next_id = count
+            self._saved_text_index = text_index
+            self.source_generation = generation
+            self.generation += 1
+
+    def save_snapshot(self, path):
+        self.full_text_index()
+        with self._refresh_lock:
+            write_snapshot(self, path)
+
+    def load_snapshot(self, path) -> bool:
+        """
+        Replace the index with a snapshot saved by ``save_snapshot``; a later
+        ``refresh`` continues from the store generation it was saved at.
+        """
+        return load_snapshot(self, path)
 
     def add_grants(self, grants: list[Grant]):
         for grant in grants:
@@ -25,32 +101,306 @@ class SearchIndex:
                 tag_normalized = tag.lower().strip()
                 self.tag_to_grant_ids[tag_normalized].add(grant_id)
 
+        if len(self.text_index) == self._next_id - len(grants):
+            self.text_index.add_grants(grants)
+        if grants:
+            self.generation += 1
+
+    def _update_tags_unlocked(self, updates: dict[int, list[str]]):
+        for grant_id, tags in updates.items():
+            grant = self.grant_id_to_grant[grant_id]
+            for tag in grant.tags:
+                self.tag_to_grant_ids[tag.lower().strip()].discard(grant_id)
+            for tag in tags:
+                self.tag_to_grant_ids[tag.lower().strip()].add(grant_id)
+            self.grant_id_to_grant[grant_id] = grant.with_tags(tags)
+        if updates:
+            self.generation += 1
+
+    def update_tags(self, updates: dict[int, list[str]]):
+        """
+        Move the given grants to their new tags' posting lists in place.
+        ``refresh`` does this for tag updates made through the store.
+        """
+        with self._refresh_lock:
+            self._update_tags_unlocked(updates)
+
     def rebuild(self, grants: list[Grant]):
         self.clear()
         self.add_grants(grants)
 
-    def search_by_tags(self, tags: list[str], mode: str = "all") -> list[Grant]:
+    def refresh(self, store):
+        """
+        Catch the index up with ``store`` by applying only the records added
+        and tags updated since the generation it last saw; rebuild only if the
+        store was rewritten. Cheap when nothing changed, so it can run on every
+        request.
+        """
+        if store.generation() == self.source_generation:
+            return
+
+        with self._refresh_lock:
+            changes = store.read_changes(self.source_generation)
+            if changes.reset:
+                self.clear()
+            self.add_grants(changes.grants)
+            self._update_tags_unlocked(changes.tag_updates)
+            self.source_generation = changes.generation
+
+    def _results(
+        self, ids: Iterator[int], fragments: bool
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        grants = self.grant_id_to_grant
+        if fragments:
+            return ((gid, grants.fragment(gid)) for gid in ids)
+        return ((gid, grants[gid]) for gid in ids)
+
+    def iter_grants(
+        self, after: int | None = None, fragments: bool = False
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        start = 0 if after is None else after + 1
+        return self._results(iter(range(start, self._next_id)), fragments)
+
+    def iter_search(
+        self,
+        tags: list[str],
+        mode: str = "all",
+        after: int | None = None,
+        fragments: bool = False,
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        """
+        Lazily yield ``(grant_id, grant)`` pairs matching ``tags`` in id order,
+        starting after the ``after`` cursor. With ``fragments`` the grant's
+        cached JSON encoding is yielded instead of the Grant.
+        """
         if not tags:
-            return []
+            return iter(())
 
         normalized_tags = [tag.lower().strip() for tag in tags]
 
         grant_id_sets = [
-            self.tag_to_grant_ids.get(tag, set()) for tag in normalized_tags
+            self.tag_to_grant_ids.get(tag) or self._posting_type()
+            for tag in normalized_tags
         ]
 
         if mode == "all":
-            if not grant_id_sets:
-                return []
-            matching_ids = set.intersection(*grant_id_sets)
+            matching_ids = reduce(and_, sorted(grant_id_sets, key=len))
         else:
-            matching_ids = set.union(*grant_id_sets) if grant_id_sets else set()
+            matching_ids = reduce(or_, grant_id_sets)
+
+        return self._results(self._ids_after(matching_ids, after), fragments)
+
+    def _ids_after(self, ids: Bitmap | set[int], after: int | None) -> Iterator[int]:
+        start = 0 if after is None else after + 1
+        if self.postings == "bitmap":
+            return ids.iter_from(start)
+        return (gid for gid in sorted(ids) if gid >= start)
+
+    def _universe(self) -> Bitmap | set[int]:
+        if self.postings == "bitmap":
+            return Bitmap.full(self._next_id)
+        return set(range(self._next_id))
+
+    def _estimate(self, node: Node) -> int:
+        if isinstance(node, Term):
+            return len(self.tag_to_grant_ids.get(node.tag) or ())
+        if isinstance(node, Not):
+            return self._next_id - self._estimate(node.child)
+        sizes = [self._estimate(child) for child in node.children]
+        if isinstance(node, And):
+            return min(sizes)
+        return min(sum(sizes), self._next_id)
+
+    def evaluate(self, node: Node) -> Bitmap | set[int]:
+        """
+        Grant ids matching a ``parse_query`` plan. ANDs intersect their
+        smallest estimated inputs first and subtract NOTs last, and both ANDs
+        and ORs stop as soon as the result can no longer change.
+        """
+        if isinstance(node, Term):
+            return self.tag_to_grant_ids.get(node.tag) or self._posting_type()
+        if isinstance(node, Not):
+            return self._universe() - self.evaluate(node.child)
 
-        return [self.grant_id_to_grant[gid] for gid in sorted(matching_ids)]
+        if isinstance(node, And):
+            negated = [child.child for child in node.children if isinstance(child, Not)]
+            required = sorted(
+                (child for child in node.children if not isinstance(child, Not)),
+                key=self._estimate,
+            )
+            result = self.evaluate(required[0]) if required else self._universe()
+            for child in required[1:]:
+                if not result:
+                    return result
+                result = result & self.evaluate(child)
+            for child in sorted(negated, key=self._estimate, reverse=True):
+                if not result:
+                    break
+                result = result - self.evaluate(child)
+            return result
 
+        result = self._posting_type()
+        for child in sorted(node.children, key=self._estimate, reverse=True):
+            if len(result) == self._next_id:
+                break
+            result = result | self.evaluate(child)
+        return result
 
-_global_index = SearchIndex()
+    def iter_query(
+        self, node: Node, after: int | None = None, fragments: bool = False
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        return self._results(self._ids_after(self.evaluate(node), after), fragments)
+
+    def _iter_ids(self, ids: Bitmap | set[int]) -> Iterator[int]:
+        return iter(ids) if self.postings == "bitmap" else iter(sorted(ids))
+
+    def _ranked_ids(
+        self,
+        postings: dict[str, Bitmap | set[int]],
+        idf: dict[str, float],
+        mode: str,
+        count: int,
+    ) -> Iterator[tuple[int, float]]:
+        if mode == "all":
+            matching = reduce(and_, sorted(postings.values(), key=len))
+            score = sum(idf.values())
+            return ((gid, score) for gid in self._iter_ids(matching))
+
+        if len(postings) > MAX_PARTITION_TAGS:
+            scores: dict[int, float] = defaultdict(float)
+            counts: dict[int, int] = defaultdict(int)
+            for tag, ids in postings.items():
+                for gid in ids:
+                    scores[gid] += idf[tag]
+                    counts[gid] += 1
+            ranked = heapq.nlargest(
+                count, scores, key=lambda gid: (counts[gid], scores[gid], -gid)
+            )
+            return ((gid, scores[gid]) for gid in ranked)
+
+        # Split the matches into groups sharing the same set of matched tags;
+        # every grant in a group has the same score, so only the groups are
+        # ordered and ids are read from the best groups until the page fills.
+        parts = [((), reduce(or_, postings.values()))]
+        for tag, ids in postings.items():
+            split = []
+            for matched, part in parts:
+                split += [((*matched, tag), part & ids), (matched, part - ids)]
+            parts = [(matched, part) for matched, part in split if part]
+
+        groups = defaultdict(list)
+        for matched, part in parts:
+            score = sum(idf[tag] for tag in matched)
+            groups[(len(matched), score)].append(self._iter_ids(part))
+        return (
+            (gid, key[1])
+            for key in sorted(groups, reverse=True)
+            for gid in heapq.merge(*groups[key])
+        )
+
+    def ranked_search(
+        self,
+        tags: list[str],
+        mode: str = "any",
+        limit: int = 20,
+        offset: int = 0,
+        fragments: bool = False,
+    ) -> list[tuple[int, Grant | bytes, float]]:
+        """
+        Return up to ``limit`` ``(grant_id, grant, score)`` matches for
+        ``tags``, best first, skipping the first ``offset``.
+
+        Grants matching more of the tags rank higher; ties go to the grants
+        whose matched tags are rarer, scored as the sum of their IDF
+        (``log(1 + N / df)`` over posting-list sizes), then to the lower id.
+        """
+        normalized_tags = {tag.lower().strip() for tag in tags}
+        postings = {
+            tag: self.tag_to_grant_ids[tag]
+            for tag in sorted(normalized_tags)
+            if self.tag_to_grant_ids.get(tag)
+        }
+        if not postings or (mode == "all" and len(postings) < len(normalized_tags)):
+            return []
+
+        idf = {
+            tag: math.log(1 + self._next_id / len(ids)) for tag, ids in postings.items()
+        }
+        ranked = list(
+            islice(
+                self._ranked_ids(postings, idf, mode, offset + limit),
+                offset,
+                offset + limit,
+            )
+        )
+        scores = dict(ranked)
+        return [
+            (gid, item, scores[gid])
+            for gid, item in self._results((gid for gid, _ in ranked), fragments)
+        ]
+
+    def full_text_index(self) -> TextIndex:
+        """
+        The word index over every grant. After a snapshot load it is only
+        built on first use: from the postings saved with the snapshot, then
+        for later grants from their stored JSON, so that mapped grants are not
+        all decoded and kept.
+        """
+        if len(self.text_index) < self._next_id:
+            with self._refresh_lock:
+                if self._saved_text_index is not None:
+                    self.text_index = self._saved_text_index()
+                    self._saved_text_index = None
+                grants = self.grant_id_to_grant
+                records = (
+                    loads(grants.fragment(gid))
+                    for gid in range(len(self.text_index), self._next_id)
+                )
+                self.text_index.add_texts(
+                    f"{record['grant_name']} {record['grant_description']}"
+                    for record in records
+                )
+        return self.text_index
+
+    def text_search(
+        self,
+        text: str,
+        node: Node | None = None,
+        limit: int = 20,
+        offset: int = 0,
+        fragments: bool = False,
+    ) -> list[tuple[int, Grant | bytes, float]]:
+        """
+        Return up to ``limit`` ``(grant_id, grant, score)`` BM25 matches for
+        the words of ``text`` in grant names and descriptions, best first,
+        skipping the first ``offset``. ``node`` restricts the matches to a
+        ``parse_query`` plan.
+        """
+        text_index = self.full_text_index()
+        within = self.evaluate(node) if node is not None else None
+        ranked = text_index.search(text, offset + limit, within)[offset:]
+        scores = dict(ranked)
+        return [
+            (gid, item, scores[gid])
+            for gid, item in self._results((gid for gid, _ in ranked), fragments)
+        ]
+
+    def search_by_tags(self, tags: list[str], mode: str = "all") -> list[Grant]:
+        return [grant for _, grant in self.iter_search(tags, mode)]
+
+
+_global_index = SearchIndex(
+    os.getenv("SEARCH_INDEX_POSTINGS", "bitmap"),
+    os.getenv("SEARCH_INDEX_GRANTS", "table"),
+)
 
 
 def get_search_index() -> SearchIndex:
     return _global_index
+
+
+def save_store_snapshot(store, path: Path = SNAPSHOT_PATH):
+    """Index every grant in ``store`` and save it as a snapshot for workers."""
+    index = SearchIndex()
+    index.refresh(store)
+    index.save_snapshot(path)
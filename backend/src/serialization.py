@@ -0,0 +1,124 @@
+import json
+from collections.abc import Iterable
+from json.encoder import encode_basestring_ascii
+from typing import Any
+
+from src.models import Grant, decode_tags
+from src.tags import PREDEFINED_TAGS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+_TAG_FRAGMENTS = [encode_basestring_ascii(tag) for tag in PREDEFINED_TAGS]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Grant):
+        # The stored tuples as they are; every backend encodes them as arrays,
+        # so unlike ``to_dict`` nothing is copied into lists.
+        return {
+            "grant_name": obj.grant_name,
+            "grant_description": obj.grant_description,
+            "tags": decode_tags(obj._tags),
+            "website_urls": obj._website_urls,
+            "document_urls": obj._document_urls,
+        }
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _encode_strings(values: Iterable[str] | None) -> str:
+    if values is None:
+        return "null"
+    return "[" + ",".join(map(encode_basestring_ascii, values)) + "]"
+
+
+def _encode_grant_stdlib(grant: Grant) -> str:
+    tags = grant._tags
+    if isinstance(tags, bytes):
+        tags_json = "[" + ",".join([_TAG_FRAGMENTS[tag_id] for tag_id in tags]) + "]"
+    else:
+        tags_json = _encode_strings(tags)
+    return (
+        '{"grant_name":'
+        + encode_basestring_ascii(grant.grant_name)
+        + ',"grant_description":'
+        + encode_basestring_ascii(grant.grant_description)
+        + ',"tags":'
+        + tags_json
+        + ',"website_urls":'
+        + _encode_strings(grant._website_urls)
+        + ',"document_urls":'
+        + _encode_strings(grant._document_urls)
+        + "}"
+    )
+
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON for ``obj``; ``Grant`` objects may appear anywhere in it."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    if msgspec is not None:
+        return _msgspec_encoder.encode(obj)
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as exc:
+            raise JSONDecodeError(str(exc), "", 0) from exc
+    return json.loads(data)
+
+
+def encode_grant(grant: Grant) -> bytes:
+    if BACKEND == "json":
+        return _encode_grant_stdlib(grant).encode()
+    return dumps(grant)
+
+
+def dumps_grants(grants: Iterable[Grant]) -> bytes:
+    """
+    A JSON array of grants, encoded straight from the ``Grant`` objects; the
+    stdlib fallback splices per-field strings rather than building dicts.
+    """
+    if BACKEND == "json":
+        return ("[" + ",".join(map(_encode_grant_stdlib, grants)) + "]").encode()
+    return dumps(list(grants))
+
+
+def join_fragments(fragments: Iterable[bytes]) -> bytes:
+    """A JSON array from already encoded elements."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def join_object(fields: dict[str, bytes]) -> bytes:
+    """A JSON object from already encoded values."""
+    return (
+        b"{"
+        + b",".join(dumps(key) + b":" + value for key, value in fields.items())
+        + b"}"
+    )
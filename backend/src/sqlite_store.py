@@ -0,0 +1,395 @@
+import json
+import math
+import sqlite3
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+from src.models import Grant
+from src.query_parser import And, Node, Not, Term
+from src.serialization import encode_grant
+from src.store import StoreChanges, StoreGeneration, new_epoch
+from src.text_index import tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS grants (
+    id INTEGER PRIMARY KEY,
+    grant_name TEXT NOT NULL,
+    grant_description TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    website_urls TEXT,
+    document_urls TEXT
+);
+CREATE TABLE IF NOT EXISTS grant_tags (
+    grant_id INTEGER NOT NULL REFERENCES grants (id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (grant_id, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_grant_tags_tag ON grant_tags (tag, grant_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS grants_fts USING fts5(
+    grant_name, grant_description, content='grants', content_rowid='id'
+);
+CREATE TABLE IF NOT EXISTS tag_updates (
+    grant_id INTEGER PRIMARY KEY REFERENCES grants (id) ON DELETE CASCADE,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tag_updates_revision ON tag_updates (revision);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+GRANT_COLUMNS = "id, grant_name, grant_description, tags, website_urls, document_urls"
+
+
+def _dumps_optional(value):
+    return json.dumps(value) if value is not None else None
+
+
+def _loads_optional(value):
+    return json.loads(value) if value is not None else None
+
+
+class SqliteGrantStore:
+    """
+    Grant store backed by SQLite in WAL mode.
+
+    Grants live in one table and their normalized tags in ``grant_tags``,
+    indexed by tag, so tag filters run as SQL instead of scanning every grant
+    in Python. Grant ids are their 0-based position in insertion order, the
+    same ids ``SearchIndex`` assigns. Each thread gets its own connection; WAL
+    lets gunicorn workers keep reading while one of them writes.
+    """
+
+    def __init__(self, storage_path: str = "storage/grants.db"):
+        self.storage_path = Path(__file__).parent.parent / storage_path
+        self._local = threading.local()
+        self._ensure_storage_exists()
+
+    def _ensure_storage_exists(self):
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'grants_fts'"
+        ).fetchone()
+        conn.executescript(SCHEMA)
+        if not has_fts:
+            # Databases created before the full-text index get it backfilled.
+            conn.execute("INSERT INTO grants_fts (grants_fts) VALUES ('rebuild')")
+        conn.execute(
+            "INSERT OR IGNORE INTO store_meta (key, value) VALUES ('epoch', ?)",
+            (new_epoch(),),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.storage_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_grant(row) -> Grant:
+        return Grant(
+            grant_name=row[1],
+            grant_description=row[2],
+            tags=json.loads(row[3]),
+            website_urls=_loads_optional(row[4]),
+            document_urls=_loads_optional(row[5]),
+        )
+
+    @staticmethod
+    def _insert_unlocked(conn: sqlite3.Connection, grants: list[Grant], start: int):
+        conn.executemany(
+            f"INSERT INTO grants ({GRANT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    start + offset,
+                    g.grant_name,
+                    g.grant_description,
+                    json.dumps(g.tags),
+                    _dumps_optional(g.website_urls),
+                    _dumps_optional(g.document_urls),
+                )
+                for offset, g in enumerate(grants)
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO grants_fts (rowid, grant_name, grant_description) "
+            "VALUES (?, ?, ?)",
+            [
+                (start + offset, g.grant_name, g.grant_description)
+                for offset, g in enumerate(grants)
+            ],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO grant_tags (grant_id, tag) VALUES (?, ?)",
+            [
+                (start + offset, tag.lower().strip())
+                for offset, g in enumerate(grants)
+                for tag in g.tags
+            ],
+        )
+
+    def read_grants(self) -> list[Grant]:
+        rows = self._connection().execute(
+            f"SELECT {GRANT_COLUMNS} FROM grants ORDER BY id"
+        )
+        return [self._row_to_grant(row) for row in rows]
+
+    def write_grants(self, grants: list[Grant]):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM grants")
+            conn.execute("INSERT INTO grants_fts (grants_fts) VALUES ('delete-all')")
+            conn.execute(
+                "UPDATE store_meta SET value = ? WHERE key = 'epoch'", (new_epoch(),)
+            )
+            self._insert_unlocked(conn, grants, 0)
+
+    def append_grants(self, new_grants: list[Grant]):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            (start,) = conn.execute(
+                "SELECT COALESCE(MAX(id) + 1, 0) FROM grants"
+            ).fetchone()
+            self._insert_unlocked(conn, new_grants, start)
+
+    def clear_grants(self):
+        self.write_grants([])
+
+    def update_tags(self, updates: dict[int, list[str]]) -> StoreGeneration:
+        """
+        Replace the tags of the grants at the given ids within the current
+        epoch, recording the new revision in ``tag_updates`` for
+        ``read_changes``. Returns the generation the update produced.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            revision = self._generation_unlocked(conn).revision + 1
+            conn.executemany(
+                "UPDATE grants SET tags = ? WHERE id = ?",
+                [(json.dumps(tags), grant_id) for grant_id, tags in updates.items()],
+            )
+            conn.executemany(
+                "DELETE FROM grant_tags WHERE grant_id = ?",
+                [(grant_id,) for grant_id in updates],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO grant_tags (grant_id, tag) VALUES (?, ?)",
+                [
+                    (grant_id, tag.lower().strip())
+                    for grant_id, tags in updates.items()
+                    for tag in tags
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO tag_updates (grant_id, revision) VALUES (?, ?)",
+                [(grant_id, revision) for grant_id in updates],
+            )
+            return self._generation_unlocked(conn)
+
+    @staticmethod
+    def _generation_unlocked(conn: sqlite3.Connection) -> StoreGeneration:
+        (epoch,) = conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'epoch'"
+        ).fetchone()
+        (count,) = conn.execute(
+            "SELECT COALESCE(MAX(id) + 1, 0) FROM grants"
+        ).fetchone()
+        (revision,) = conn.execute(
+            "SELECT COALESCE(MAX(revision), 0) FROM tag_updates"
+        ).fetchone()
+        return StoreGeneration(epoch, count, revision)
+
+    def generation(self) -> StoreGeneration:
+        return self._generation_unlocked(self._connection())
+
+    def read_changes(self, since: StoreGeneration | None) -> StoreChanges:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN")
+            generation = self._generation_unlocked(conn)
+            reset = since is None or since.epoch != generation.epoch
+            rows = conn.execute(
+                f"SELECT {GRANT_COLUMNS} FROM grants WHERE id >= ? ORDER BY id",
+                (0 if reset else since.count,),
+            ).fetchall()
+            tag_rows = (
+                []
+                if reset
+                else conn.execute(
+                    "SELECT grant_id, tags FROM tag_updates JOIN grants "
+                    "ON grants.id = grant_id WHERE revision > ? AND grant_id < ?",
+                    (since.revision, since.count),
+                ).fetchall()
+            )
+
+        return StoreChanges(
+            generation,
+            [self._row_to_grant(r) for r in rows],
+            reset,
+            {grant_id: json.loads(tags) for grant_id, tags in tag_rows},
+        )
+
+    def _results(self, rows, fragments: bool) -> Iterator[tuple[int, Grant | bytes]]:
+        if fragments:
+            return ((row[0], encode_grant(self._row_to_grant(row))) for row in rows)
+        return ((row[0], self._row_to_grant(row)) for row in rows)
+
+    def iter_grants(
+        self, after: int | None = None, fragments: bool = False
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        rows = self._connection().execute(
+            f"SELECT {GRANT_COLUMNS} FROM grants WHERE id > ? ORDER BY id",
+            (-1 if after is None else after,),
+        )
+        return self._results(rows, fragments)
+
+    def iter_search(
+        self,
+        tags: list[str],
+        mode: str = "all",
+        after: int | None = None,
+        fragments: bool = False,
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        if not tags:
+            return iter(())
+
+        normalized_tags = sorted({tag.lower().strip() for tag in tags})
+        placeholders = ", ".join("?" for _ in normalized_tags)
+
+        if mode == "all":
+            matching_ids = (
+                f"SELECT grant_id FROM grant_tags WHERE tag IN ({placeholders}) "
+                "GROUP BY grant_id HAVING COUNT(*) = ?"
+            )
+            params = [*normalized_tags, len(normalized_tags)]
+        else:
+            matching_ids = (
+                f"SELECT grant_id FROM grant_tags WHERE tag IN ({placeholders})"
+            )
+            params = normalized_tags
+
+        rows = self._connection().execute(
+            f"SELECT {GRANT_COLUMNS} FROM grants WHERE id IN ({matching_ids}) "
+            "AND id > ? ORDER BY id",
+            [*params, -1 if after is None else after],
+        )
+        return self._results(rows, fragments)
+
+    def _query_sql(self, node: Node, params: list) -> str:
+        if isinstance(node, Term):
+            params.append(node.tag)
+            return "id IN (SELECT grant_id FROM grant_tags WHERE tag = ?)"
+        if isinstance(node, Not):
+            return f"NOT ({self._query_sql(node.child, params)})"
+        joiner = " AND " if isinstance(node, And) else " OR "
+        return joiner.join(f"({self._query_sql(c, params)})" for c in node.children)
+
+    def iter_query(
+        self, node: Node, after: int | None = None, fragments: bool = False
+    ) -> Iterator[tuple[int, Grant | bytes]]:
+        """Grants matching a ``parse_query`` plan, filtered in SQL, in id order."""
+        params = []
+        condition = self._query_sql(node, params)
+        rows = self._connection().execute(
+            f"SELECT {GRANT_COLUMNS} FROM grants WHERE ({condition}) AND id > ? "
+            "ORDER BY id",
+            [*params, -1 if after is None else after],
+        )
+        return self._results(rows, fragments)
+
+    def text_search(
+        self,
+        text: str,
+        node: Node | None = None,
+        limit: int = 20,
+        offset: int = 0,
+        fragments: bool = False,
+    ) -> list[tuple[int, Grant | bytes, float]]:
+        """Same as ``SearchIndex.text_search``, ranked by FTS5's ``bm25()``."""
+        words = tokenize(text)
+        if not words:
+            return []
+
+        params = [" OR ".join(f'"{word}"' for word in dict.fromkeys(words))]
+        condition = self._query_sql(node, params) if node is not None else "1"
+        rows = (
+            self._connection()
+            .execute(
+                f"SELECT {GRANT_COLUMNS}, -rank_score FROM grants JOIN ("
+                "SELECT rowid AS hit_id, bm25(grants_fts) AS rank_score FROM grants_fts "
+                "WHERE grants_fts MATCH ?"
+                f") ON id = hit_id WHERE {condition} "
+                "ORDER BY rank_score, id LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            )
+            .fetchall()
+        )
+
+        scores = {row[0]: row[-1] for row in rows}
+        return [
+            (gid, item, scores[gid])
+            for gid, item in self._results((row[:-1] for row in rows), fragments)
+        ]
+
+    def ranked_search(
+        self,
+        tags: list[str],
+        mode: str = "any",
+        limit: int = 20,
+        offset: int = 0,
+        fragments: bool = False,
+    ) -> list[tuple[int, Grant | bytes, float]]:
+        """Same ranking as ``SearchIndex.ranked_search``, scored in SQL."""
+        normalized_tags = sorted({tag.lower().strip() for tag in tags})
+        if not normalized_tags:
+            return []
+
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in normalized_tags)
+        (total,) = conn.execute("SELECT COUNT(*) FROM grants").fetchone()
+        df = dict(
+            conn.execute(
+                f"SELECT tag, COUNT(*) FROM grant_tags WHERE tag IN ({placeholders}) "
+                "GROUP BY tag",
+                normalized_tags,
+            ).fetchall()
+        )
+        if not df or (mode == "all" and len(df) < len(normalized_tags)):
+            return []
+
+        idf = {tag: math.log(1 + total / count) for tag, count in sorted(df.items())}
+        cases = " ".join("WHEN ? THEN ?" for _ in idf)
+        having = "HAVING COUNT(*) = ?" if mode == "all" else ""
+        rows = conn.execute(
+            f"SELECT {GRANT_COLUMNS}, score FROM ("
+            f"SELECT grant_id, COUNT(*) AS matched, SUM(CASE tag {cases} END) AS score "
+            f"FROM grant_tags WHERE tag IN ({placeholders}) GROUP BY grant_id {having}"
+            ") JOIN grants ON id = grant_id "
+            "ORDER BY matched DESC, score DESC, id LIMIT ? OFFSET ?",
+            [
+                *(value for item in idf.items() for value in item),
+                *normalized_tags,
+                *([len(normalized_tags)] if mode == "all" else []),
+                limit,
+                offset,
+            ],
+        ).fetchall()
+
+        scores = {row[0]: row[-1] for row in rows}
+        return [
+            (gid, item, scores[gid])
+            for gid, item in self._results((row[:-1] for row in rows), fragments)
+        ]
+
+    def search_by_tags(self, tags: list[str], mode: str = "all") -> list[Grant]:
+        return [grant for _, grant in self.iter_search(tags, mode)]
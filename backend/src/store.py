@@ -1,13 +1,166 @@
+import fcntl
 import json
+import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from threading import Lock
+from typing import NamedTuple
 
 from src.models import Grant
+from src.serialization import JSONDecodeError, dumps, dumps_grants, loads
+
+
+class StoreGeneration(NamedTuple):
+    """
+    Position in a store's change feed.
+
+    ``epoch`` changes whenever the store is rewritten or cleared; ``count`` is
+    the number of grants appended since then and ``revision`` the number of
+    in-place tag updates. Two readers holding the same generation have seen
+    exactly the same grants.
+    """
+
+    epoch: int
+    count: int
+    revision: int = 0
+
+
+class StoreChanges(NamedTuple):
+    """
+    Grants appended since a generation, plus the new tags of earlier grants
+    updated in place since then. ``reset`` means the store was rewritten and
+    ``grants`` holds all of it.
+    """
+
+    generation: StoreGeneration
+    grants: list[Grant]
+    reset: bool
+    tag_updates: dict[int, list[str]]
+
+
+def new_epoch() -> int:
+    return time.time_ns()
+
+
+def read_generation_file(path: Path) -> StoreGeneration | None:
+    try:
+        data = json.loads(path.read_text())
+        return StoreGeneration(data["epoch"], data["count"], data.get("revision", 0))
+    except (json.JSONDecodeError, FileNotFoundError, KeyError, TypeError):
+        return None
+
+
+def write_generation_file(path: Path, generation: StoreGeneration):
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(generation._asdict()))
+    os.replace(tmp_path, path)
+
+
+class TagLog:
+    """
+    Tag updates a file store made in place since its epoch began, one JSON
+    line per update: ``{"revision": n, "tags": [[grant_id, tags], ...]}``.
+    Lets readers pick up re-tagged grants without the store starting a new
+    epoch, which would make every reader rebuild.
+
+    A store that writes logged tags into its grants can ``fold`` the log,
+    dropping those grants' updates; a leading ``{"folded": n}`` line then
+    records that revisions up to ``n`` are no longer complete.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def append(self, revision: int, updates: dict[int, list[str]]):
+        record = dumps({"revision": revision, "tags": list(updates.items())})
+        with open(self.path, "a+b") as f:
+            # Start on a fresh line if a crash left a partial one behind.
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    record = b"\n" + record
+            f.write(record + b"\n")
+
+    def changes(
+        self, since: int = 0, until: int | None = None
+    ) -> tuple[int, dict[int, list[str]]]:
+        """
+        The revision the log was folded up to, and the latest tags per grant
+        over revisions ``since`` (exclusive) through ``until``; later
+        revisions, left by an update that never finished, and torn lines are
+        ignored.
+        """
+        folded = 0
+        updates = {}
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except JSONDecodeError:
+                        continue
+                    revision = record.get("revision")
+                    if revision is None:
+                        folded = record.get("folded", folded)
+                    elif since < revision and (until is None or revision <= until):
+                        updates.update(record["tags"])
+        except FileNotFoundError:
+            pass
+        return folded, updates
+
+    def read(self, since: int = 0, until: int | None = None) -> dict[int, list[str]]:
+        return self.changes(since, until)[1]
+
+    def fold(self, revision: int, count: int):
+        """
+        Drop the updates of grants below ``count``, whose tags as of
+        ``revision`` the caller has written into the grants themselves.
+        """
+        lines = [dumps({"folded": revision})]
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except JSONDecodeError:
+                        continue
+                    tags = [
+                        entry for entry in record.get("tags", ()) if entry[0] >= count
+                    ]
+                    if tags:
+                        lines.append(
+                            dumps({"revision": record["revision"], "tags": tags})
+                        )
+        except FileNotFoundError:
+            pass
+
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(line + b"\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False):
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
 
 
 class GrantStore:
     def __init__(self, storage_path: str = "storage/grants.json"):
         self.storage_path = Path(__file__).parent.parent / storage_path
+        self.generation_path = self.storage_path.with_suffix(".generation")
+        self.tag_log = TagLog(self.storage_path.with_suffix(".tags.jsonl"))
         self.lock = Lock()
         self._ensure_storage_exists()
 
@@ -16,31 +169,110 @@ class GrantStore:
         if not self.storage_path.exists():
             self.storage_path.write_text("[]")
 
+    def _lock(self, shared: bool = False):
+        return file_lock(self.storage_path.with_suffix(".lock"), shared=shared)
+
     def _read_grants_unlocked(self) -> list[Grant]:
         try:
-            data = json.loads(self.storage_path.read_text())
+            data = loads(self.storage_path.read_bytes())
             return [Grant.from_dict(g) for g in data]
-        except (json.JSONDecodeError, FileNotFoundError):
+        except (JSONDecodeError, FileNotFoundError):
             return []
 
     def _write_grants_unlocked(self, grants: list[Grant]):
-        data = [g.to_dict() for g in grants]
-        self.storage_path.write_text(json.dumps(data, indent=2))
+        self.storage_path.write_bytes(dumps_grants(grants))
+
+    def _generation_unlocked(self) -> StoreGeneration:
+        generation = read_generation_file(self.generation_path)
+        if generation is None:
+            generation = StoreGeneration(new_epoch(), len(self._read_grants_unlocked()))
+            write_generation_file(self.generation_path, generation)
+        return generation
 
     def read_grants(self) -> list[Grant]:
-        with self.lock:
+        with self.lock, self._lock(shared=True):
             return self._read_grants_unlocked()
 
     def write_grants(self, grants: list[Grant]):
-        with self.lock:
+        with self.lock, self._lock():
             self._write_grants_unlocked(grants)
+            self.tag_log.clear()
+            write_generation_file(
+                self.generation_path, StoreGeneration(new_epoch(), len(grants))
+            )
 
     def append_grants(self, new_grants: list[Grant]):
-        with self.lock:
+        with self.lock, self._lock():
+            generation = self._generation_unlocked()
             existing = self._read_grants_unlocked()
             existing.extend(new_grants)
             self._write_grants_unlocked(existing)
+            write_generation_file(
+                self.generation_path, generation._replace(count=len(existing))
+            )
 
     def clear_grants(self):
-        with self.lock:
-            self.storage_path.write_text("[]")
+        self.write_grants([])
+
+    def update_tags(self, updates: dict[int, list[str]]) -> StoreGeneration:
+        """
+        Replace the tags of the grants at the given ids within the current
+        epoch, logging them for ``read_changes``. Returns the generation the
+        update produced.
+        """
+        with self.lock, self._lock():
+            generation = self._generation_unlocked()
+            grants = self._read_grants_unlocked()
+            for grant_id, tags in updates.items():
+                grants[grant_id].tags = tags
+            self._write_grants_unlocked(grants)
+            generation = generation._replace(revision=generation.revision + 1)
+            self.tag_log.append(generation.revision, updates)
+            write_generation_file(self.generation_path, generation)
+            return generation
+
+    def generation(self) -> StoreGeneration:
+        generation = read_generation_file(self.generation_path)
+        if generation is not None:
+            return generation
+        with self.lock, self._lock():
+            return self._generation_unlocked()
+
+    def read_changes(self, since: StoreGeneration | None) -> StoreChanges:
+        with self.lock, self._lock():
+            generation = self._generation_unlocked()
+            grants = self._read_grants_unlocked()
+            if (
+                since is None
+                or since.epoch != generation.epoch
+                or since.count > len(grants)
+            ):
+                return StoreChanges(generation, grants, True, {})
+            tag_updates = self.tag_log.read(since.revision, generation.revision)
+
+        return StoreChanges(
+            generation,
+            grants[since.count :],
+            False,
+            {gid: tags for gid, tags in tag_updates.items() if gid < since.count},
+        )
+
+
+def create_store(backend: str | None = None):
+    backend = (backend or os.getenv("GRANT_STORE", "json")).lower()
+
+    if backend == "json":
+        return GrantStore()
+    if backend == "jsonl":
+        from src.jsonl_store import JsonlGrantStore
+
+        return JsonlGrantStore(
+            fsync_interval=float(os.getenv("GRANT_STORE_FSYNC_INTERVAL", "0"))
+        )
+
+    if backend == "sqlite":
+        from src.sqlite_store import SqliteGrantStore
+
+        return SqliteGrantStore()
+
+    raise ValueError(f"Unknown grant store backend: {backend}")
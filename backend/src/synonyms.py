@@ -1,3 +1,7 @@
+import os
+
+from src.lru import LRUCache
+
 SYNONYM_MAP = {
     "learning": "education",
     "teach": "education",
@@ -75,22 +79,70 @@ SYNONYM_MAP = {
 }
 
 
+def tokenize_query(text: str) -> list[str]:
+    return text.lower().replace("-", " ").split()
+
+
+class PhraseTrie:
+    """
+    Token trie over synonym phrases for greedy longest-match resolution.
+
+    Each node is a dict of next token -> node; a node that ends a phrase keeps
+    its canonical tag under the ``None`` key. ``resolve`` walks the query once,
+    taking the longest phrase starting at each position and passing through
+    tokens that start none.
+    """
+
+    def __init__(self, synonyms: dict[str, str] | None = None):
+        self.root: dict = {}
+        for phrase, canonical in (synonyms or {}).items():
+            self.add(phrase, canonical)
+
+    def add(self, phrase: str, canonical: str):
+        node = self.root
+        for token in tokenize_query(phrase):
+            node = node.setdefault(token, {})
+        node[None] = canonical
+
+    def resolve(self, tokens: list[str]) -> list[str]:
+        resolved = []
+        position = 0
+        while position < len(tokens):
+            node = self.root
+            match, end = None, position
+            for index in range(position, len(tokens)):
+                node = node.get(tokens[index])
+                if node is None:
+                    break
+                if None in node:
+                    match, end = node[None], index
+            if match is None:
+                resolved.append(tokens[position])
+                position += 1
+            else:
+                resolved.append(match)
+                position = end + 1
+        return resolved
+
+
+SYNONYM_TRIE = PhraseTrie(SYNONYM_MAP)
+
+_resolved_queries = LRUCache(int(os.getenv("QUERY_CACHE_SIZE", "4096")))
+
+
 def resolve_synonym(term: str) -> str:
     normalized = term.lower().strip()
     return SYNONYM_MAP.get(normalized, normalized)
 
 
 def resolve_query(query: str) -> set[str]:
-    tokens = query.lower().replace("-", " ").split()
-    resolved_tags = set()
-
-    for token in tokens:
-        canonical = resolve_synonym(token)
-        resolved_tags.add(canonical)
-
-    multi_word = query.lower().strip()
-    canonical = resolve_synonym(multi_word)
-    if canonical != multi_word:
-        resolved_tags.add(canonical)
-
-    return resolved_tags
+    """
+    Resolve a free-text query to tags: synonym phrases are matched longest
+    first (so "soil health" is one tag, not two), other words pass through.
+    Results are memoized; callers get their own copy.
+    """
+    resolved = _resolved_queries.get(query)
+    if resolved is None:
+        resolved = frozenset(SYNONYM_TRIE.resolve(tokenize_query(query)))
+        _resolved_queries.put(query, resolved)
+    return set(resolved)
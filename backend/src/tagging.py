@@ -1,6 +1,11 @@
+import hashlib
+import json
 import os
 import re
 
+from src.disk_cache import DiskCache
+from src.lru import LRUCache
+from src.matcher import KeywordMatcher
 from src.tags import PREDEFINED_TAGS
 
 KEYWORD_MAP = {
@@ -119,11 +124,39 @@ KEYWORD_MAP = {
 }
 
 
+def tagging_fingerprint(tags: list[str], keyword_map: dict[str, list[str]]) -> str:
+    payload = json.dumps([sorted(tags), keyword_map], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
 class GrantTagger:
-    def __init__(self, use_llm: bool = False):
+    """
+    Keyword tagger with memoized results.
+
+    Keyword tags are cached per normalized text, keyed by its hash together
+    with a fingerprint of the tag list and keyword map, so editing either one
+    invalidates every earlier entry. The in-memory tier holds ``cache_size``
+    entries (``TAG_CACHE_SIZE``, 0 disables it); ``cache_path``
+    (``TAG_CACHE_PATH``) adds a DiskCache tier shared between processes.
+    """
+
+    def __init__(
+        self,
+        use_llm: bool = False,
+        cache_size: int | None = None,
+        cache_path: str | None = None,
+    ):
         self.keyword_map = KEYWORD_MAP
         self.tags = PREDEFINED_TAGS
         self.use_llm = use_llm or os.getenv("USE_LLM", "false").lower() == "true"
+        self.matcher = KeywordMatcher(self.tags, self.keyword_map, self.simple_stem)
+        self.fingerprint = tagging_fingerprint(self.tags, self.keyword_map)
+
+        if cache_size is None:
+            cache_size = int(os.getenv("TAG_CACHE_SIZE", "10000"))
+        self.cache = LRUCache(cache_size)
+        cache_path = cache_path or os.getenv("TAG_CACHE_PATH")
+        self.disk_cache = DiskCache(cache_path) if cache_path else None
 
     def normalize_text(self, text: str) -> str:
         text = text.lower()
@@ -140,49 +173,74 @@ class GrantTagger:
             return word[:-1]
         return word
 
-    def tag_grant(self, grant_name: str, grant_description: str) -> list[str]:
-        combined_text = f"{grant_name} {grant_description}"
-        normalized = self.normalize_text(combined_text)
-
-        matched_tags: set[str] = set()
-
-        for tag in self.tags:
-            tag_normalized = tag.replace("-", " ")
-
-            if tag_normalized in normalized or tag in normalized:
-                matched_tags.add(tag)
-                continue
-
-            keywords = self.keyword_map.get(tag, [])
-            for keyword in keywords:
-                keyword_pattern = r"\b" + re.escape(keyword.lower()) + r"\b"
-                if re.search(keyword_pattern, normalized):
-                    matched_tags.add(tag)
-                    break
-
-        words = normalized.split()
-        stemmed_words = [self.simple_stem(w) for w in words]
-
-        for tag in self.tags:
-            if tag in matched_tags:
-                continue
-
-            tag_words = tag.replace("-", " ").split()
-            for tag_word in tag_words:
-                stemmed_tag = self.simple_stem(tag_word)
-                if stemmed_tag in stemmed_words:
-                    matched_tags.add(tag)
-                    break
-
-        initial_tags = sorted(list(matched_tags))
+    def normalize_many(self, texts: list[str]) -> list[str]:
+        joined = "\x00".join(text.replace("\x00", " ") for text in texts).lower()
+        joined = re.sub(r"[^\w\s\x00-]", " ", joined)
+        joined = re.sub(r"\s+", " ", joined)
+        return [text.strip() for text in joined.split("\x00")]
+
+    def cache_key(self, normalized: str) -> str:
+        return hashlib.sha256(
+            f"{self.fingerprint}\x00{normalized}".encode()
+        ).hexdigest()
+
+    def keyword_tags_many(self, normalized: list[str]) -> list[list[str]]:
+        if self.cache.maxsize <= 0 and self.disk_cache is None:
+            return [
+                self.matcher.decode(row)
+                for row in self.matcher.match_matrix(normalized)
+            ]
+
+        keys = [self.cache_key(text) for text in normalized]
+        found: dict[str, tuple[str, ...]] = {}
+        for key in keys:
+            tags = self.cache.get(key)
+            if tags is not None:
+                found[key] = tags
+
+        missing = {key: text for key, text in zip(keys, normalized) if key not in found}
+        if missing and self.disk_cache is not None:
+            for key, value in self.disk_cache.get_many(list(missing)).items():
+                found[key] = tuple(json.loads(value))
+                self.cache.put(key, found[key])
+                del missing[key]
+
+        if missing:
+            rows = self.matcher.match_matrix(list(missing.values()))
+            computed = {
+                key: tuple(self.matcher.decode(row)) for key, row in zip(missing, rows)
+            }
+            for key, tags in computed.items():
+                self.cache.put(key, tags)
+            if self.disk_cache is not None:
+                self.disk_cache.set_many(
+                    {key: json.dumps(tags) for key, tags in computed.items()}
+                )
+            found.update(computed)
+
+        return [list(found[key]) for key in keys]
+
+    def tag_many(self, items: list[tuple[str, str]]) -> list[list[str]]:
+        if not items:
+            return []
+
+        normalized = self.normalize_many(
+            [
+                f"{grant_name} {grant_description}"
+                for grant_name, grant_description in items
+            ]
+        )
+        all_tags = self.keyword_tags_many(normalized)
 
         if self.use_llm:
             try:
-                from src.llm_refine import llm_refine
+                from src.llm_refine import refine_many
 
-                refined_tags = llm_refine(grant_name, grant_description, initial_tags)
-                return refined_tags
+                all_tags = refine_many(items, all_tags)
             except Exception:
                 pass
 
-        return initial_tags
+        return all_tags
+
+    def tag_grant(self, grant_name: str, grant_description: str) -> list[str]:
+        return self.tag_many([(grant_name, grant_description)])[0]
@@ -0,0 +1,143 @@
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Container, Iterable
+
+from src.models import Grant
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# BM25 parameters, the same defaults SQLite's FTS5 bm25() uses.
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+class TextIndex:
+    """
+    Word -> grant id posting lists over grant names and descriptions.
+
+    Words are the ``\\w+`` runs of the lowercased text, which is also where
+    ``KeywordMatcher`` puts word boundaries, so every grant a keyword matches
+    contains all of that keyword's words. Postings are compact ``array``
+    columns of ascending ids, built in the order grants are added, with each
+    word's in-grant counts and every grant's length kept alongside for BM25.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, array] = {}
+        self.frequencies: dict[str, array] = {}
+        self.lengths = array("I")
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return self._next_id
+
+    @classmethod
+    def from_postings(
+        cls,
+        postings: dict[str, array],
+        frequencies: dict[str, array],
+        lengths: array,
+    ) -> "TextIndex":
+        """An index over ``len(lengths)`` grants from saved posting columns."""
+        index = cls()
+        index.postings = postings
+        index.frequencies = frequencies
+        index.lengths = lengths
+        index._total_length = sum(lengths)
+        index._next_id = len(lengths)
+        return index
+
+    def add_grants(self, grants: Iterable[Grant]):
+        self.add_texts(f"{g.grant_name} {g.grant_description}" for g in grants)
+
+    def add_texts(self, texts: Iterable[str]):
+        """Index the next grants by the text of their name and description."""
+        for text in texts:
+            grant_id = self._next_id
+            self._next_id += 1
+
+            words = tokenize(text)
+            self.lengths.append(len(words))
+            self._total_length += len(words)
+            for word, count in Counter(words).items():
+                posting = self.postings.get(word)
+                if posting is None:
+                    posting = self.postings[word] = array("I")
+                    self.frequencies[word] = array("H")
+                posting.append(grant_id)
+                self.frequencies[word].append(min(count, 0xFFFF))
+
+    def candidates(self, phrase: str) -> set[int]:
+        """Ids of the grants containing every word of ``phrase``."""
+        words = sorted(
+            set(tokenize(phrase)), key=lambda word: len(self.postings.get(word, ()))
+        )
+        if not words:
+            return set()
+
+        ids = set(self.postings.get(words[0], ()))
+        for word in words[1:]:
+            if not ids:
+                break
+            ids.intersection_update(self.postings.get(word, ()))
+        return ids
+
+    def _idf(self, word: str) -> float:
+        count = len(self.postings[word])
+        return max(math.log((self._next_id - count + 0.5) / (count + 0.5)), 1e-6)
+
+    def search(
+        self, text: str, limit: int, within: Container[int] | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        The ``limit`` best ``(grant_id, score)`` BM25 matches for any word of
+        ``text``, best first, optionally only among the ids in ``within``.
+
+        Words are scored rarest first. Once the ``limit``-th best score beats
+        what the remaining words could add to a grant none of them has been
+        seen with, those words' postings are not scanned; they are only
+        looked up (by bisection) for grants already scored.
+        """
+        words = sorted(
+            {word for word in tokenize(text) if word in self.postings},
+            key=lambda word: len(self.postings[word]),
+        )
+        if not words or limit <= 0:
+            return []
+
+        average_length = self._total_length / self._next_id
+        lengths = self.lengths
+        idf = {word: self._idf(word) for word in words}
+        remaining = sum(idf.values()) * (K1 + 1)
+        scores: dict[int, float] = defaultdict(float)
+
+        def term_score(word: str, grant_id: int, count: int) -> float:
+            norm = K1 * (1 - B + B * lengths[grant_id] / average_length)
+            return idf[word] * count * (K1 + 1) / (count + norm)
+
+        for word in words:
+            posting, counts = self.postings[word], self.frequencies[word]
+            best = heapq.nlargest(limit, scores.values())
+            if len(best) == limit and best[-1] >= remaining:
+                for grant_id in list(scores):
+                    index = bisect_left(posting, grant_id)
+                    if index < len(posting) and posting[index] == grant_id:
+                        scores[grant_id] += term_score(word, grant_id, counts[index])
+            else:
+                for grant_id, count in zip(posting, counts):
+                    if within is None or grant_id in within:
+                        scores[grant_id] += term_score(word, grant_id, count)
+            remaining -= idf[word] * (K1 + 1)
+
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
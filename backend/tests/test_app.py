@@ -288,3 +288,342 @@ def test_advanced_search_empty_query(client):
 def test_advanced_search_invalid_mode(client):
     response = client.get("/api/search/advanced?q=test&mode=invalid")
     assert response.status_code == 400
+
+
+def test_search_grants_matches_advanced_search_all_mode(client):
+    grants_input = [
+        {"grant_name": "Farm Grant", "grant_description": "Soil and crops."},
+        {"grant_name": "Soil Grant", "grant_description": "Soil testing for farming."},
+        {"grant_name": "School Grant", "grant_description": "Teaching students."},
+    ]
+
+    client.post(
+        "/api/grants/batch",
+        data=json.dumps(grants_input),
+        content_type="application/json",
+    )
+
+    search = client.get("/api/search?tags=Soil, agriculture").get_json()
+    advanced = client.get("/api/search/advanced?tags=soil,agriculture&mode=all")
+
+    assert [g["grant_name"] for g in search] == ["Farm Grant", "Soil Grant"]
+    assert search == advanced.get_json()["grants"]
+    assert client.get("/api/search?tags=soil,").get_json() == []
+
+
+def post_numbered_grants(client, count):
+    grants_input = [
+        {
+            "grant_name": f"Farm Grant {i}",
+            "grant_description": "Supporting agricultural producers.",
+        }
+        for i in range(count)
+    ]
+    client.post(
+        "/api/grants/batch",
+        data=json.dumps(grants_input),
+        content_type="application/json",
+    )
+
+
+def test_get_grants_cursor_pagination(client):
+    post_numbered_grants(client, 5)
+
+    names = []
+    url = "/api/grants?limit=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 2
+        names.extend(g["grant_name"] for g in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/api/grants?limit=2&cursor={cursor}" if cursor else None
+
+    assert names == [f"Farm Grant {i}" for i in range(5)]
+
+
+def test_search_pagination(client):
+    post_numbered_grants(client, 3)
+
+    response = client.get("/api/search?tags=agriculture&limit=2")
+    assert [g["grant_name"] for g in response.get_json()] == [
+        "Farm Grant 0",
+        "Farm Grant 1",
+    ]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/search?tags=agriculture&limit=2&cursor={cursor}")
+    assert [g["grant_name"] for g in response.get_json()] == ["Farm Grant 2"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_advanced_search_pagination(client):
+    post_numbered_grants(client, 3)
+
+    data = client.get("/api/search/advanced?q=farming&limit=2").get_json()
+    assert len(data["grants"]) == 2
+    assert data["next_cursor"] is not None
+
+    data = client.get(
+        f"/api/search/advanced?q=farming&limit=2&cursor={data['next_cursor']}"
+    ).get_json()
+    assert [g["grant_name"] for g in data["grants"]] == ["Farm Grant 2"]
+    assert data["next_cursor"] is None
+
+
+def test_advanced_search_ndjson_stream(client):
+    post_numbered_grants(client, 3)
+
+    response = client.get("/api/search/advanced?q=farming&format=ndjson&limit=2")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["X-Resolved-Tags"] == "agriculture"
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["grant_name"] for line in lines] == [
+        "Farm Grant 0",
+        "Farm Grant 1",
+    ]
+
+
+def test_pagination_invalid_params(client):
+    assert client.get("/api/grants?limit=0").status_code == 400
+    assert client.get("/api/grants?limit=abc").status_code == 400
+    assert client.get("/api/search?tags=soil&cursor=-1").status_code == 400
+
+
+def test_grants_etag_returns_304_until_store_changes(client):
+    post_numbered_grants(client, 2)
+
+    first = client.get("/api/grants")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    not_modified = client.get("/api/grants", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+
+    post_numbered_grants(client, 1)
+    changed = client.get("/api/grants", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.get_json()) == 3
+
+
+def test_search_responses_are_cached_per_generation(client):
+    from app import response_cache
+
+    post_numbered_grants(client, 3)
+    hits = response_cache.hits
+
+    first = client.get("/api/search/advanced?tags=agriculture&limit=2")
+    second = client.get("/api/search/advanced?limit=2&tags=agriculture")
+
+    assert response_cache.hits == hits + 1
+    assert second.get_json() == first.get_json()
+    assert second.get_json()["next_cursor"] == "1"
+    assert client.get("/api/search/advanced?mode=bad").status_code == 400
+
+
+def test_tags_etag_is_stable(client):
+    etag = client.get("/api/tags").headers["ETag"]
+
+    response = client.get("/api/tags", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+def test_advanced_search_ranked(client):
+    grants_input = [
+        {"grant_name": "Farm Grant", "grant_description": "Supporting farming."},
+        {
+            "grant_name": "Farm Youth Grant",
+            "grant_description": "Farming programs for youth.",
+        },
+        {"grant_name": "Crop Grant", "grant_description": "Crops for producers."},
+    ]
+    client.post(
+        "/api/grants/batch",
+        data=json.dumps(grants_input),
+        content_type="application/json",
+    )
+
+    data = client.get(
+        "/api/search/advanced?tags=agriculture,youth&mode=any&rank=true&limit=2"
+    ).get_json()
+    assert [g["grant_name"] for g in data["grants"]] == [
+        "Farm Youth Grant",
+        "Farm Grant",
+    ]
+    assert data["scores"][0] > data["scores"][1]
+    assert data["next_cursor"] == "2"
+
+    data = client.get(
+        "/api/search/advanced?tags=agriculture,youth&mode=any&rank=true&cursor=2"
+    ).get_json()
+    assert [g["grant_name"] for g in data["grants"]] == ["Crop Grant"]
+    assert data["next_cursor"] is None
+
+
+def test_advanced_search_query_cache_shares_resolved_queries(client):
+    from app import query_cache
+
+    post_numbered_grants(client, 2)
+    hits = query_cache.hits
+
+    first = client.get("/api/search/advanced?q=farming").get_json()
+    second = client.get("/api/search/advanced?tags=Agriculture").get_json()
+    assert query_cache.hits == hits + 1
+    assert second == first
+
+    post_numbered_grants(client, 1)
+    third = client.get("/api/search/advanced?tags=agriculture").get_json()
+    assert query_cache.hits == hits + 1
+    assert len(third["grants"]) == 3
+
+
+def test_advanced_search_boolean_expr(client):
+    grants_input = [
+        {"grant_name": "Farm Grant", "grant_description": "Supporting farming."},
+        {
+            "grant_name": "Farm Youth Grant",
+            "grant_description": "Farming programs for youth.",
+        },
+        {"grant_name": "Soil Grant", "grant_description": "Soil testing."},
+    ]
+    client.post(
+        "/api/grants/batch",
+        data=json.dumps(grants_input),
+        content_type="application/json",
+    )
+
+    data = client.get(
+        "/api/search/advanced?expr=(farming OR soil) NOT tag:youth"
+    ).get_json()
+    assert [g["grant_name"] for g in data["grants"]] == ["Farm Grant", "Soil Grant"]
+    assert data["resolved_tags"] == ["agriculture", "soil", "youth"]
+
+    data = client.get("/api/search/advanced?expr=farming&tags=youth").get_json()
+    assert [g["grant_name"] for g in data["grants"]] == ["Farm Youth Grant"]
+
+    assert client.get("/api/search/advanced?expr=(soil").status_code == 400
+    deep = "(" * 5000 + "water" + ")" * 5000
+    assert client.get(f"/api/search/advanced?expr={deep}").status_code == 400
+    assert client.get("/api/search/advanced?expr=soil&rank=true").status_code == 400
+
+
+def test_advanced_search_and_or_expr_are_cached_separately(client):
+    post_grants(
+        client,
+        [
+            {"grant_name": "Farm Youth", "grant_description": "Farming for youth."},
+            {"grant_name": "Farm", "grant_description": "Supporting farming."},
+            {"grant_name": "Youth", "grant_description": "Youth mentoring."},
+        ],
+    )
+
+    both = client.get("/api/search/advanced?expr=tag:agriculture AND tag:youth")
+    either = client.get("/api/search/advanced?expr=tag:agriculture OR tag:youth")
+
+    assert [g["grant_name"] for g in both.get_json()["grants"]] == ["Farm Youth"]
+    assert [g["grant_name"] for g in either.get_json()["grants"]] == [
+        "Farm Youth",
+        "Farm",
+        "Youth",
+    ]
+
+
+def test_advanced_search_text(client):
+    grants_input = [
+        {
+            "grant_name": "NRCS 590 Nutrient Plan",
+            "grant_description": "Farming cost share for NRCS practice 590.",
+        },
+        {"grant_name": "Farm Grant", "grant_description": "Supporting farming."},
+        {"grant_name": "NRCS Soil Grant", "grant_description": "Soil testing."},
+    ]
+    client.post(
+        "/api/grants/batch",
+        data=json.dumps(grants_input),
+        content_type="application/json",
+    )
+
+    data = client.get("/api/search/advanced?text=NRCS 590").get_json()
+    assert [g["grant_name"] for g in data["grants"]] == [
+        "NRCS 590 Nutrient Plan",
+        "NRCS Soil Grant",
+    ]
+    assert len(data["scores"]) == 2
+
+    data = client.get("/api/search/advanced?text=nrcs&tags=agriculture").get_json()
+    assert [g["grant_name"] for g in data["grants"]] == ["NRCS 590 Nutrient Plan"]
+
+
+def post_grants(client, grants_input):
+    return client.post(
+        "/api/grants/batch",
+        data=json.dumps(grants_input),
+        content_type="application/json",
+    ).get_json()
+
+
+SOIL_DESCRIPTION = (
+    "Funding for farmers who adopt soil conservation practices such as cover "
+    "crops and reduced tillage on working farmland across the state."
+)
+
+
+def test_batch_flags_duplicates_by_default(client):
+    post_grants(client, [{"grant_name": "Soil", "grant_description": SOIL_DESCRIPTION}])
+
+    data = post_grants(
+        client,
+        [
+            {"grant_name": "Soil", "grant_description": SOIL_DESCRIPTION},
+            {"grant_name": "New", "grant_description": "Youth programs in schools."},
+        ],
+    )
+
+    assert data[0]["duplicate_of"] == {"grant_id": 0, "similarity": 1.0}
+    assert "duplicate_of" not in data[1]
+    assert len(client.get("/api/grants").get_json()) == 3
+
+
+@pytest.mark.parametrize("policy", ["skip", "merge"])
+def test_batch_dedup_policies(client, monkeypatch, policy):
+    monkeypatch.setattr("app.DEDUP_POLICY", policy)
+    post_grants(client, [{"grant_name": "Soil", "grant_description": SOIL_DESCRIPTION}])
+
+    data = post_grants(
+        client,
+        [
+            {
+                "grant_name": "Soil for youth",
+                "grant_description": SOIL_DESCRIPTION.replace("state", "state's youth"),
+            },
+            {"grant_name": "Other", "grant_description": "Dairy barn upgrades."},
+        ],
+    )
+
+    assert data[0]["duplicate_of"]["grant_id"] == 0
+    grants = client.get("/api/grants").get_json()
+    assert [g["grant_name"] for g in grants] == ["Soil", "Other"]
+    assert ("youth" in grants[0]["tags"]) == (policy == "merge")
+    assert len(client.get("/api/search?tags=youth").get_json()) == (policy == "merge")
+
+
+def test_batch_merge_keeps_appended_grants_in_duplicate_index(client, monkeypatch):
+    monkeypatch.setattr("app.DEDUP_POLICY", "merge")
+    soil = {"grant_name": "Soil", "grant_description": SOIL_DESCRIPTION}
+    dairy = {"grant_name": "Dairy", "grant_description": "Dairy barn upgrades."}
+    post_grants(client, [soil])
+    epoch = GrantStore().generation().epoch
+    post_grants(client, [soil, dairy])
+    assert GrantStore().generation().epoch == epoch
+
+    data = post_grants(client, [dairy])
+
+    assert data[0]["duplicate_of"] == {"grant_id": 1, "similarity": 1.0}
+    grants = client.get("/api/grants").get_json()
+    assert [g["grant_name"] for g in grants] == ["Soil", "Dairy"]
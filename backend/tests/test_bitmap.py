@@ -0,0 +1,57 @@
+from src.bitmap import Bitmap
+
+
+def test_bitmap_add_and_iterate_sorted():
+    bitmap = Bitmap([70, 3, 9, 3, 1000])
+
+    assert len(bitmap) == 4
+    assert list(bitmap) == [3, 9, 70, 1000]
+    assert 9 in bitmap
+    assert 10 not in bitmap
+    assert 5000 not in bitmap
+
+
+def test_bitmap_set_operations():
+    left = Bitmap([1, 2, 3, 64, 65])
+    right = Bitmap([2, 3, 4, 65, 200])
+
+    assert list(left & right) == [2, 3, 65]
+    assert list(left | right) == [1, 2, 3, 4, 64, 65, 200]
+    assert list(left - right) == [1, 64]
+    assert list(left.invert(8)) == [0, 4, 5, 6, 7]
+    assert len(left & right) == 3
+
+    both = left & right
+    assert 65 in both and 64 not in both and 10_000 not in both
+    both.add(64)
+    assert 64 in both and list(both) == [2, 3, 64, 65]
+
+
+def test_bitmap_iter_from():
+    bitmap = Bitmap([0, 5, 17, 64, 300])
+
+    assert list(bitmap.iter_from(6)) == [17, 64, 300]
+    assert list(bitmap.iter_from(301)) == []
+
+
+def test_bitmap_discard_and_round_trip_bytes():
+    bitmap = Bitmap([1, 8, 9])
+    bitmap.discard(8)
+    bitmap.discard(100)
+
+    assert list(bitmap) == [1, 9]
+    assert len(bitmap) == 2
+
+    restored = Bitmap.from_bytes(bitmap.to_bytes())
+    assert restored == bitmap
+    assert len(restored) == 2
+    restored.add(3)
+    assert list(restored) == [1, 3, 9]
+
+
+def test_bitmap_operations_result_is_mutable():
+    result = Bitmap([1]) | Bitmap([2])
+    result.add(10)
+
+    assert list(result) == [1, 2, 10]
+    assert len(result) == 3
@@ -0,0 +1,134 @@
+import pytest
+
+from src.dedup import BANDS, Duplicate, DuplicateIndex, apply_policy, minhash
+from src.models import Grant
+from src.store import GrantStore
+
+DESCRIPTION = (
+    "Funding for producers who adopt soil health practices such as cover crops, "
+    "reduced tillage and nutrient management plans on working farmland across "
+    "the state, with technical assistance from local conservation districts."
+)
+
+
+def reworded():
+    return DESCRIPTION.replace("across the state", "across the region")
+
+
+def test_minhash_is_deterministic_and_empty_without_words():
+    assert minhash(DESCRIPTION) == minhash(DESCRIPTION)
+    assert minhash(" - ") is None
+
+
+def test_find_exact_near_and_distinct_grants():
+    index = DuplicateIndex()
+    index.add_grants(
+        [
+            Grant("Soil Health Program", DESCRIPTION),
+            Grant("Youth Garden", "School gardens for children in cities."),
+        ]
+    )
+
+    exact = index.find(Grant("SOIL HEALTH program", DESCRIPTION + "  "))
+    assert exact == Duplicate(0, None, 1.0)
+
+    near = index.find(Grant("Soil Health Program 2025", reworded()))
+    assert near.grant_id == 0 and 0.8 <= near.similarity < 1.0
+
+    assert index.find(Grant("Water Grant", "Irrigation upgrades for orchards.")) is None
+
+
+def test_find_many_matches_earlier_batch_grants():
+    index = DuplicateIndex()
+    grants = [
+        Grant("A", DESCRIPTION),
+        Grant("B", "Something else entirely for dairy farms."),
+        Grant("A again", reworded()),
+        Grant("A once more", DESCRIPTION),
+    ]
+
+    duplicates = index.find_many(grants)
+
+    assert [d and d.batch_index for d in duplicates] == [None, None, 0, 0]
+    assert len(index) == 0
+
+
+def test_apply_policy():
+    grants = [
+        Grant("A", DESCRIPTION, ["soil"]),
+        Grant("A again", reworded(), ["farmer"]),
+        Grant("Stored copy", DESCRIPTION, ["grant"]),
+    ]
+    duplicates = [None, Duplicate(None, 0, 0.9), Duplicate(7, None, 1.0)]
+
+    assert apply_policy(grants, duplicates, "flag") == (grants, {})
+    assert apply_policy(grants, duplicates, "skip") == ([grants[0]], {})
+    kept, merged = apply_policy(grants, duplicates, "merge")
+    assert [g.tags for g in kept] == [("soil", "farmer")]
+    assert merged == {7: ["grant"]}
+    with pytest.raises(ValueError):
+        apply_policy(grants, duplicates, "drop")
+
+
+def test_refresh_follows_store(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants([Grant("A", DESCRIPTION)])
+    index = DuplicateIndex()
+
+    index.refresh(store)
+    assert index.find(Grant("B", reworded())).grant_id == 0
+
+    store.write_grants([Grant("C", "Unrelated text about fisheries.")])
+    index.refresh(store)
+    assert len(index) == 1
+    assert index.find(Grant("B", reworded())) is None
+
+
+def test_snapshot_round_trip_continues_from_store(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants([Grant("A", DESCRIPTION), Grant("Empty", " - ")])
+    index = DuplicateIndex()
+    index.refresh(store)
+    index.save_snapshot(tmp_path / "dedup.snapshot")
+
+    store.append_grants([Grant("C", "Unrelated text about coastal fisheries.")])
+    store.update_tags({0: ["soil"]})
+    loaded = DuplicateIndex()
+    assert loaded.load_snapshot(tmp_path / "dedup.snapshot")
+    assert loaded.source_generation == index.source_generation
+    loaded.refresh(store)
+
+    fresh = DuplicateIndex()
+    fresh.refresh(store)
+    assert len(loaded) == 3
+    assert loaded.hashes == fresh.hashes
+    assert loaded.signatures == fresh.signatures
+    loaded._merge_pending()
+    fresh._merge_pending()
+    assert loaded.band_keys == fresh.band_keys
+    assert loaded.band_ids == fresh.band_ids
+    assert loaded.find(Grant("B", reworded())).grant_id == 0
+    assert loaded.find(Grant("D", "Unrelated text about coastal fisheries!")) == (
+        Duplicate(2, None, 1.0)
+    )
+    assert not DuplicateIndex().load_snapshot(tmp_path / "missing.snapshot")
+
+
+def test_band_entries_merge_into_sorted_arrays(monkeypatch):
+    monkeypatch.setattr("src.dedup.MIN_PENDING", 2 * BANDS)
+    index = DuplicateIndex()
+    grants = [
+        Grant(f"Grant {i}", f"Program number {i} for rural county {i * 7} farms.")
+        for i in range(5)
+    ]
+
+    index.add_grants(grants[:2])
+    assert len(index.band_keys) == 2 * BANDS and not index._pending
+    index.add_grants(grants[2:])
+    assert len(index.band_keys) == 4 * BANDS
+    assert index._pending_count == BANDS
+    assert list(index.band_keys) == sorted(index.band_keys)
+
+    for grant_id, grant in enumerate(grants):
+        renamed = Grant("Renamed", grant.grant_description)
+        assert index.find(renamed) == Duplicate(grant_id, None, 1.0)
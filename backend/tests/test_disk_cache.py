@@ -0,0 +1,59 @@
+import sqlite3
+import time
+
+from src.disk_cache import DiskCache
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(tmp_path / "cache.db")
+
+    cache.set("a", "1")
+    cache.set_many({"b": "2", "c": "3"})
+
+    assert cache.get("a") == "1"
+    assert cache.get("missing") is None
+    assert cache.get_many(["a", "c", "missing"]) == {"a": "1", "c": "3"}
+    assert len(cache) == 3
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    DiskCache(tmp_path / "cache.db").set("key", "value")
+
+    assert DiskCache(tmp_path / "cache.db").get("key") == "value"
+
+
+def test_disk_cache_expires_entries(tmp_path):
+    cache = DiskCache(tmp_path / "cache.db", ttl=0.05)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    time.sleep(0.1)
+
+    assert cache.get("key") is None
+    cache.evict()
+    assert len(cache) == 0
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / "cache.db", max_entries=2)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", "3")
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": "1", "c": "3"}
+
+
+def test_disk_cache_reads_do_not_take_the_write_lock(tmp_path):
+    cache = DiskCache(tmp_path / "cache.db")
+    cache.set("key", "value")
+    writer = sqlite3.connect(cache.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+
+    try:
+        assert cache.get("key") == "value"
+    finally:
+        writer.execute("ROLLBACK")
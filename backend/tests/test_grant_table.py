@@ -0,0 +1,73 @@
+import pytest
+
+from src.grant_table import GrantObjects, GrantTable
+from src.models import Grant
+from src.serialization import encode_grant
+
+
+def make_grants():
+    return [
+        Grant(
+            grant_name="Grant é",
+            grant_description="Desc ✓",
+            tags=["soil", "water"],
+            website_urls=["https://example.com"],
+        ),
+        Grant(grant_name="Grant 2", grant_description="", tags=["Custom"]),
+        Grant(grant_name="Grant 3", grant_description="Desc", document_urls=None),
+    ]
+
+
+def test_grant_table_round_trips_grants():
+    table = GrantTable()
+    grants = make_grants()
+    for grant_id, grant in enumerate(grants):
+        table[grant_id] = grant
+
+    assert len(table) == 3
+    assert [table[grant_id] for grant_id in table] == grants
+    assert 2 in table and 3 not in table
+    with pytest.raises(KeyError):
+        table[3]
+
+
+def test_grant_table_replaces_and_rejects_gaps():
+    table = GrantTable()
+    for grant_id, grant in enumerate(make_grants()):
+        table[grant_id] = grant
+
+    table[0] = table[0].with_tags(["youth"])
+
+    assert table[0].tags == ("youth",)
+    assert table.fragment(0) == encode_grant(table[0])
+    assert table.fragment(1) == encode_grant(make_grants()[1])
+    assert table[1].tags == ("Custom",)
+    with pytest.raises(KeyError):
+        table[5] = make_grants()[0]
+
+
+def test_grant_objects_encode_fragments_on_demand():
+    objects = GrantObjects(fragment_cache_size=2)
+    for grant_id, grant in enumerate(make_grants()):
+        objects[grant_id] = grant
+
+    assert len(objects._fragments) == 0
+    assert [objects.fragment(gid) for gid in objects] == list(
+        map(encode_grant, make_grants())
+    )
+    assert len(objects._fragments) == 2
+
+    objects[2] = objects[2].with_tags(["youth"])
+    assert objects.fragment(2) == encode_grant(objects[2])
+    with pytest.raises(KeyError):
+        objects.fragment(3)
+
+
+def test_search_index_stores_grant_table_by_default():
+    from src.search_index import SearchIndex
+
+    index = SearchIndex()
+    index.add_grants(make_grants())
+
+    assert isinstance(index.grant_id_to_grant, GrantTable)
+    assert index.grant_id_to_grant.fragment(1) == encode_grant(make_grants()[1])
@@ -0,0 +1,249 @@
+import json
+import os
+
+import pytest
+
+from src.jsonl_store import JsonlGrantStore
+from src.models import Grant
+from src.store import create_store
+
+
+def make_grants(start, count):
+    return [
+        Grant(
+            grant_name=f"Grant {i}",
+            grant_description=f"Description {i}",
+            tags=["agriculture"],
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def test_jsonl_store_append_and_read(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"))
+
+    store.append_grants(make_grants(0, 2))
+    store.append_grants(make_grants(2, 3))
+
+    grants = store.read_grants()
+    assert [g.grant_name for g in grants] == [f"Grant {i}" for i in range(5)]
+    assert grants[0].tags == ("agriculture",)
+
+
+def test_jsonl_store_append_does_not_rewrite_log(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"))
+    store.append_grants(make_grants(0, 1))
+
+    segment = next((tmp_path / "grants").glob("*.jsonl"))
+    first_line = segment.read_bytes()
+
+    store.append_grants(make_grants(1, 1))
+
+    assert segment.read_bytes().startswith(first_line)
+    assert len(segment.read_bytes().splitlines()) == 2
+
+
+def test_jsonl_store_rolls_and_compacts_segments(tmp_path):
+    store = JsonlGrantStore(
+        str(tmp_path / "grants"), segment_bytes=1, compact_threshold=3
+    )
+
+    for i in range(10):
+        store.append_grants(make_grants(i, 1))
+
+    assert len(list((tmp_path / "grants").glob("*.jsonl"))) <= 4
+    assert [g.grant_name for g in store.read_grants()] == [
+        f"Grant {i}" for i in range(10)
+    ]
+
+    store.compact()
+    assert [g.grant_name for g in store.read_grants()] == [
+        f"Grant {i}" for i in range(10)
+    ]
+
+
+def test_jsonl_store_skips_segments_left_by_interrupted_compaction(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"), segment_bytes=1)
+    for i in range(3):
+        store.append_grants(make_grants(i, 1))
+
+    segments = sorted((tmp_path / "grants").glob("*.jsonl"))
+    merged = b"".join(path.read_bytes() for path in segments[:2])
+    stale = segments[1].read_bytes()
+    segments[0].write_bytes(merged)
+    segments[1].write_bytes(stale)
+
+    assert [g.grant_name for g in store.read_grants()] == [
+        "Grant 0",
+        "Grant 1",
+        "Grant 2",
+    ]
+
+
+def test_jsonl_store_write_and_clear(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"), segment_bytes=1)
+    store.append_grants(make_grants(0, 3))
+    store.append_grants(make_grants(3, 3))
+
+    store.write_grants(make_grants(10, 2))
+    assert [g.grant_name for g in store.read_grants()] == ["Grant 10", "Grant 11"]
+
+    store.clear_grants()
+    assert store.read_grants() == []
+
+
+def test_jsonl_store_export_import_json(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"))
+    store.append_grants(make_grants(0, 2))
+
+    export_path = tmp_path / "grants.json"
+    store.export_json(export_path)
+    assert [g["grant_name"] for g in json.loads(export_path.read_text())] == [
+        "Grant 0",
+        "Grant 1",
+    ]
+
+    other = JsonlGrantStore(str(tmp_path / "other"))
+    other.import_json(export_path)
+    assert [g.grant_name for g in other.read_grants()] == ["Grant 0", "Grant 1"]
+
+
+def test_create_store_unknown_backend():
+    with pytest.raises(ValueError):
+        create_store("postgres")
+
+
+def test_jsonl_store_read_changes_reads_only_new_records(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"), segment_bytes=1)
+    store.append_grants(make_grants(0, 3))
+    store.append_grants(make_grants(3, 1))
+    seen = store.generation()
+    assert seen.count == 4
+
+    store.append_grants(make_grants(4, 2))
+    changes = store.read_changes(seen)
+    assert not changes.reset
+    assert [g.grant_name for g in changes.grants] == ["Grant 4", "Grant 5"]
+
+    store.compact()
+    assert store.read_changes(seen).grants == changes.grants
+
+    store.write_grants(make_grants(10, 1))
+    changes = store.read_changes(seen)
+    assert changes.reset
+    assert [g.grant_name for g in changes.grants] == ["Grant 10"]
+
+
+def test_jsonl_store_update_tags(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"), segment_bytes=1)
+    store.append_grants(make_grants(0, 2))
+    store.append_grants(make_grants(2, 2))
+    before = store.generation()
+    segments = {
+        path: path.read_bytes() for path in (tmp_path / "grants").glob("*.jsonl")
+    }
+
+    generation = store.update_tags({0: ["soil"], 3: []})
+
+    assert generation == store.generation() == before._replace(revision=1)
+    assert {path: path.read_bytes() for path in segments} == segments
+    assert [g.tags for g in store.read_grants()] == [
+        ("soil",),
+        ("agriculture",),
+        ("agriculture",),
+        (),
+    ]
+    assert store.read_changes(before).tag_updates == {0: ["soil"], 3: []}
+    assert [g.tags for g in store.read_changes(None).grants][::3] == [("soil",), ()]
+
+    store.compact()
+    assert [g.tags for g in store.read_grants()][0] == ("soil",)
+
+
+def test_jsonl_store_compaction_folds_tag_log(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"), segment_bytes=1)
+    store.append_grants(make_grants(0, 2))
+    store.append_grants(make_grants(2, 2))
+    behind = store.generation()
+    store.update_tags({0: ["soil"], 3: ["water"]})
+    store.append_grants(make_grants(4, 1))
+    store.update_tags({4: ["youth"]})
+    current = store.generation()
+
+    store.compact()
+
+    first_segment = sorted((tmp_path / "grants").glob("0*.jsonl"))[0]
+    records = [json.loads(line) for line in first_segment.read_text().splitlines()]
+    assert [r["tags"] for r in records] == [
+        ["soil"],
+        ["agriculture"],
+        ["agriculture"],
+        ["water"],
+    ]
+    assert store.tag_log.changes() == (2, {4: ["youth"]})
+    assert [g.tags for g in store.read_grants()] == [
+        ("soil",),
+        ("agriculture",),
+        ("agriculture",),
+        ("water",),
+        ("youth",),
+    ]
+
+    # Updates a reader had not seen were folded away, so it starts over.
+    changes = store.read_changes(behind)
+    assert changes.reset and len(changes.grants) == 5
+
+    store.append_grants(make_grants(5, 1))
+    changes = store.read_changes(current)
+    assert not changes.reset and changes.tag_updates == {}
+    assert [g.grant_name for g in changes.grants] == ["Grant 5"]
+
+
+def test_jsonl_store_skips_and_truncates_torn_final_line(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"))
+    store.append_grants(make_grants(0, 2))
+    segment = next((tmp_path / "grants").glob("0*.jsonl"))
+    with open(segment, "ab") as f:
+        f.write(b'{"grant_name": "Grant 2", "grant_desc')
+
+    assert [g.grant_name for g in store.read_grants()] == ["Grant 0", "Grant 1"]
+
+    store.append_grants(make_grants(3, 1))
+
+    assert [g.grant_name for g in store.read_grants()] == [
+        "Grant 0",
+        "Grant 1",
+        "Grant 3",
+    ]
+    assert len(segment.read_bytes().splitlines()) == 3
+
+
+def test_jsonl_store_flushes_deferred_fsync(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(
+        "src.jsonl_store.os.fsync", lambda fd: synced.append(fd) or real_fsync(fd)
+    )
+    store = JsonlGrantStore(str(tmp_path / "grants"), fsync_interval=60)
+    store.append_grants(make_grants(0, 1))
+    store.append_grants(make_grants(1, 1))
+    assert len(synced) == 1
+    assert store._sync_timer is not None
+
+    store.close()
+
+    assert len(synced) == 2
+    assert not store._unsynced
+
+
+def test_jsonl_store_deferred_fsync_runs_on_timer(tmp_path):
+    store = JsonlGrantStore(str(tmp_path / "grants"), fsync_interval=0.05)
+    store.append_grants(make_grants(0, 1))
+    store.append_grants(make_grants(1, 1))
+    timer = store._sync_timer
+    assert timer is not None
+
+    timer.join(5)
+
+    assert not store._unsynced
+    assert store._sync_timer is None
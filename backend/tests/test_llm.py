@@ -1,10 +1,23 @@
+import json
 import os
-from unittest.mock import Mock, patch
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
 
-from src.llm_refine import llm_refine
+import pytest
+
+from src.llm_refine import AsyncRefiner, llm_refine, parse_batch_tags
 from src.tagging import GrantTagger
 
 
+@pytest.fixture(autouse=True)
+def llm_cache_path(tmp_path):
+    with patch.dict(os.environ, {"LLM_CACHE_PATH": str(tmp_path / "llm_cache.db")}):
+        yield
+
+
 def test_llm_refine_no_api_key():
     initial_tags = ["agriculture", "education"]
 
@@ -94,3 +107,290 @@ def test_grant_tagger_llm_enabled_but_no_api_key():
     assert "agriculture" in tags
     assert "education" in tags
     assert isinstance(tags, list)
+
+
+@contextmanager
+def stub_openai_server(handle_completion):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status, headers, content = handle_completion(body)
+            payload = json.dumps(
+                {
+                    "id": "chatcmpl-test",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+            ).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    env = {
+        "OPENAI_API_KEY": "sk-test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+    }
+    try:
+        with patch.dict(os.environ, env):
+            yield
+    finally:
+        server.shutdown()
+
+
+def grant_name_in(body):
+    prompt = body["messages"][1]["content"]
+    return prompt.split("Grant Name: ")[1].split("\n")[0]
+
+
+def test_async_refiner_bounded_concurrency_against_stub_server():
+    pytest.importorskip("openai")
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def handle(body):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return 200, {}, "agriculture, fake-tag, soil"
+
+    items = [(f"Grant {i}", "Farming") for i in range(12)]
+    with stub_openai_server(handle):
+        refiner = AsyncRefiner(concurrency=3, batch_size=1)
+        results = refiner.refine_many(items, [["agriculture"]] * len(items))
+
+    assert results == [["agriculture", "soil"]] * len(items)
+    assert 1 < peak <= 3
+
+
+def test_async_refiner_retries_rate_limits():
+    pytest.importorskip("openai")
+    calls = []
+
+    def handle(body):
+        calls.append(grant_name_in(body))
+        if len(calls) == 1:
+            return 429, {"Retry-After": "0"}, ""
+        return 200, {}, "water"
+
+    with stub_openai_server(handle):
+        refiner = AsyncRefiner(max_retries=2, batch_size=1)
+        results = refiner.refine_many([("Grant", "Irrigation")], [["irrigation"]])
+
+    assert results == [["water"]]
+    assert len(calls) == 2
+
+
+def test_async_refiner_deadline_falls_back_to_keyword_tags():
+    pytest.importorskip("openai")
+
+    def handle(body):
+        if grant_name_in(body) == "Slow Grant":
+            time.sleep(1)
+        return 200, {}, "research"
+
+    items = [("Fast Grant", "Study"), ("Slow Grant", "Study")]
+    with stub_openai_server(handle):
+        refiner = AsyncRefiner(deadline=0.3, batch_size=1)
+        results = refiner.refine_many(items, [["education"], ["education"]])
+
+    assert results == [["research"], ["education"]]
+
+
+def test_async_refiner_explicit_zero_deadline_is_kept():
+    with patch.dict(os.environ, {"LLM_BATCH_DEADLINE": "60"}):
+        assert AsyncRefiner(deadline=0).deadline == 0
+        assert AsyncRefiner().deadline == 60
+
+
+def test_async_refiner_failed_requests_keep_keyword_tags():
+    client = Mock()
+    client.chat.completions.create = AsyncMock(side_effect=Exception("API Error"))
+
+    refiner = AsyncRefiner(client=client)
+    results = refiner.refine_many([("Grant", "Farming")], [["agriculture"]])
+
+    assert results == [["agriculture"]]
+
+
+@pytest.mark.filterwarnings("ignore:coroutine .* was never awaited")
+def test_async_refiner_gives_up_on_stalled_event_loop():
+    import asyncio
+
+    client = Mock()
+    client.chat.completions.create = AsyncMock(return_value=None)
+    refiner = AsyncRefiner(client=client, deadline=0.05)
+    refiner.RESULT_MARGIN = 0.05
+    # A loop nobody runs, like one whose thread was lost across a fork.
+    refiner._loop = asyncio.new_event_loop()
+
+    started = time.monotonic()
+    results = refiner.refine_many([("Grant", "Farming")], [["agriculture"]])
+
+    assert results == [["agriculture"]]
+    assert time.monotonic() - started < 5
+    refiner._loop.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_starts_with_fresh_refiner_and_cache(monkeypatch):
+    from src import llm_refine as module
+
+    refiner = AsyncRefiner(client=Mock())
+    refiner._event_loop()
+    monkeypatch.setattr(module, "_refiner", refiner)
+    monkeypatch.setattr(module, "_cache", None)
+    assert module.llm_cache() is not None
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if module._refiner is None and module._cache is None else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert module._refiner is refiner and module._cache is not None
+
+
+def test_refine_many_no_api_key():
+    with patch.dict(os.environ, {}, clear=True):
+        refiner = AsyncRefiner()
+        assert refiner.refine_many([("Grant", "Farming")], [["agriculture"]]) == [
+            ["agriculture"]
+        ]
+
+
+def test_llm_refine_uses_cache_for_repeated_grants():
+    mock_openai_module = Mock()
+    mock_response = Mock()
+    mock_response.choices = [Mock()]
+    mock_response.choices[0].message.content = "agriculture, soil"
+    mock_client = Mock()
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai_module.OpenAI.return_value = mock_client
+
+    with patch.dict("sys.modules", {"openai": mock_openai_module}):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}):
+            first = llm_refine("Grant", "Farming", ["agriculture"])
+            second = llm_refine("Grant", "Farming", ["agriculture"])
+            other = llm_refine("Grant", "Farming", ["education"])
+
+    assert first == second == other == ["agriculture", "soil"]
+    assert mock_client.chat.completions.create.call_count == 2
+
+
+def test_async_refiner_only_requests_uncached_grants():
+    pytest.importorskip("openai")
+    calls = []
+
+    def handle(body):
+        calls.append(grant_name_in(body))
+        return 200, {}, "agriculture"
+
+    with stub_openai_server(handle):
+        refiner = AsyncRefiner(batch_size=1)
+        refiner.refine_many([("Grant 0", "Farming")], [["soil"]])
+        results = refiner.refine_many(
+            [("Grant 0", "Farming"), ("Grant 1", "Farming")], [["soil"], ["soil"]]
+        )
+
+    assert results == [["agriculture"], ["agriculture"]]
+    assert calls == ["Grant 0", "Grant 1"]
+
+
+def test_async_refiner_does_not_cache_failures(tmp_path):
+    from src.disk_cache import DiskCache
+
+    client = Mock()
+    client.chat.completions.create = AsyncMock(side_effect=Exception("API Error"))
+    cache = DiskCache(tmp_path / "cache.db")
+
+    refiner = AsyncRefiner(client=client, cache=cache)
+    refiner.refine_many([("Grant", "Farming")], [["agriculture"]])
+
+    assert len(cache) == 0
+
+
+def batch_grants_in(body):
+    prompt = body["messages"][1]["content"]
+    lines = prompt.split("Grants:\n")[1].split("\n\n")[0].splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_parse_batch_tags_validates_each_entry():
+    content = json.dumps(
+        {
+            "grants": [
+                {"id": 0, "tags": ["Agriculture", "fake-tag", "soil"]},
+                {"id": 1, "tags": ["fake-tag"]},
+                {"id": 2, "tags": "agriculture"},
+                {"id": 7, "tags": ["water"]},
+                "garbage",
+            ]
+        }
+    )
+
+    assert parse_batch_tags(content, 4) == [["agriculture", "soil"], None, None, None]
+    assert parse_batch_tags("not json", 2) == [None, None]
+
+
+def test_async_refiner_batches_grants_into_one_request():
+    pytest.importorskip("openai")
+    requests = []
+
+    def handle(body):
+        grants = batch_grants_in(body)
+        requests.append([grant["name"] for grant in grants])
+        entries = [{"id": grant["id"], "tags": ["research"]} for grant in grants]
+        return 200, {}, json.dumps({"grants": entries})
+
+    items = [(f"Grant {i}", "Study") for i in range(5)]
+    with stub_openai_server(handle):
+        refiner = AsyncRefiner(batch_size=3)
+        results = refiner.refine_many(items, [["education"]] * len(items))
+
+    assert results == [["research"]] * len(items)
+    assert sorted(requests) == [
+        ["Grant 0", "Grant 1", "Grant 2"],
+        ["Grant 3", "Grant 4"],
+    ]
+
+
+def test_async_refiner_retries_malformed_batch_entries_individually():
+    pytest.importorskip("openai")
+    single_calls = []
+
+    def handle(body):
+        if "Grants:\n" in body["messages"][1]["content"]:
+            return 200, {}, json.dumps({"grants": [{"id": 0, "tags": ["research"]}]})
+        single_calls.append(grant_name_in(body))
+        return 200, {}, "water"
+
+    items = [("Grant A", "Study"), ("Grant B", "Irrigation")]
+    with stub_openai_server(handle):
+        refiner = AsyncRefiner(batch_size=2)
+        results = refiner.refine_many(items, [["education"], ["irrigation"]])
+
+    assert results == [["research"], ["water"]]
+    assert single_calls == ["Grant B"]
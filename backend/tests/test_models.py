@@ -0,0 +1,68 @@
+import pytest
+
+from src.models import Grant
+
+
+def test_grant_round_trips_through_dict():
+    data = {
+        "grant_name": "Grant",
+        "grant_description": "Desc",
+        "tags": ["soil", "agriculture", "Custom Tag"],
+        "website_urls": ["https://example.com"],
+        "document_urls": None,
+    }
+
+    grant = Grant.from_dict(data)
+
+    assert grant.to_dict() == data
+    assert Grant.from_dict({"grant_name": "G"}).to_dict() == {
+        "grant_name": "G",
+        "grant_description": "",
+        "tags": [],
+        "website_urls": [],
+        "document_urls": [],
+    }
+
+
+def test_grant_stores_predefined_tags_as_ids():
+    grant = Grant(grant_name="Grant", grant_description="Desc", tags=["water", "soil"])
+
+    assert isinstance(grant._tags, bytes) and len(grant._tags) == 2
+    assert grant.tags == ("water", "soil")
+    assert not hasattr(grant, "__dict__")
+
+    grant.tags = ["Water"]
+    assert grant.tags == ("Water",)
+
+
+def test_grant_list_fields_reject_in_place_mutation():
+    grant = Grant(
+        grant_name="Grant",
+        grant_description="Desc",
+        tags=["soil"],
+        website_urls=["https://example.com"],
+    )
+
+    with pytest.raises(AttributeError):
+        grant.tags.append("water")
+    with pytest.raises(AttributeError):
+        grant.website_urls.append("https://example.org")
+    with pytest.raises(TypeError):
+        hash(grant)
+
+    grant.tags = [*grant.tags, "water"]
+    assert grant.tags == ("soil", "water")
+    assert grant.to_dict()["tags"] == ["soil", "water"]
+    assert grant.to_dict()["website_urls"] == ["https://example.com"]
+
+
+def test_grant_with_tags_and_equality():
+    grant = Grant(grant_name="Grant", grant_description="Desc", tags=["soil"])
+    retagged = grant.with_tags(["water"])
+
+    assert retagged.tags == ("water",)
+    assert grant.tags == ("soil",)
+    assert retagged == Grant(
+        grant_name="Grant", grant_description="Desc", tags=["water"]
+    )
+    assert retagged != grant
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+from src.parallel_tagging import ParallelTagger
+from src.tagging import GrantTagger
+
+SEED_FILE = Path(__file__).parent.parent.parent / "data" / "grants_seed.json"
+
+
+def seed_items():
+    data = json.loads(SEED_FILE.read_text())
+    return [(g["grant_name"], g["grant_description"]) for g in data]
+
+
+def test_parallel_tagger_matches_serial_order():
+    items = seed_items() * 5
+    tagger = GrantTagger()
+    parallel = ParallelTagger(tagger, workers=2, chunk_size=3, min_parallel=0)
+
+    try:
+        results = parallel.tag_many(items)
+    finally:
+        parallel.shutdown()
+
+    assert results == [tagger.tag_grant(name, desc) for name, desc in items]
+
+
+def test_parallel_tagger_small_batches_stay_in_process():
+    parallel = ParallelTagger(workers=4, min_parallel=100)
+
+    results = parallel.tag_many(seed_items())
+
+    assert len(results) == len(seed_items())
+    assert parallel._executor is None
@@ -0,0 +1,64 @@
+import pytest
+
+from src.query_parser import (
+    And,
+    Not,
+    Or,
+    QuerySyntaxError,
+    Term,
+    parse_query,
+    query_tags,
+)
+
+
+def test_parse_query_precedence_and_implicit_and():
+    assert parse_query("(water OR irrigation) AND rural NOT dairy") == And(
+        (Term("water"), Term("rural"), Not(Term("dairy")))
+    )
+    assert parse_query("soil OR water youth") == Or(
+        (Term("soil"), And((Term("water"), Term("youth"))))
+    )
+
+
+def test_parse_query_resolves_synonyms_but_not_explicit_tags():
+    assert parse_query('"Soil Health" or learning') == Or(
+        (Term("soil"), Term("education"))
+    )
+    assert parse_query("tag:Farming and not not farm") == And(
+        (Term("farming"), Term("agriculture"))
+    )
+
+
+@pytest.mark.parametrize(
+    "text", ["", "soil AND", "(soil OR water", "soil )", 'soil "health', "NOT"]
+)
+def test_parse_query_rejects_malformed_queries(text):
+    with pytest.raises(QuerySyntaxError):
+        parse_query(text)
+
+
+def test_parse_query_caps_nesting_depth():
+    assert parse_query("(" * 64 + "water" + ")" * 64) == Term("water")
+
+    for text in ("(" * 5000 + "water" + ")" * 5000, "NOT " * 5000 + "water"):
+        with pytest.raises(QuerySyntaxError, match="nested"):
+            parse_query(text)
+
+
+def test_query_tags_collects_negated_tags():
+    assert query_tags(parse_query("soil (water OR NOT dairy)")) == {
+        "soil",
+        "water",
+        "dairy",
+    }
+
+
+def test_plan_nodes_compare_by_kind():
+    terms = (Term("water"), Term("rural"))
+
+    assert And(terms) != Or(terms)
+    assert len({And(terms), Or(terms), And(terms)}) == 2
+    assert Term("water") != ("water",)
+    assert parse_query("NOT (water AND rural) OR NOT (water OR rural)") == Or(
+        (Not(And(terms)), Not(Or(terms)))
+    )
@@ -0,0 +1,81 @@
+from src.models import Grant
+from src.retag import diff_keyword_maps, retag_store, save_keyword_snapshot
+from src.search_index import SearchIndex
+from src.store import GrantStore
+from src.tagging import KEYWORD_MAP, GrantTagger
+
+GRANTS = [
+    ("Orchard Grant", "Support for kids visiting orchards"),
+    ("Dairy Grant", "Milk processing equipment"),
+    ("Garden Grant", "Kids gardening clubs"),
+]
+
+
+def seeded_store(tmp_path):
+    tagger = GrantTagger(cache_size=0)
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.write_grants(
+        [
+            Grant(grant_name=name, grant_description=description, tags=tags)
+            for (name, description), tags in zip(GRANTS, tagger.tag_many(GRANTS))
+        ]
+    )
+    save_keyword_snapshot(tagger.tags, tagger.keyword_map, tmp_path / "snapshot.json")
+    return store
+
+
+def test_diff_keyword_maps_reports_added_and_removed_keywords():
+    tagger = GrantTagger(cache_size=0)
+    snapshot = {"tags": tagger.tags, "keyword_map": KEYWORD_MAP}
+    keyword_map = {
+        **KEYWORD_MAP,
+        "youth": [*KEYWORD_MAP["youth"], "Kids"],
+        "dairy": ["dairy", "milk", "cattle"],
+    }
+
+    diff = diff_keyword_maps(snapshot, tagger.tags, keyword_map)
+
+    assert diff.keywords == {"kids", "cow"}
+    assert not diff.full
+    assert diff_keyword_maps(None, tagger.tags, keyword_map).full
+    assert diff_keyword_maps(snapshot, tagger.tags[:-1], keyword_map).full
+
+
+def test_retag_store_only_retags_grants_with_changed_keywords(tmp_path, monkeypatch):
+    store = seeded_store(tmp_path)
+    index = SearchIndex()
+    index.refresh(store)
+    text_index = index.text_index
+    assert index.search_by_tags(["youth"]) == []
+
+    keyword_map = {**KEYWORD_MAP, "youth": [*KEYWORD_MAP["youth"], "kids"]}
+    monkeypatch.setattr("src.tagging.KEYWORD_MAP", keyword_map)
+    result = retag_store(
+        store, GrantTagger(cache_size=0), index, tmp_path / "snapshot.json"
+    )
+
+    assert (result.candidates, result.updated, result.full) == (2, 2, False)
+    assert index.text_index is text_index
+    assert [g.grant_name for g in index.search_by_tags(["youth"])] == [
+        "Orchard Grant",
+        "Garden Grant",
+    ]
+    assert index.source_generation == store.generation()
+    assert [g.grant_name for g in store.read_grants() if "youth" in g.tags] == [
+        "Orchard Grant",
+        "Garden Grant",
+    ]
+
+    again = retag_store(
+        store, GrantTagger(cache_size=0), index, tmp_path / "snapshot.json"
+    )
+    assert (again.candidates, again.updated) == (0, 0)
+
+
+def test_retag_store_without_snapshot_retags_everything(tmp_path):
+    store = seeded_store(tmp_path)
+
+    result = retag_store(store, GrantTagger(cache_size=0), None, tmp_path / "none.json")
+
+    assert (result.candidates, result.updated, result.full) == (3, 0, True)
+    assert (tmp_path / "none.json").exists()
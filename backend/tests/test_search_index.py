@@ -1,5 +1,18 @@
+import pytest
+
+from src.jsonl_store import JsonlGrantStore
 from src.models import Grant
+from src.query_parser import And, Not, Term, parse_query
 from src.search_index import SearchIndex
+from src.serialization import encode_grant
+from src.sqlite_store import SqliteGrantStore
+from src.store import GrantStore
+
+STORES = {
+    "json": lambda path: GrantStore(str(path / "grants.json")),
+    "jsonl": lambda path: JsonlGrantStore(str(path / "grants")),
+    "sqlite": lambda path: SqliteGrantStore(str(path / "grants.db")),
+}
 
 
 def test_search_index_add_grants():
@@ -136,3 +149,344 @@ def test_search_index_no_matches():
 
     results = index.search_by_tags(["nonexistent"], mode="all")
     assert len(results) == 0
+
+
+def test_search_index_refresh_applies_other_workers_appends(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    worker_a = SearchIndex()
+    worker_b = SearchIndex()
+    worker_a.refresh(store)
+    worker_b.refresh(store)
+
+    store.append_grants(
+        [Grant(grant_name="Grant 1", grant_description="Desc 1", tags=["soil"])]
+    )
+    worker_a.refresh(store)
+    worker_b.refresh(store)
+    assert len(worker_b.search_by_tags(["soil"])) == 1
+
+    store.append_grants(
+        [Grant(grant_name="Grant 2", grant_description="Desc 2", tags=["soil"])]
+    )
+    worker_b.refresh(store)
+    assert [g.grant_name for g in worker_b.search_by_tags(["soil"])] == [
+        "Grant 1",
+        "Grant 2",
+    ]
+    assert worker_b._next_id == 2
+
+    store.write_grants(
+        [Grant(grant_name="Grant 3", grant_description="Desc 3", tags=["water"])]
+    )
+    worker_a.refresh(store)
+    assert worker_a.search_by_tags(["soil"]) == []
+    assert len(worker_a.search_by_tags(["water"])) == 1
+
+
+def test_search_index_posting_types_agree():
+    grants = [
+        Grant(
+            grant_name=f"Grant {i}",
+            grant_description=f"Desc {i}",
+            tags=[
+                tag
+                for tag, step in [("soil", 2), ("water", 3), ("youth", 5)]
+                if i % step == 0
+            ],
+        )
+        for i in range(100)
+    ]
+    bitmap_index = SearchIndex(postings="bitmap")
+    set_index = SearchIndex(postings="set")
+    objects_index = SearchIndex(grants="objects")
+    bitmap_index.add_grants(grants)
+    set_index.add_grants(grants)
+    objects_index.add_grants(grants)
+
+    for tags in (["soil", "water"], ["water", "youth", "soil"], ["youth", "missing"]):
+        for mode in ("all", "any"):
+            expected = bitmap_index.search_by_tags(tags, mode)
+            assert set_index.search_by_tags(tags, mode) == expected
+            assert objects_index.search_by_tags(tags, mode) == expected
+
+
+def test_search_index_iter_search_after_cursor():
+    index = SearchIndex()
+    index.add_grants(
+        [
+            Grant(grant_name=f"Grant {i}", grant_description="Desc", tags=["soil"])
+            for i in range(4)
+        ]
+    )
+
+    assert [gid for gid, _ in index.iter_search(["soil"], after=1)] == [2, 3]
+    assert [gid for gid, _ in index.iter_grants(after=2)] == [3]
+
+
+@pytest.mark.parametrize("backend", ["json", "jsonl", "sqlite"])
+def test_search_index_refresh_applies_tag_updates_in_place(tmp_path, backend):
+    store = STORES[backend](tmp_path)
+    store.append_grants(
+        [
+            Grant(grant_name="Grant 1", grant_description="Desc", tags=["soil"]),
+            Grant(grant_name="Grant 2", grant_description="Desc", tags=["soil"]),
+        ]
+    )
+    # Object storage, so identity shows the untouched grant was not rebuilt.
+    index = SearchIndex(grants="objects")
+    index.refresh(store)
+    first = index.grant_id_to_grant[0]
+
+    store.update_tags({1: ["water"]})
+    store.append_grants(
+        [Grant(grant_name="Grant 3", grant_description="Desc", tags=["water"])]
+    )
+    index.refresh(store)
+
+    assert index.grant_id_to_grant[0] is first
+    assert index.source_generation == store.generation()
+    assert [g.grant_name for g in index.search_by_tags(["water"])] == [
+        "Grant 2",
+        "Grant 3",
+    ]
+
+
+def test_search_index_update_tags_moves_postings(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants(
+        [
+            Grant(grant_name="Grant 1", grant_description="Desc", tags=["soil"]),
+            Grant(grant_name="Grant 2", grant_description="Desc", tags=["soil"]),
+        ]
+    )
+    for postings in ("bitmap", "set"):
+        index = SearchIndex(postings)
+        index.refresh(store)
+
+        index.update_tags({1: ["water"]})
+
+        assert [g.grant_name for g in index.search_by_tags(["soil"])] == ["Grant 1"]
+        assert [g.grant_name for g in index.search_by_tags(["water"])] == ["Grant 2"]
+        assert index.grant_id_to_grant[1].tags == ("water",)
+
+
+def test_search_index_snapshot_round_trip(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants(
+        [
+            Grant(
+                grant_name=f"Grant {i}",
+                grant_description="Desc",
+                tags=["soil"] if i % 2 else ["water", "soil"],
+                website_urls=None if i == 3 else ["https://example.com"],
+            )
+            for i in range(6)
+        ]
+    )
+    index = SearchIndex()
+    index.refresh(store)
+    index.save_snapshot(tmp_path / "index.snapshot")
+
+    for postings in ("bitmap", "set"):
+        loaded = SearchIndex(postings)
+        assert loaded.load_snapshot(tmp_path / "index.snapshot")
+
+        assert loaded.source_generation == store.generation()
+        assert len(loaded.grant_id_to_grant) == 6
+        assert loaded.grant_id_to_grant.decoded_count == 0
+        assert loaded.search_by_tags(["water"]) == index.search_by_tags(["water"])
+        assert loaded.grant_id_to_grant.decoded_count == 3
+        assert list(loaded.iter_grants()) == list(index.iter_grants())
+
+
+def test_search_index_refresh_continues_from_snapshot(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants(
+        [Grant(grant_name="Grant 0", grant_description="Desc", tags=["soil"])]
+    )
+    index = SearchIndex()
+    index.refresh(store)
+    index.save_snapshot(tmp_path / "index.snapshot")
+    store.append_grants(
+        [Grant(grant_name="Grant 1", grant_description="Desc", tags=["soil"])]
+    )
+
+    loaded = SearchIndex()
+    loaded.load_snapshot(tmp_path / "index.snapshot")
+    loaded.refresh(store)
+
+    assert loaded.grant_id_to_grant.decoded_count == 1
+    assert [g.grant_name for g in loaded.search_by_tags(["soil"])] == [
+        "Grant 0",
+        "Grant 1",
+    ]
+
+
+def test_search_index_load_snapshot_rejects_bad_files(tmp_path):
+    index = SearchIndex()
+    (tmp_path / "bad.snapshot").write_bytes(b"not a snapshot at all")
+    (tmp_path / "empty.snapshot").write_bytes(b"")
+
+    assert not index.load_snapshot(tmp_path / "missing.snapshot")
+    assert not index.load_snapshot(tmp_path / "bad.snapshot")
+    assert not index.load_snapshot(tmp_path / "empty.snapshot")
+
+
+def test_search_index_fragments_match_encoded_grants(tmp_path):
+    grants = [
+        Grant(grant_name=f"Grant {i}", grant_description="Desc", tags=["soil"])
+        for i in range(4)
+    ]
+    objects_index = SearchIndex()
+    table_index = SearchIndex(grants="table")
+    for index in (objects_index, table_index):
+        index.add_grants(grants)
+    objects_index.save_snapshot(tmp_path / "index.snapshot")
+    mapped_index = SearchIndex()
+    mapped_index.load_snapshot(tmp_path / "index.snapshot")
+
+    for index in (objects_index, table_index, mapped_index):
+        index.update_tags({2: ["water"]})
+        fragments = list(index.iter_search(["soil"], fragments=True))
+
+        assert [gid for gid, _ in fragments] == [0, 1, 3]
+        assert [fragment for _, fragment in fragments] == [
+            encode_grant(grants[gid]) for gid in (0, 1, 3)
+        ]
+        assert dict(index.iter_grants(after=1, fragments=True))[2] == encode_grant(
+            grants[2].with_tags(["water"])
+        )
+    assert mapped_index.grant_id_to_grant.decoded_count == 1
+
+
+def stepped_grants(count):
+    return [
+        Grant(
+            grant_name=f"Grant {i}",
+            grant_description=f"Desc {i}",
+            tags=[
+                tag
+                for tag, step in [("soil", 2), ("water", 3), ("youth", 5)]
+                if i % step == 0
+            ],
+        )
+        for i in range(count)
+    ]
+
+
+def test_search_index_ranked_search_orders_by_matches_then_rarity():
+    index = SearchIndex()
+    index.add_grants(stepped_grants(30))
+
+    ranked = index.ranked_search(["soil", "water", "youth"], limit=8)
+
+    assert [gid for gid, _, _ in ranked] == [0, 15, 10, 20, 6, 12, 18, 24]
+    scores = [score for _, _, score in ranked]
+    assert scores[0] > scores[1] > scores[2] == scores[3] > scores[4]
+    assert ranked[1][1].grant_name == "Grant 15"
+
+
+def test_search_index_ranked_search_strategies_agree(monkeypatch):
+    grants = stepped_grants(100)
+    tags = ["youth", "soil", "water", "missing"]
+    bitmap_index = SearchIndex(postings="bitmap")
+    set_index = SearchIndex(postings="set")
+    bitmap_index.add_grants(grants)
+    set_index.add_grants(grants)
+
+    for mode in ("all", "any"):
+        expected = bitmap_index.ranked_search(tags[:3], mode, limit=40, offset=5)
+        assert set_index.ranked_search(tags[:3], mode, limit=40, offset=5) == expected
+        monkeypatch.setattr("src.search_index.MAX_PARTITION_TAGS", 0)
+        assert bitmap_index.ranked_search(tags, mode, limit=40, offset=5) == (
+            expected if mode == "any" else []
+        )
+        monkeypatch.undo()
+
+    assert bitmap_index.ranked_search(["missing"]) == []
+    assert bitmap_index.ranked_search([]) == []
+
+
+def test_search_index_generation_changes_with_contents():
+    index = SearchIndex()
+    seen = {index.generation}
+
+    index.add_grants(stepped_grants(3))
+    seen.add(index.generation)
+    index.add_grants([])
+    assert index.generation in seen
+    index.update_tags({0: ["youth"]})
+    seen.add(index.generation)
+    index.clear()
+    seen.add(index.generation)
+
+    assert len(seen) == 4
+
+
+def matches(node, tags):
+    if isinstance(node, Term):
+        return node.tag in tags
+    if isinstance(node, Not):
+        return not matches(node.child, tags)
+    combine = all if isinstance(node, And) else any
+    return combine(matches(child, tags) for child in node.children)
+
+
+def test_search_index_evaluate_matches_brute_force():
+    grants = stepped_grants(60)
+    queries = [
+        "soil AND water",
+        "(soil OR youth) NOT water",
+        "NOT soil",
+        "youth OR NOT (soil OR water)",
+        "missing OR youth",
+        "soil AND missing NOT water",
+    ]
+    for postings in ("bitmap", "set"):
+        index = SearchIndex(postings=postings)
+        index.add_grants(grants)
+        for text in queries:
+            plan = parse_query(text)
+            expected = [
+                gid for gid, grant in enumerate(grants) if matches(plan, grant.tags)
+            ]
+            assert [gid for gid, _ in index.iter_query(plan)] == expected, text
+        assert [gid for gid, _ in index.iter_query(Term("soil"), after=50)] == [
+            52,
+            54,
+            56,
+            58,
+        ]
+
+
+def test_search_index_text_search_with_tag_filter(tmp_path):
+    grants = [
+        Grant("NRCS 590 Nutrient Plan", "Cost share for NRCS practice 590.", ["soil"]),
+        Grant("Soil Health", "Cover crops and soil testing.", ["soil"]),
+        Grant("Water Grant", "NRCS water projects.", ["water"]),
+    ]
+    index = SearchIndex()
+    index.add_grants(grants)
+
+    ranked = index.text_search("NRCS 590")
+    assert [gid for gid, _, _ in ranked] == [0, 2]
+    assert ranked[0][2] > ranked[1][2]
+    assert [gid for gid, _, _ in index.text_search("nrcs", Term("water"))] == [2]
+    assert index.text_search("nrcs", limit=1, offset=1)[0][0] == 2
+
+    index.save_snapshot(tmp_path / "index.snapshot")
+    loaded = SearchIndex()
+    assert loaded.load_snapshot(tmp_path / "index.snapshot")
+    assert [gid for gid, _, _ in loaded.text_search("nrcs", fragments=True)] == [0, 2]
+    assert loaded.grant_id_to_grant.decoded_count == 0
+    assert loaded.text_search("NRCS 590") == ranked
+    assert loaded.text_index.postings == index.text_index.postings
+    assert loaded.text_index.frequencies == index.text_index.frequencies
+    assert loaded.text_index.lengths == index.text_index.lengths
+
+    loaded = SearchIndex()
+    loaded.load_snapshot(tmp_path / "index.snapshot")
+    loaded.add_grants([Grant("NRCS Grant", "More NRCS 590 funding.", ["soil"])])
+    assert len(loaded.text_index) == 0
+    assert sorted(gid for gid, _, _ in loaded.text_search("590")) == [0, 3]
+    assert len(loaded.text_index) == 4
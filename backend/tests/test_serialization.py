@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from src import serialization
+from src.models import Grant
+
+GRANTS = [
+    Grant(
+        grant_name='Grant "é"',
+        grant_description="Line\nbreak ✓",
+        tags=["soil", "water"],
+        website_urls=["https://example.com"],
+        document_urls=None,
+    ),
+    Grant(grant_name="Grant 2", grant_description="Desc", tags=["Custom Tag"]),
+]
+
+
+@pytest.fixture(params=["native", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+        monkeypatch.setattr(serialization, "msgspec", None)
+        monkeypatch.setattr(serialization, "BACKEND", "json")
+    return request.param
+
+
+def test_dumps_grants_matches_to_dict(backend):
+    encoded = serialization.dumps_grants(GRANTS)
+
+    assert json.loads(encoded) == [grant.to_dict() for grant in GRANTS]
+    assert b"\n" not in encoded
+    assert serialization.loads(encoded) == [grant.to_dict() for grant in GRANTS]
+
+
+def test_encode_grant_and_nested_dumps(backend):
+    assert json.loads(serialization.encode_grant(GRANTS[0])) == GRANTS[0].to_dict()
+    assert json.loads(serialization.dumps({"grants": GRANTS, "count": 2})) == {
+        "grants": [grant.to_dict() for grant in GRANTS],
+        "count": 2,
+    }
+
+
+def test_grants_are_encoded_without_to_dict(backend, monkeypatch):
+    expected = [grant.to_dict() for grant in GRANTS]
+    monkeypatch.setattr(Grant, "to_dict", None)
+
+    assert json.loads(serialization.dumps_grants(GRANTS)) == expected
+    assert json.loads(serialization.dumps({"grants": GRANTS})) == {"grants": expected}
+
+
+def test_loads_raises_json_decode_error(backend):
+    with pytest.raises(serialization.JSONDecodeError):
+        serialization.loads(b"{not json")
+
+
+def test_join_fragments_and_object():
+    fragments = [serialization.encode_grant(grant) for grant in GRANTS]
+    body = serialization.join_object(
+        {
+            "grants": serialization.join_fragments(fragments),
+            "next_cursor": serialization.dumps(None),
+        }
+    )
+
+    assert json.loads(body) == {
+        "grants": [grant.to_dict() for grant in GRANTS],
+        "next_cursor": None,
+    }
+    assert serialization.join_fragments([]) == b"[]"
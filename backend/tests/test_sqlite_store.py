@@ -0,0 +1,190 @@
+import sqlite3
+
+import pytest
+
+from src.models import Grant
+from src.query_parser import parse_query
+from src.search_index import SearchIndex
+from src.sqlite_store import SqliteGrantStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteGrantStore(str(tmp_path / "grants.db"))
+
+
+def sample_grants():
+    return [
+        Grant(
+            grant_name="Grant 1",
+            grant_description="Desc 1",
+            tags=["agriculture", "education", "soil"],
+            website_urls=["https://example.com"],
+        ),
+        Grant(
+            grant_name="Grant 2",
+            grant_description="Desc 2",
+            tags=["Education", "youth"],
+            document_urls=None,
+        ),
+        Grant(
+            grant_name="Grant 3",
+            grant_description="Desc 3",
+            tags=["agriculture", "soil"],
+        ),
+    ]
+
+
+def test_sqlite_store_round_trip(store):
+    store.append_grants(sample_grants()[:2])
+    store.append_grants(sample_grants()[2:])
+
+    grants = store.read_grants()
+    assert [g.grant_name for g in grants] == ["Grant 1", "Grant 2", "Grant 3"]
+    assert grants[0].website_urls == ("https://example.com",)
+    assert grants[1].tags == ("Education", "youth")
+    assert grants[1].document_urls is None
+
+
+def test_sqlite_store_write_and_clear(store):
+    store.append_grants(sample_grants())
+
+    store.write_grants(sample_grants()[1:])
+    assert [g.grant_name for g in store.read_grants()] == ["Grant 2", "Grant 3"]
+    assert store.search_by_tags(["agriculture"]) == [sample_grants()[2]]
+
+    store.clear_grants()
+    assert store.read_grants() == []
+    assert store.search_by_tags(["soil"]) == []
+
+
+def test_sqlite_store_uses_wal(store):
+    conn = sqlite3.connect(store.storage_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.parametrize(
+    "tags,mode",
+    [
+        (["agriculture", "soil"], "all"),
+        (["agriculture", "youth"], "any"),
+        (["EDUCATION"], "all"),
+        (["education", "education"], "all"),
+        (["nonexistent"], "any"),
+        ([], "all"),
+    ],
+)
+def test_sqlite_store_search_matches_search_index(store, tags, mode):
+    store.append_grants(sample_grants())
+    index = SearchIndex()
+    index.add_grants(sample_grants())
+
+    assert store.search_by_tags(tags, mode=mode) == index.search_by_tags(
+        tags, mode=mode
+    )
+
+
+def test_sqlite_store_read_changes(store):
+    store.append_grants(sample_grants()[:1])
+    seen = store.generation()
+
+    store.append_grants(sample_grants()[1:])
+    changes = store.read_changes(seen)
+    assert not changes.reset
+    assert [g.grant_name for g in changes.grants] == ["Grant 2", "Grant 3"]
+    assert changes.generation.count == 3
+
+    store.write_grants(sample_grants()[:1])
+    changes = store.read_changes(seen)
+    assert changes.reset
+    assert [g.grant_name for g in changes.grants] == ["Grant 1"]
+
+
+def test_sqlite_store_iter_search_after_cursor(store):
+    store.append_grants(sample_grants())
+
+    assert [gid for gid, _ in store.iter_search(["soil"], after=0)] == [2]
+    assert [gid for gid, _ in store.iter_grants(after=1)] == [2]
+
+
+def test_sqlite_store_update_tags(store):
+    store.write_grants(sample_grants())
+    before = store.generation()
+
+    generation = store.update_tags({0: ["water"], 1: ["Youth", "soil"]})
+
+    assert generation == before._replace(revision=before.revision + 1)
+    assert generation == store.generation()
+    assert store.read_changes(before) == (
+        generation,
+        [],
+        False,
+        {0: ["water"], 1: ["Youth", "soil"]},
+    )
+    assert [g.tags for g in store.read_grants()][:2] == [("water",), ("Youth", "soil")]
+    assert [g.grant_name for g in store.search_by_tags(["soil"])] == [
+        "Grant 2",
+        "Grant 3",
+    ]
+    assert [g.grant_name for g in store.search_by_tags(["education"])] == []
+    assert store.search_by_tags(["agriculture"]) == [
+        g for g in store.read_grants() if "agriculture" in g.tags
+    ]
+
+
+@pytest.mark.parametrize("mode", ["all", "any"])
+def test_sqlite_store_ranked_search_matches_search_index(store, mode):
+    store.append_grants(sample_grants())
+    index = SearchIndex()
+    index.add_grants(sample_grants())
+    tags = ["soil", "education", "youth"] if mode == "any" else ["soil", "agriculture"]
+
+    ranked = store.ranked_search(tags, mode=mode, limit=2, offset=1)
+    expected = index.ranked_search(tags, mode=mode, limit=2, offset=1)
+
+    assert [item[:2] for item in ranked] == [item[:2] for item in expected]
+    assert [item[2] for item in ranked] == pytest.approx([e[2] for e in expected])
+
+
+@pytest.mark.parametrize(
+    "text", ["soil AND NOT youth", "youth OR (agriculture NOT education)", "NOT soil"]
+)
+def test_sqlite_store_iter_query_matches_search_index(store, text):
+    store.append_grants(sample_grants())
+    index = SearchIndex()
+    index.add_grants(sample_grants())
+    plan = parse_query(text)
+
+    assert list(store.iter_query(plan, after=0)) == list(
+        index.iter_query(plan, after=0)
+    )
+
+
+def test_sqlite_store_text_search(store):
+    store.append_grants(
+        [
+            Grant("NRCS 590 Plan", "Cost share for NRCS practice 590.", ["soil"]),
+            Grant("Soil Health", "Cover crops and soil testing.", ["soil"]),
+        ]
+    )
+    store.append_grants([Grant("Water Grant", "NRCS water projects.", ["water"])])
+
+    assert [gid for gid, _, _ in store.text_search("NRCS 590")] == [0, 2]
+    assert [gid for gid, _, _ in store.text_search("nrcs", parse_query("water"))] == [2]
+    assert store.text_search("", None) == []
+
+    store.write_grants(sample_grants())
+    assert store.text_search("nrcs") == []
+    assert [gid for gid, _, _ in store.text_search("desc 2")] == [1, 0, 2]
+
+
+def test_sqlite_store_backfills_text_index(tmp_path):
+    path = tmp_path / "grants.db"
+    SqliteGrantStore(str(path)).append_grants(sample_grants())
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE grants_fts")
+    conn.commit()
+
+    store = SqliteGrantStore(str(path))
+
+    assert [gid for gid, _, _ in store.text_search("grant 3")][0] == 2
@@ -0,0 +1,90 @@
+from src.models import Grant
+from src.store import GrantStore, StoreGeneration, TagLog
+
+
+def make_grants(start, count):
+    return [
+        Grant(grant_name=f"Grant {i}", grant_description=f"Desc {i}", tags=["soil"])
+        for i in range(start, start + count)
+    ]
+
+
+def test_store_generation_tracks_appends_and_rewrites(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    empty = store.generation()
+    assert empty.count == 0
+
+    store.append_grants(make_grants(0, 2))
+    appended = store.generation()
+    assert appended == StoreGeneration(empty.epoch, 2)
+
+    store.write_grants(make_grants(0, 1))
+    rewritten = store.generation()
+    assert rewritten.epoch != appended.epoch
+    assert rewritten.count == 1
+
+
+def test_store_read_changes_returns_only_new_grants(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants(make_grants(0, 2))
+    seen = store.generation()
+
+    store.append_grants(make_grants(2, 3))
+    changes = store.read_changes(seen)
+
+    assert not changes.reset
+    assert [g.grant_name for g in changes.grants] == ["Grant 2", "Grant 3", "Grant 4"]
+    assert changes.generation == store.generation()
+
+    store.clear_grants()
+    changes = store.read_changes(seen)
+    assert changes.reset
+    assert changes.grants == []
+
+
+def test_store_generation_for_existing_file_without_sidecar(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants(make_grants(0, 3))
+    store.generation_path.unlink()
+
+    assert GrantStore(str(tmp_path / "grants.json")).generation().count == 3
+
+
+def test_store_update_tags_keeps_epoch(tmp_path):
+    store = GrantStore(str(tmp_path / "grants.json"))
+    store.append_grants(make_grants(0, 3))
+    before = store.generation()
+
+    generation = store.update_tags({1: ["water"]})
+    store.append_grants(make_grants(3, 1))
+
+    assert [g.tags for g in store.read_grants()][:3] == [
+        ("soil",),
+        ("water",),
+        ("soil",),
+    ]
+    assert generation == StoreGeneration(before.epoch, 3, before.revision + 1)
+    changes = store.read_changes(before)
+    assert not changes.reset
+    assert [g.grant_name for g in changes.grants] == ["Grant 3"]
+    assert changes.tag_updates == {1: ["water"]}
+    assert store.read_changes(store.generation()).tag_updates == {}
+
+    store.write_grants(make_grants(0, 1))
+    assert store.read_changes(generation).reset
+    assert store.generation().revision == 0
+
+
+def test_tag_log_skips_torn_lines_and_unfinished_revisions(tmp_path):
+    log = TagLog(tmp_path / "tags.jsonl")
+    log.append(1, {0: ["soil"], 1: ["water"]})
+    with open(log.path, "ab") as f:
+        f.write(b'{"revision": 2, "tags": [[0')
+    log.append(2, {0: ["youth"]})
+    log.append(3, {1: ["dairy"]})
+
+    assert log.read() == {0: ["youth"], 1: ["dairy"]}
+    assert log.read(since=1, until=2) == {0: ["youth"]}
+
+    log.clear()
+    assert log.read() == {}
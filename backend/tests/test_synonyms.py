@@ -1,4 +1,4 @@
-from src.synonyms import resolve_query, resolve_synonym
+from src.synonyms import PhraseTrie, resolve_query, resolve_synonym
 
 
 def test_resolve_synonym_basic():
@@ -44,3 +44,30 @@ def test_resolve_query_mixed():
     assert "water" in tags
     assert "agriculture" in tags
     assert "youth" in tags
+
+
+def test_resolve_query_longest_match_inside_longer_query():
+    assert resolve_query("grants for Soil Health in dry areas") == {
+        "grants",
+        "for",
+        "soil",
+        "in",
+        "drought",
+        "areas",
+    }
+    assert resolve_query("water shortage relief") == {"drought", "relief"}
+    assert resolve_query("water") == {"water"}
+
+
+def test_phrase_trie_prefers_longest_phrase():
+    trie = PhraseTrie({"water": "water", "water system": "irrigation"})
+
+    assert trie.resolve(["water", "system", "water"]) == ["irrigation", "water"]
+    assert trie.resolve(["water", "systems"]) == ["water", "systems"]
+
+
+def test_resolve_query_returns_copies():
+    tags = resolve_query("learning soil")
+    tags.add("mutated")
+
+    assert resolve_query("learning soil") == {"education", "soil"}
@@ -1,4 +1,7 @@
-from src.tagging import GrantTagger
+import re
+
+from src.matcher import KeywordMatcher
+from src.tagging import KEYWORD_MAP, GrantTagger
 
 
 def test_tagger_basic():
@@ -139,3 +142,117 @@ def test_simple_stem():
     assert tagger.simple_stem("farmers") == "farmer"
     assert tagger.simple_stem("farms") == "farm"
     assert tagger.simple_stem("berries") == "berry"
+
+
+def test_keyword_matcher_overlapping_keywords():
+    matcher = KeywordMatcher(
+        ["water", "water-storage", "soil"],
+        {"water": ["water"], "water-storage": ["water tank"], "soil": ["land"]},
+        GrantTagger().simple_stem,
+    )
+
+    assert matcher.match("new water tank") == {"water", "water-storage"}
+    assert matcher.match("tanks of water") == {"water", "water-storage"}
+    assert matcher.match("water-tanks") == {"water"}
+    assert matcher.match("tanks") == set()
+    assert matcher.match("landscape") == set()
+    assert matcher.match("land-use") == {"soil"}
+
+
+def test_keyword_matcher_matches_per_keyword_scan():
+    tagger = GrantTagger()
+
+    def per_keyword_scan(normalized):
+        matched = set()
+        for tag in tagger.tags:
+            if tag.replace("-", " ") in normalized or tag in normalized:
+                matched.add(tag)
+            for keyword in tagger.keyword_map.get(tag, []):
+                if re.search(r"\b" + re.escape(keyword.lower()) + r"\b", normalized):
+                    matched.add(tag)
+        stemmed_words = [tagger.simple_stem(w) for w in normalized.split()]
+        for tag in tagger.tags:
+            for tag_word in tag.replace("-", " ").split():
+                if tagger.simple_stem(tag_word) in stemmed_words:
+                    matched.add(tag)
+        return matched
+
+    texts = [
+        "cost-share for water storage and soil health on local farms",
+        "co-op school meal program for k-12 students and young farmers",
+        "non-profit seafood harvester training in rural counties",
+        "value added processing of berries and vegetables",
+    ]
+    for text in texts:
+        normalized = tagger.normalize_text(text)
+        assert tagger.matcher.match(normalized) == per_keyword_scan(normalized)
+
+
+def test_tag_many_matches_tag_grant():
+    tagger = GrantTagger()
+    items = [
+        ("Farm Education Grant", "Supporting agricultural education programs"),
+        ("", ""),
+        ("Irrigation\x00Grant", "Water systems for rural farms."),
+        ("Coastal Fisheries", "Seafood harvester training, fisherman safety."),
+    ]
+
+    assert tagger.tag_many(items) == [tagger.tag_grant(*item) for item in items]
+    assert tagger.tag_many([]) == []
+
+
+def test_normalize_many_matches_normalize_text():
+    tagger = GrantTagger()
+    texts = ["Hello, World!", "  Cost-Share\n\tProgram  ", "", "A\x00B"]
+
+    assert tagger.normalize_many(texts) == [tagger.normalize_text(t) for t in texts]
+
+
+def test_match_matrix_rows_are_tag_bitmasks():
+    tagger = GrantTagger()
+    rows = tagger.matcher.match_matrix(["dairy farm", "youth"])
+
+    assert tagger.matcher.decode(rows[0]) == sorted(tagger.matcher.match("dairy farm"))
+    assert tagger.matcher.decode(rows[1]) == sorted(tagger.matcher.match("youth"))
+    assert rows[0] & tagger.matcher.encode(["dairy"])
+    assert not rows[1] & tagger.matcher.encode(["dairy"])
+
+
+def test_tag_many_memoizes_repeated_texts():
+    tagger = GrantTagger(cache_size=100)
+    items = [
+        ("Farm Grant", "Funding for farmers"),
+        ("Farm  grant!", "funding for FARMERS"),
+    ]
+
+    first = tagger.tag_many(items)
+    second = tagger.tag_many(items)
+
+    assert (
+        first[0]
+        == first[1]
+        == second[0]
+        == GrantTagger(cache_size=0).tag_grant(*items[0])
+    )
+    assert len(tagger.cache) == 1
+    assert tagger.cache.hits == 2
+
+
+def test_tag_cache_disk_tier_is_shared(tmp_path):
+    cache_path = str(tmp_path / "tags.db")
+    tags = GrantTagger(cache_path=cache_path).tag_grant("Dairy", "Milk cooperative")
+
+    other = GrantTagger(cache_path=cache_path)
+    other.matcher = None
+
+    assert other.tag_grant("Dairy", "Milk cooperative") == tags
+
+
+def test_tag_cache_invalidated_by_keyword_map_change(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "tags.db")
+    assert "youth" not in GrantTagger(cache_path=cache_path).tag_grant("Grant", "Kids")
+
+    keyword_map = {**KEYWORD_MAP, "youth": [*KEYWORD_MAP["youth"], "kids"]}
+    monkeypatch.setattr("src.tagging.KEYWORD_MAP", keyword_map)
+
+    assert "youth" in GrantTagger(cache_path=cache_path).tag_grant("Grant", "Kids")
@@ -0,0 +1,83 @@
+import math
+import random
+
+import pytest
+
+from src.models import Grant
+from src.text_index import K1, B, TextIndex, tokenize
+
+
+def make_index():
+    index = TextIndex()
+    index.add_grants(
+        [
+            Grant(grant_name="Water Storage", grant_description="Cistern funding"),
+            Grant(grant_name="Cost-share", grant_description="Storage of water"),
+            Grant(grant_name="K-12 Meals", grant_description="School food"),
+        ]
+    )
+    return index
+
+
+def test_tokenize_splits_on_non_word_characters():
+    assert tokenize("Cost-share, K-12!") == ["cost", "share", "k", "12"]
+
+
+def test_text_index_candidates_contain_every_word():
+    index = make_index()
+
+    assert index.candidates("water storage") == {0, 1}
+    assert index.candidates("cost-share") == {1}
+    assert index.candidates("K-12") == {2}
+    assert index.candidates("school food storage") == set()
+    assert index.candidates("") == set()
+    assert len(index) == 3
+
+
+def brute_force_bm25(grants, text):
+    docs = [tokenize(f"{g.grant_name} {g.grant_description}") for g in grants]
+    average = sum(map(len, docs)) / len(docs)
+    scores = {}
+    for word in set(tokenize(text)):
+        df = sum(word in doc for doc in docs)
+        if not df:
+            continue
+        idf = max(math.log((len(docs) - df + 0.5) / (df + 0.5)), 1e-6)
+        for gid, doc in enumerate(docs):
+            count = doc.count(word)
+            if count:
+                norm = K1 * (1 - B + B * len(doc) / average)
+                scores[gid] = scores.get(gid, 0) + idf * count * (K1 + 1) / (
+                    count + norm
+                )
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_text_index_search_matches_exhaustive_bm25():
+    random.seed(7)
+    vocabulary = [f"w{i}" for i in range(40)]
+    grants = [
+        Grant(
+            grant_name=f"Grant {i}",
+            grant_description=" ".join(
+                random.choices(vocabulary, weights=range(40, 0, -1), k=12)
+            ),
+        )
+        for i in range(300)
+    ]
+    index = TextIndex()
+    index.add_grants(grants)
+
+    for text in ("w0 w39", "w5 w6 w7 w30", "w1 missing", "grant w20"):
+        expected = brute_force_bm25(grants, text)
+        for limit in (1, 5, 50):
+            found = index.search(text, limit)
+            assert [gid for gid, _ in found] == [gid for gid, _ in expected[:limit]]
+            assert [score for _, score in found] == pytest.approx(
+                [score for _, score in expected[:limit]]
+            )
+
+    assert index.search("w0", 10, within={3, 4}) == [
+        item for item in brute_force_bm25(grants, "w0") if item[0] in {3, 4}
+    ]
+    assert index.search("missing", 10) == []